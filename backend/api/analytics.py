@@ -0,0 +1,188 @@
+# analytics.py
+# Инкрементальные дневные агрегаты продаж (StoreDailyStats, ProductDailySales).
+# create_order и update_order_status обновляют их в той же транзакции, что и заказ,
+# поэтому /stores/{id}/stats читает O(дней), а не все строки order_items.
+#
+# Пересчитать агрегаты по существующим заказам:
+#     python -m api.analytics rebuild
+import argparse
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import Date, cast, delete, distinct, func, insert, select, union_all
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from . import models
+
+# (store_id, product_id, quantity, price_at_order)
+Line = Tuple[int, int, int, float]
+
+
+def _upsert_add(db: Session, model, keys: List[str], rows: List[dict]) -> None:
+    """INSERT ... ON CONFLICT DO UPDATE: прибавляет значения к существующей строке агрегата."""
+    if not rows:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+    statement = dialect_insert(model)
+    counters = [name for name in ("revenue", "units", "order_count") if name in rows[0]]
+    statement = statement.on_conflict_do_update(
+        index_elements=keys,
+        set_={name: getattr(model, name) + statement.excluded[name] for name in counters},
+    )
+    db.execute(statement, rows)
+
+
+def _apply(db: Session, day: date, status: models.OrderStatus, lines: Iterable[Line], sign: int) -> None:
+    """Добавляет (sign=1) или вычитает (sign=-1) строки одного заказа из агрегатов."""
+    stores: Dict[int, dict] = defaultdict(lambda: {"revenue": 0.0, "units": 0})
+    products: Dict[int, dict] = {}
+
+    for store_id, product_id, quantity, price in lines:
+        stores[store_id]["revenue"] += quantity * price
+        stores[store_id]["units"] += quantity
+        product = products.setdefault(product_id, {"store_id": store_id, "revenue": 0.0, "units": 0})
+        product["revenue"] += quantity * price
+        product["units"] += quantity
+
+    _upsert_add(db, models.StoreDailyStats, ["store_id", "day", "status"], [
+        {
+            "store_id": store_id, "day": day, "status": status,
+            "revenue": sign * totals["revenue"], "units": sign * totals["units"], "order_count": sign,
+        }
+        for store_id, totals in stores.items()
+    ])
+
+    # Топ товаров считается только по неотмененным заказам
+    if status != models.OrderStatus.CANCELLED:
+        _upsert_add(db, models.ProductDailySales, ["product_id", "day"], [
+            {
+                "product_id": product_id, "day": day, "store_id": totals["store_id"],
+                "revenue": sign * totals["revenue"], "units": sign * totals["units"],
+            }
+            for product_id, totals in products.items()
+        ])
+
+
+def _order_day(created_at) -> date:
+    return (created_at or datetime.utcnow()).date()
+
+
+def record_order(db: Session, created_at: datetime, status: models.OrderStatus, lines: Iterable[Line]) -> None:
+    """Учитывает новый заказ. Вызывается до commit в create_order."""
+    _apply(db, _order_day(created_at), status, lines, sign=1)
+
+
+def order_lines(db: Session, order_id: int) -> List[Line]:
+    """Строки заказа в виде (store_id, product_id, quantity, price_at_order)."""
+    return [
+        tuple(row) for row in db.execute(
+            select(
+                models.Product.store_id, models.OrderItem.product_id,
+                models.OrderItem.quantity, models.OrderItem.price_at_order,
+            )
+            .join(models.Product, models.Product.id == models.OrderItem.product_id)
+            .where(models.OrderItem.order_id == order_id)
+        )
+    ]
+
+
+def move_order(
+        db: Session,
+        created_at: datetime,
+        old_status: models.OrderStatus,
+        new_status: models.OrderStatus,
+        lines: List[Line],
+) -> None:
+    """
+    Переносит заказ из строки старого статуса в строку нового. Вызывается до commit и только
+    после того, как этот же запрос сменил статус условным UPDATE (WHERE status = old_status):
+    иначе параллельные смены статуса перенесли бы заказ в агрегатах несколько раз.
+    """
+    if old_status == new_status:
+        return
+    day = _order_day(created_at)
+    _apply(db, day, old_status, lines, sign=-1)
+    _apply(db, day, new_status, lines, sign=1)
+
+
+def _order_lines(order_model, item_model):
+    """Строки заказов (живых или архивных, см. archive.py) с датой и статусом заказа."""
+    return (
+        select(
+            order_model.id.label("order_id"), order_model.created_at, order_model.status,
+            item_model.product_id, item_model.quantity, item_model.price_at_order,
+        )
+        .join(item_model, item_model.order_id == order_model.id)
+    )
+
+
+def rebuild(engine: Engine) -> None:
+    """Полностью пересчитывает агрегаты по заказам — живым и перенесенным в архив."""
+    lines = union_all(
+        _order_lines(models.Order, models.OrderItem),
+        _order_lines(models.ArchivedOrder, models.ArchivedOrderItem),
+    ).subquery()
+
+    if engine.dialect.name == "sqlite":
+        order_day = func.date(lines.c.created_at)
+    else:
+        order_day = cast(lines.c.created_at, Date)
+    line_revenue = lines.c.quantity * lines.c.price_at_order
+
+    store_rows = (
+        select(
+            models.Product.store_id, order_day, lines.c.status,
+            func.sum(line_revenue), func.sum(lines.c.quantity),
+            func.count(distinct(lines.c.order_id)),
+        )
+        .select_from(lines)
+        .join(models.Product, models.Product.id == lines.c.product_id)
+        .group_by(models.Product.store_id, order_day, lines.c.status)
+    )
+    product_rows = (
+        select(
+            lines.c.product_id, order_day, models.Product.store_id,
+            func.sum(line_revenue), func.sum(lines.c.quantity),
+        )
+        .select_from(lines)
+        .join(models.Product, models.Product.id == lines.c.product_id)
+        .where(lines.c.status != models.OrderStatus.CANCELLED)
+        .group_by(lines.c.product_id, order_day, models.Product.store_id)
+    )
+
+    with engine.begin() as connection:
+        connection.execute(delete(models.StoreDailyStats))
+        connection.execute(delete(models.ProductDailySales))
+        connection.execute(
+            insert(models.StoreDailyStats).from_select(
+                ["store_id", "day", "status", "revenue", "units", "order_count"], store_rows,
+            )
+        )
+        connection.execute(
+            insert(models.ProductDailySales).from_select(
+                ["product_id", "day", "store_id", "revenue", "units"], product_rows,
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Агрегаты продаж для аналитики продавца")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    from .database import engine
+    from .migrate import migrate
+
+    migrate(engine)
+    rebuild(engine)
+    print("Sales rollups rebuilt.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# archive.py
+# Перенос завершенных заказов (DELIVERED / CANCELLED старше ARCHIVE_AFTER_DAYS) из orders /
+# order_items в orders_archive / order_items_archive. Ленты заказов и проверки в обработчиках
+# работают с живыми таблицами, размер которых определяется активными заказами, а не историей.
+# Архив читается только по запросу (include_archived=true).
+#
+# Запуск (например, по cron раз в сутки):
+#     python -m api.archive run
+#     python -m api.archive run --older-than-days 30 --batch-size 1000
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Engine
+
+from . import config, models
+
+# Статусы, после которых заказ больше не меняется в обычной работе
+FINISHED_STATUSES = (models.OrderStatus.DELIVERED, models.OrderStatus.CANCELLED)
+
+
+def _archive_batch(engine: Engine, cutoff: datetime, batch_size: int) -> Tuple[int, int]:
+    """Переносит одну пачку заказов в своей транзакции; возвращает (отобрано, перенесено)."""
+    Order, OrderItem = models.Order, models.OrderItem
+
+    candidates = (
+        select(Order.id)
+        .where(
+            Order.status.in_(FINISHED_STATUSES),
+            Order.created_at < cutoff,
+            # Самый новый заказ не переносим: SQLite выдает новым строкам max(id) + 1,
+            # и id перенесенного заказа мог бы достаться следующему
+            Order.id < select(func.max(Order.id)).scalar_subquery(),
+        )
+        .order_by(Order.id)
+        .limit(batch_size)
+        # PostgreSQL: строки пачки блокируются; заказы, статус которых меняют прямо сейчас,
+        # пропускаются до следующего запуска
+        .with_for_update(skip_locked=True)
+    )
+
+    with engine.begin() as connection:
+        order_ids = connection.execute(candidates).scalars().all()
+        if not order_ids:
+            return 0, 0
+
+        # Условие повторяется при вставке: в SQLite блокировка на запись берется только здесь,
+        # и заказ, статус которого успели изменить после выборки, не переносится
+        connection.execute(insert(models.ArchivedOrder).from_select(
+            ["id", "buyer_id", "status", "created_at"],
+            select(Order.id, Order.buyer_id, Order.status, Order.created_at)
+            .where(Order.id.in_(order_ids), Order.status.in_(FINISHED_STATUSES)),
+        ))
+        moved_ids = connection.execute(
+            select(models.ArchivedOrder.id).where(models.ArchivedOrder.id.in_(order_ids))
+        ).scalars().all()
+
+        connection.execute(insert(models.ArchivedOrderItem).from_select(
+            ["order_id", "product_id", "quantity", "price_at_order"],
+            select(OrderItem.order_id, OrderItem.product_id, OrderItem.quantity, OrderItem.price_at_order)
+            .where(OrderItem.order_id.in_(moved_ids))
+            .order_by(OrderItem.id),
+        ))
+        connection.execute(delete(OrderItem).where(OrderItem.order_id.in_(moved_ids)))
+        connection.execute(delete(Order).where(Order.id.in_(moved_ids)))
+
+    return len(order_ids), len(moved_ids)
+
+
+def archive_orders(
+        engine: Engine,
+        older_than_days: int = config.ARCHIVE_AFTER_DAYS,
+        batch_size: int = config.ARCHIVE_BATCH_SIZE,
+        pause: float = config.ARCHIVE_BATCH_PAUSE,
+        max_batches: Optional[int] = None,
+) -> int:
+    """
+    Переносит завершенные заказы старше older_than_days пачками по batch_size заказов.
+    Каждая пачка — отдельная короткая транзакция; возвращает общее число перенесенных заказов.
+    Агрегаты аналитики (StoreDailyStats, ProductDailySales) при переносе не меняются.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    moved = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        selected, count = _archive_batch(engine, cutoff, batch_size)
+        if not selected:
+            break
+        moved += count
+        batches += 1
+        if pause:
+            time.sleep(pause)
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Архив завершенных заказов")
+    parser.add_argument("command", choices=["run"])
+    parser.add_argument("--older-than-days", type=int, default=config.ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=config.ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--max-batches", type=int, default=None)
+    args = parser.parse_args()
+
+    from .database import engine
+    from .migrate import migrate
+
+    migrate(engine)
+    started = time.perf_counter()
+    moved = archive_orders(
+        engine, older_than_days=args.older_than_days, batch_size=args.batch_size, max_batches=args.max_batches,
+    )
+    print(f"Archived {moved} orders in {time.perf_counter() - started:.1f} s.")
+
+
+if __name__ == "__main__":
+    main()
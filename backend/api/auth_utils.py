@@ -1,14 +1,18 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 
-from passlib.context import CryptContext
-from jose import jwt, JWTError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, object_session
 
+from . import config
+from .cache import TTLCache
 from .models import User, UserRole
-from .database import get_db
+from .database import get_db, get_async_db
 
 # Настройки безопасности
 SECRET_KEY = "YOUR_SUPER_SECRET_KEY"  # В продакшене брать из env
@@ -16,8 +20,18 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 BCRYPT_MAX_LENGTH = 72
 
-# Контекст для хеширования паролей
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# passlib и jose импортируются при первом использовании: они заметно удлиняют
+# импорт приложения, а воркеру при старте не нужны (см. benchmarks/startup.py)
+
+
+@lru_cache(maxsize=None)
+def _pwd_context():
+    """Контекст для хеширования паролей.
+    Роутеры хешируют через пул процессов (password_pool), эти функции — для скриптов и CLI."""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=config.BCRYPT_ROUNDS)
+
 
 # Схема OAuth2 для передачи токена
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login")
@@ -32,18 +46,20 @@ def get_password_hash(password: str) -> str:
     truncated_password = password[:BCRYPT_MAX_LENGTH]
 
     # 2. Выполняем хеширование
-    return pwd_context.hash(truncated_password)
+    return _pwd_context().hash(truncated_password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Проверяет соответствие пароля хешу."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return _pwd_context().verify(plain_password, hashed_password)
 
 
 # --- Функции работы с JWT ---
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Создает JWT токен."""
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -56,6 +72,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 def decode_access_token(token: str):
     """Декодирует JWT токен, возвращает пейлоад."""
+    from jose import jwt, JWTError
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
@@ -67,30 +85,147 @@ def decode_access_token(token: str):
         )
 
 
-# --- Dependency для получения текущего пользователя ---
+def token_user_id(authorization: Optional[str]) -> Optional[int]:
+    """
+    id пользователя из значения заголовка Authorization, если токен валиден, иначе None.
+    Для middleware и маршрутизации запросов: решение об отказе в доступе принимает get_current_user.
+    """
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return decode_access_token(token).get("id")
+    except HTTPException:
+        return None
 
-def get_current_user(
-        db: Session = Depends(get_db),
-        token: str = Depends(oauth2_scheme)
-) -> User:
-    """Извлекает пользователя из токена."""
 
-    # 1. Декодируем токен
+# --- Текущий пользователь и его кэш ---
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """
+    Данные аутентифицированного пользователя, нужные роутерам.
+    Не привязан к сессии БД, поэтому его можно хранить в кэше между запросами.
+    """
+    id: int
+    username: str
+    role: UserRole
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(id=user.id, username=user.username, role=user.role)
+
+
+# Кэш user_id -> CurrentUser: убирает SELECT пользователя из каждого защищенного запроса
+user_cache = TTLCache(maxsize=config.USER_CACHE_SIZE, ttl=config.USER_CACHE_TTL)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Удаляет пользователя из кэша (вызывается после изменения или удаления)."""
+    user_cache.pop(user_id)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _remember_changed_user(mapper, connection, target):
+    # Запоминаем измененных пользователей; из кэша убираем после commit,
+    # чтобы параллельный запрос не успел закэшировать еще не закоммиченные данные
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session):
+    session.info.pop("changed_user_ids", None)
+
+
+def _user_from_claims(payload: dict) -> Optional[CurrentUser]:
+    """Строит пользователя из токена (режим AUTH_TRUST_CLAIMS), если в нем есть все поля."""
+    try:
+        return CurrentUser(id=payload["id"], username=payload["username"], role=UserRole(payload["role"]))
+    except (KeyError, ValueError):
+        return None  # Токен старого формата — проверяем по БД
+
+
+# --- Dependency для получения текущего пользователя ---
+
+def _decode_user_token(token: str) -> dict:
+    """Декодирует токен и проверяет, что в нем есть id пользователя."""
     payload = decode_access_token(token)
-    user_id: Optional[int] = payload.get("id")
 
-    if user_id is None:
+    if payload.get("id") is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication token",
         )
+    return payload
 
-    # 2. Ищем пользователя в БД
-    user = db.query(User).filter(User.id == user_id).first()
 
+def _user_without_db(payload: dict) -> Optional[CurrentUser]:
+    """Пользователь из токена (при AUTH_TRUST_CLAIMS) или из кэша; None — нужно идти в БД."""
+    if config.AUTH_TRUST_CLAIMS:
+        current_user = _user_from_claims(payload)
+        if current_user is not None:
+            return current_user
+    return user_cache.get(payload["id"])
+
+
+def _cache_user(user: Optional[User]) -> CurrentUser:
+    """Кладет загруженного из БД пользователя в кэш."""
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
         )
-    return user
\ No newline at end of file
+    current_user = CurrentUser.from_user(user)
+    user_cache.set(user.id, current_user)
+    return current_user
+
+
+def get_current_user(
+        db: Session = Depends(get_db),
+        token: str = Depends(oauth2_scheme)
+) -> CurrentUser:
+    """
+    Извлекает пользователя из токена.
+    Сначала смотрит в кэш (или в сам токен при AUTH_TRUST_CLAIMS), в БД — только при промахе.
+    """
+
+    # 1. Декодируем токен
+    payload = _decode_user_token(token)
+
+    # 2. Ищем пользователя в кэше, при промахе — в БД
+    current_user = _user_without_db(payload)
+    if current_user is None:
+        current_user = _cache_user(db.query(User).filter(User.id == payload["id"]).first())
+        # Возвращаем соединение в пул: обработчик запроса выполнится в другом потоке,
+        # и без этого соединение простаивало бы, пока он ждет свободный поток.
+        # Под нагрузкой такие соединения исчерпывают пул, а потоки, ждущие соединения,
+        # не дают обработчикам стартовать — взаимоблокировка до DB_POOL_TIMEOUT.
+        db.rollback()
+    # Автор записей сессии: после commit его чтения временно идут в основную БД (replicas.py)
+    db.info["user_id"] = current_user.id
+    return current_user
+
+
+async def get_current_user_async(
+        db: AsyncSession = Depends(get_async_db),
+        token: str = Depends(oauth2_scheme)
+) -> CurrentUser:
+    """Извлекает пользователя из токена (асинхронный режим, DB_ASYNC=1)."""
+    payload = _decode_user_token(token)
+
+    current_user = _user_without_db(payload)
+    if current_user is None:
+        current_user = _cache_user(await db.get(User, payload["id"]))
+    db.info["user_id"] = current_user.id
+    return current_user
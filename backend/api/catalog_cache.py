@@ -0,0 +1,131 @@
+# catalog_cache.py
+# HTTP-кэширование публичного каталога: сильные ETag по версии каталога,
+# ответ 304 на If-None-Match без обращения к БД и LRU сериализованных ответов.
+import hashlib
+import threading
+import time
+import uuid
+from typing import Any
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from . import config, responses
+from .cache import TTLCache
+
+# Идентификатор процесса: ETag разных воркеров не совпадают, так как версии у каждого свои
+_BOOT_ID = uuid.uuid4().hex
+
+# Версии каталога: "stores" — список магазинов, ("store", id) — товары магазина.
+# create_store / create_product увеличивают версию, и все ETag этой области меняются.
+_versions = {}
+_lock = threading.Lock()
+
+_bodies = TTLCache(maxsize=config.CATALOG_CACHE_SIZE, ttl=config.CATALOG_CACHE_TTL)
+
+# ETag -> хеш последнего отданного под ним тела. Живет дольше тела: после истечения TTL ответ
+# строится заново, и если данные изменились без локального invalidate (в другом воркере),
+# версия области увеличивается — старый ETag больше не совпадает
+_digests = TTLCache(maxsize=config.CATALOG_CACHE_SIZE, ttl=float("inf"))
+
+stats = {"not_modified": 0}
+
+# Время (time.monotonic) последнего изменения по областям: пока реплики могут отставать,
+# область читается из основной БД, иначе в кэш под новой версией попали бы старые данные
+_changed_at = {}
+
+STORES = "stores"
+
+
+def store_scope(store_id: int) -> tuple:
+    return ("store", store_id)
+
+
+def invalidate(scope) -> None:
+    """Увеличивает версию области каталога: старые ETag и тела ответов больше не используются."""
+    with _lock:
+        _versions[scope] = _versions.get(scope, 0) + 1
+        _changed_at[scope] = time.monotonic()
+
+
+def clear() -> None:
+    """Сбрасывает весь кэш каталога."""
+    with _lock:
+        now = time.monotonic()
+        for scope in _versions:
+            _versions[scope] += 1
+            _changed_at[scope] = now
+        _changed_at[STORES] = now
+    _bodies.clear()
+    _digests.clear()
+
+
+def changed_within(scope, seconds: float) -> bool:
+    """Менялась ли область каталога за последние seconds секунд."""
+    return time.monotonic() - _changed_at.get(scope, float("-inf")) < seconds
+
+
+class CatalogView:
+    """
+    Кэшируемый ответ каталога для конкретного запроса.
+    ETag зависит только от версии области и параметров запроса, поэтому не меняется,
+    пока не меняется каталог. Пока тело ответа лежит в LRU (CATALOG_CACHE_TTL), 304 и повторные
+    ответы отдаются без БД; после этого ответ строится заново и сверяется с прежним (см. _digests).
+    Версию фиксируем до чтения из БД, чтобы запись, случившаяся во время чтения,
+    не оказалась закэширована под новой версией.
+    """
+
+    def __init__(self, request: Request, scope):
+        self.scope = scope
+        self.version = _versions.get(scope, 0)
+        self.request = request
+        self.etag = self._etag(self.version)
+
+    def _etag(self, version: int) -> str:
+        key = f"{_BOOT_ID}:{self.scope}:{version}:{self.request.url.path}?{self.request.url.query}"
+        return '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+
+    def _response(self, body: bytes) -> Response:
+        return Response(content=body, media_type="application/json", headers=self._headers())
+
+    def _headers(self) -> dict:
+        return {
+            "ETag": self.etag,
+            "Cache-Control": f"public, max-age={config.CATALOG_CACHE_MAX_AGE}, must-revalidate",
+        }
+
+    def _not_modified(self):
+        """304, если у клиента ответ с текущим ETag, иначе None."""
+        if_none_match = self.request.headers.get("if-none-match", "")
+        if self.etag in (tag.strip() for tag in if_none_match.split(",")):
+            stats["not_modified"] += 1
+            return Response(status_code=304, headers=self._headers())
+        return None
+
+    def cached_response(self):
+        """Пока тело в LRU: 304, если у клиента актуальная версия, иначе тело из LRU; без него — None."""
+        body = _bodies.get(self.etag)
+        if body is None:
+            return None
+        return self._not_modified() or self._response(body)
+
+    def respond(self, adapter: TypeAdapter, data: Any) -> Response:
+        """Сериализует данные (pydantic-core, без jsonable_encoder), кладет в LRU и отдает."""
+        body = responses.serialize(adapter, data)
+        digest = hashlib.sha1(body).digest()
+        previous = _digests.get(self.etag)
+        if previous is not None and previous != digest:
+            # Под этим ETag уже отдавались другие данные: каталог изменили в другом воркере
+            with _lock:
+                if _versions.get(self.scope, 0) != self.version:
+                    # Локальное изменение во время чтения: не кэшируем, следующий запрос перечитает
+                    return self._response(body)
+                self.version = _versions[self.scope] = self.version + 1
+            self.etag = self._etag(self.version)
+        _digests.set(self.etag, digest)
+        _bodies.set(self.etag, body)
+        return self._not_modified() or self._response(body)
+
+
+def get_stats() -> dict:
+    return dict(_bodies.stats(), not_modified=stats["not_modified"])
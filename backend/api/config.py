@@ -0,0 +1,205 @@
+# config.py
+# Настройки приложения. Все значения можно переопределить переменными окружения.
+import os
+
+
+def env_bool(name: str, default: bool = False) -> bool:
+    """Читает булеву переменную окружения ("1", "true", "yes", "on" — истина)."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# --- База данных ---
+
+# Синхронный URL (SQLite по умолчанию, для продакшена — postgresql://...)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sql_app.db")
+
+# Асинхронный режим: роутеры работают через AsyncEngine/AsyncSession
+DB_ASYNC = env_bool("DB_ASYNC")
+
+# URL для асинхронного движка. Если не задан, выводится из DATABASE_URL:
+# sqlite:// -> sqlite+aiosqlite://, postgresql:// -> postgresql+asyncpg://
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# Пул соединений (для SQLite-файла и PostgreSQL; in-memory SQLite использует свой пул)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # секунды, -1 — не пересоздавать
+DB_POOL_PRE_PING = env_bool("DB_POOL_PRE_PING", True)
+
+# Создавать недостающие таблицы/столбцы/индексы при старте воркера (под блокировкой, см. migrate.py).
+# api.server выполняет миграцию сам до запуска воркеров и выключает это для них.
+DB_AUTO_MIGRATE = env_bool("DB_AUTO_MIGRATE", True)
+
+# Файл межпроцессной блокировки миграции для SQLite (по умолчанию — во временном каталоге)
+DB_MIGRATE_LOCK_FILE = os.getenv("DB_MIGRATE_LOCK_FILE")
+
+# Реплики только для чтения: синхронные URL через запятую (реплики PostgreSQL или копии SQLite,
+# см. replicas.py). С них читают GET-маршруты; запись и миграции — только в DATABASE_URL.
+# В асинхронном режиме драйвер подставляется так же, как для ASYNC_DATABASE_URL.
+DB_REPLICA_URLS = [url.strip() for url in os.getenv("DB_REPLICA_URLS", "").split(",") if url.strip()]
+
+# Сколько секунд после записи пользователя его чтения идут в основную БД (read-your-writes).
+# Должно покрывать отставание реплик.
+DB_REPLICA_STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+
+# На сколько секунд реплика исключается после ошибки соединения; затем перед возвратом
+# в работу она проверяется запросом SELECT 1
+DB_REPLICA_RETRY_AFTER = float(os.getenv("DB_REPLICA_RETRY_AFTER", "10"))
+
+# PRAGMA, применяемые к каждому новому соединению SQLite.
+# WAL позволяет читателям не блокироваться пишущими транзакциями,
+# synchronous=NORMAL в режиме WAL безопасен и заметно быстрее FULL.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+# --- HTTP-сервер (python run.py / python -m api.server) ---
+
+WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
+WEB_PORT = int(os.getenv("WEB_PORT", "5001"))
+
+# Число процессов-воркеров uvicorn (по умолчанию — по числу CPU)
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", str(os.cpu_count() or 1)))
+
+# Сколько секунд воркер дорабатывает начатые запросы при остановке и перезапуске (SIGHUP)
+WEB_GRACEFUL_TIMEOUT = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+
+# Адреса доверенных прокси через запятую ("*" — любой): только от них uvicorn принимает
+# X-Forwarded-For / X-Forwarded-Proto и берет из них IP клиента (ключ rate limit, логи)
+WEB_FORWARDED_ALLOW_IPS = os.getenv("WEB_FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+# --- Аутентификация ---
+
+# Кэш пользователя для get_current_user: экономит SELECT на каждом защищенном запросе
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))  # секунды
+
+# Доверять id/username/role из подписанного токена, не обращаясь к БД и кэшу.
+# Изменения роли и удаление пользователя вступят в силу только после истечения токена.
+AUTH_TRUST_CLAIMS = env_bool("AUTH_TRUST_CLAIMS")
+
+# --- Хеширование паролей (bcrypt) ---
+
+# Стоимость bcrypt (2^rounds итераций). При изменении хеши пересчитываются при входе.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Отдельный пул процессов для bcrypt, чтобы хеширование не занимало потоки и event loop
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+
+# Максимум операций в пуле (выполняются + ждут). Сверх лимита — сразу 503.
+HASH_MAX_QUEUE = int(os.getenv("HASH_MAX_QUEUE", str(HASH_WORKERS * 8)))
+HASH_RETRY_AFTER = int(os.getenv("HASH_RETRY_AFTER", "1"))  # секунды, для заголовка Retry-After
+
+# --- HTTP-кэш каталога (GET /stores/, GET /stores/{id}/products) ---
+
+# Сериализованные ответы каталога в LRU внутри процесса
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "2048"))
+
+# Время жизни тела ответа в LRU, секунды. Версии каталога хранятся в памяти процесса,
+# поэтому при нескольких воркерах изменение, сделанное в другом воркере, станет видно
+# не позже чем через это время: ответ построится заново, и при отличии от прежнего сменится ETag.
+CATALOG_CACHE_TTL = int(os.getenv("CATALOG_CACHE_TTL", "30"))
+
+# max-age для Cache-Control: 0 — браузер всегда перепроверяет ответ через If-None-Match
+CATALOG_CACHE_MAX_AGE = int(os.getenv("CATALOG_CACHE_MAX_AGE", "0"))
+
+# --- Импорт товаров ---
+
+# Сколько строк вставлять в одной транзакции при потоковом импорте
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+
+# Сколько ошибок по строкам возвращать в отчете (остальные только считаются)
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+
+# --- Учет SQL-запросов по HTTP-запросам ---
+
+# Считать запросы, время в БД и строки на каждый HTTP-запрос и отдавать их в Server-Timing
+SQL_STATS = env_bool("SQL_STATS", True)
+
+# Одинаковый SQL, выполненный в одном запросе столько раз и больше, — подозрение на N+1
+SQL_N1_THRESHOLD = int(os.getenv("SQL_N1_THRESHOLD", "5"))
+
+# Предупреждать, если один HTTP-запрос выполнил больше SQL-запросов (0 — не предупреждать)
+SQL_MAX_QUERIES_WARN = int(os.getenv("SQL_MAX_QUERIES_WARN", "50"))
+
+# --- Метрики Prometheus (GET /metrics) ---
+
+METRICS_ENABLED = env_bool("METRICS_ENABLED", True)
+
+# Как часто (секунды) обновлять gauge состояния пулов и кэшей между опросами
+METRICS_REFRESH_INTERVAL = float(os.getenv("METRICS_REFRESH_INTERVAL", "1"))
+# Для нескольких воркеров uvicorn задайте PROMETHEUS_MULTIPROC_DIR — см. api/metrics.py
+
+# --- События заказов (SSE, GET /events/orders) ---
+
+# Брокер событий: "local" — в памяти процесса (один воркер), или "пакет.модуль:Класс"
+# с реализацией events.Broker (например, поверх Redis pub/sub) для нескольких воркеров
+EVENTS_BROKER = os.getenv("EVENTS_BROKER", "local")
+
+# Сколько неотправленных событий держать на подписчика. Медленный клиент при переполнении
+# получает событие resync и перезапрашивает заказы целиком.
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+
+# Интервал комментария-пинга в потоке SSE, секунды (держит соединение через прокси)
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "15"))
+
+# --- Архив заказов (python -m api.archive run, см. archive.py) ---
+
+# Заказы в статусах DELIVERED / CANCELLED старше стольких дней переносятся в архивные таблицы
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+
+# Заказов в одной транзакции переноса: блокировки держатся только на время одной пачки
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+
+# Пауза между пачками, секунды: между короткими транзакциями успевают пройти запросы приложения
+ARCHIVE_BATCH_PAUSE = float(os.getenv("ARCHIVE_BATCH_PAUSE", "0.05"))
+
+# --- Идемпотентность оформления заказа (заголовок Idempotency-Key, см. idempotency.py) ---
+
+# Сколько секунд ключ защищает от повторного оформления (повтор отдает исходный ответ)
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+
+# Ответы по недавним ключам в памяти процесса: повтор в тот же воркер обходится без БД
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+
+# --- Ограничение нагрузки (rate limit и лимиты одновременных запросов, см. rate_limit.py) ---
+
+# Выключено по умолчанию. Запросы без токена (в том числе вход и регистрация) считаются по IP
+# клиента: за прокси это адрес из X-Forwarded-For, если прокси указан в WEB_FORWARDED_ALLOW_IPS,
+# иначе адрес самого прокси — и все пользователи делят один бакет. Пользователи за одним NAT
+# тоже делят бакет auth; закладывайте это в RATE_LIMIT_AUTH_*.
+RATE_LIMIT_ENABLED = env_bool("RATE_LIMIT_ENABLED", False)
+
+# Хранилище бакетов: "memory" — в памяти процесса (лимит считается отдельно в каждом воркере),
+# или "пакет.модуль:Класс" с реализацией rate_limit.RateLimitStore (например, поверх Redis),
+# чтобы лимит пользователя был общим для всех воркеров
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "memory")
+
+# Сколько ключей (пользователей / IP) держит хранилище "memory"; самые давние вытесняются
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+# Бакеты по классам маршрутов: RATE — запросов в секунду в среднем, BURST — емкость бакета.
+# auth — вход и регистрация (по IP), write — остальные изменяющие запросы (оформление заказа,
+# смена статуса, товары и импорт), read — чтение. write и read считаются по id пользователя
+# из токена, без токена — по IP. 0 в RATE — без лимита.
+RATE_LIMIT_AUTH_RATE = float(os.getenv("RATE_LIMIT_AUTH_RATE", "1"))
+RATE_LIMIT_AUTH_BURST = int(os.getenv("RATE_LIMIT_AUTH_BURST", "10"))
+RATE_LIMIT_WRITE_RATE = float(os.getenv("RATE_LIMIT_WRITE_RATE", "5"))
+RATE_LIMIT_WRITE_BURST = int(os.getenv("RATE_LIMIT_WRITE_BURST", "20"))
+RATE_LIMIT_READ_RATE = float(os.getenv("RATE_LIMIT_READ_RATE", "50"))
+RATE_LIMIT_READ_BURST = int(os.getenv("RATE_LIMIT_READ_BURST", "100"))
+
+# Запросов класса, одновременно обрабатываемых воркером; лишние сразу получают 503 (0 — без лимита).
+# auth держит bcrypt (у него своя очередь, HASH_MAX_QUEUE), write — соединения и блокировки БД.
+CONCURRENCY_AUTH = int(os.getenv("CONCURRENCY_AUTH", "0"))
+CONCURRENCY_WRITE = int(os.getenv("CONCURRENCY_WRITE", "32"))
+CONCURRENCY_READ = int(os.getenv("CONCURRENCY_READ", "0"))
+
+# Retry-After (секунды) для 503 при превышении лимита одновременных запросов
+CONCURRENCY_RETRY_AFTER = int(os.getenv("CONCURRENCY_RETRY_AFTER", "1"))
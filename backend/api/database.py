@@ -1,17 +1,125 @@
-from sqlalchemy import create_engine
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
 from sqlalchemy.ext.declarative import declarative_base
 
-# Создаем подключение к SQLite. Файл 'sql_app.db' будет создан в корне
-SQLALCHEMY_DATABASE_URL = "sqlite:///./sql_app.db"
+from . import config, metrics
+
+# URL подключения берется из настроек (по умолчанию SQLite, файл 'sql_app.db' в корне)
+SQLALCHEMY_DATABASE_URL = config.DATABASE_URL
+
+
+class _TimedCheckout:
+    """Примесь к пулу: замеряет ожидание соединения при checkout."""
+
+    engine_name = "default"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.db_pool_checkout_wait.labels(self.engine_name).observe(time.perf_counter() - started)
+
+    def recreate(self):
+        # dispose() пересоздает пул — имя движка для метрик переносим
+        pool = super().recreate()
+        pool.engine_name = self.engine_name
+        return pool
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(url: str) -> dict:
+    """Параметры create_engine/create_async_engine для данного URL."""
+    url = make_url(url)
+    options = {
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+    }
+
+    if url.get_backend_name() == "sqlite":
+        # connect_args нужен только для SQLite, чтобы разрешить многопоточные запросы
+        options["connect_args"] = {"check_same_thread": False}
+        if url.database in (None, "", ":memory:"):
+            # In-memory база живет в одном соединении: делим его между потоками
+            options["poolclass"] = StaticPool
+            return options
+
+    options.update(
+        poolclass=TimedAsyncAdaptedQueuePool if url.get_dialect().is_async else TimedQueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+    )
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Настраивает каждое новое соединение SQLite (WAL, busy_timeout, кэш, mmap)."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}")
+    # Отрицательное значение cache_size задается в килобайтах
+    cursor.execute(f"PRAGMA cache_size=-{config.SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE}")
+    cursor.close()
+
+
+# Счетчики событий пула по движкам: видно, насколько пул загружен
+pool_counters = {}
+
+
+def _instrument(engine, name: str):
+    """Подключает PRAGMA для SQLite и счетчики событий пула."""
+    engine.pool.engine_name = name
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+
+    counters = pool_counters[name] = {"connects": 0, "checkouts": 0, "checkins": 0, "invalidations": 0}
 
-# connect_args нужен только для SQLite, чтобы разрешить многопоточные запросы
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+    def on_connect(*args):
+        counters["connects"] += 1
 
-# Создаем класс SessionLocal, который будет использоваться для создания сессий
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    def on_checkout(*args):
+        counters["checkouts"] += 1
+
+    def on_checkin(*args):
+        counters["checkins"] += 1
+
+    def on_invalidate(*args):
+        counters["invalidations"] += 1
+
+    event.listen(engine, "connect", on_connect)
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", on_checkin)
+    event.listen(engine, "invalidate", on_invalidate)
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+_instrument(engine, "sync")
+
+# Создаем класс SessionLocal, который будет использоваться для создания сессий.
+# expire_on_commit=False: после commit загруженные объекты остаются пригодными для ответа,
+# без refresh и повторных SELECT (сессия живет в пределах одного запроса)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+
+# Реплики только для чтения (DB_REPLICA_URLS); выбор реплики для запроса — в replicas.py
+replica_engines = []
+for _index, _url in enumerate(config.DB_REPLICA_URLS):
+    replica_engines.append(create_engine(_url, **engine_options(_url)))
+    _instrument(replica_engines[-1], f"replica{_index}")
 
 # Базовый класс для моделей SQLAlchemy
 Base = declarative_base()
@@ -22,4 +130,63 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# --- Асинхронный режим (DB_ASYNC=1) ---
+
+def make_async_url(url: str) -> str:
+    """Подставляет асинхронный драйвер в синхронный URL."""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+
+async_engine = None
+AsyncSessionLocal = None
+async_replica_engines = []
+
+if config.DB_ASYNC:
+    ASYNC_DATABASE_URL = config.ASYNC_DATABASE_URL or make_async_url(SQLALCHEMY_DATABASE_URL)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+    _instrument(async_engine.sync_engine, "async")
+
+    # expire_on_commit=False: после commit атрибуты не истекают, и ответ можно
+    # сериализовать вне сессии без неявных (в async недопустимых) догрузок
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    for _index, _url in enumerate(config.DB_REPLICA_URLS):
+        _url = make_async_url(_url)
+        async_replica_engines.append(create_async_engine(_url, **engine_options(_url)))
+        _instrument(async_replica_engines[-1].sync_engine, f"async_replica{_index}")
+
+
+# Dependency для получения асинхронной сессии БД в async-роутерах
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_pool_stats() -> dict:
+    """Состояние пулов соединений: размер, занятые соединения, overflow и счетчики событий."""
+    stats = {}
+    engines = {"sync": engine}
+    if async_engine is not None:
+        engines["async"] = async_engine.sync_engine
+    for current_engine in replica_engines + [replica.sync_engine for replica in async_replica_engines]:
+        engines[current_engine.pool.engine_name] = current_engine
+
+    for name, current_engine in engines.items():
+        pool = current_engine.pool
+        pool_stats = {"pool": type(pool).__name__, "status": pool.status()}
+        # size/checkedout/overflow есть только у QueuePool
+        for attr in ("size", "checkedout", "overflow"):
+            if hasattr(pool, attr):
+                pool_stats[attr] = getattr(pool, attr)()
+        if "size" in pool_stats:
+            pool_stats["max_overflow"] = config.DB_MAX_OVERFLOW
+        pool_stats.update(pool_counters[name])
+        stats[name] = pool_stats
+    return stats
@@ -0,0 +1,141 @@
+# events.py
+# Публикация событий заказов подписчикам (поток SSE GET /events/orders).
+# Каналы: buyer:<id> — заказы покупателя, store:<id> — заказы с товарами магазина.
+# Обработчики публикуют после commit; доставка не блокирует их: у каждого подписчика
+# своя ограниченная очередь в event loop, при переполнении — событие resync.
+import asyncio
+import importlib
+import itertools
+import json
+import threading
+from abc import ABC, abstractmethod
+from typing import Iterable, List, Optional, Set
+
+from . import config, metrics
+
+RESYNC = "resync"
+
+
+class Subscription:
+    """Подписка одного клиента: очередь событий в его event loop."""
+
+    def __init__(self, channels: Iterable[str], maxsize: int):
+        self.channels = frozenset(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def offer(self, message: str) -> None:
+        """Кладет событие в очередь (вызывается в event loop подписчика)."""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Клиент не успевает читать: выбрасываем накопленное, он перезапросит все целиком
+            metrics.events_dropped.inc(self.queue.qsize() + 1)
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(format_event(RESYNC, {}))
+
+    async def get(self, timeout: float) -> Optional[str]:
+        """Следующее событие или None, если за timeout секунд ничего не пришло."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broker(ABC):
+    """
+    Интерфейс брокера. publish может вызываться из любого потока и не должен блокировать;
+    subscribe/unsubscribe — из event loop. Реализация для нескольких воркеров пересылает
+    сообщения через внешний pub/sub и в каждом процессе раздает их локальным подпискам.
+    Реализация без какого-либо из методов не создается (TypeError при загрузке EVENTS_BROKER).
+    """
+
+    @abstractmethod
+    def publish(self, channels: Iterable[str], message: str) -> None:
+        ...
+
+    @abstractmethod
+    def subscribe(self, channels: Iterable[str]) -> Subscription:
+        ...
+
+    @abstractmethod
+    def unsubscribe(self, subscription: Subscription) -> None:
+        ...
+
+
+class LocalBroker(Broker):
+    """Брокер в памяти процесса: события видят только подписчики этого воркера."""
+
+    def __init__(self, queue_size: int = config.EVENTS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channels: Iterable[str], message: str) -> None:
+        # Подписка на несколько каналов сообщения получает его один раз
+        with self._lock:
+            targets: Set[Subscription] = set()
+            for channel in channels:
+                targets.update(self._channels.get(channel, ()))
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, message)
+            except RuntimeError:
+                # Event loop подписчика уже закрыт
+                pass
+
+    def subscribe(self, channels: Iterable[str]) -> Subscription:
+        subscription = Subscription(channels, self.queue_size)
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels.setdefault(channel, set()).add(subscription)
+        metrics.events_subscribers.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+        metrics.events_subscribers.dec()
+
+
+def _load_broker(spec: str) -> Broker:
+    if spec == "local":
+        return LocalBroker()
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+broker: Broker = _load_broker(config.EVENTS_BROKER)
+
+# Номер события в пределах процесса (поле id в SSE)
+_event_ids = itertools.count(1)
+
+
+def format_event(event_type: str, data: dict) -> str:
+    """Сообщение в формате text/event-stream."""
+    return f"id: {next(_event_ids)}\nevent: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def buyer_channel(user_id: int) -> str:
+    return f"buyer:{user_id}"
+
+
+def store_channel(store_id: int) -> str:
+    return f"store:{store_id}"
+
+
+def publish_order(event_type: str, order, store_ids: Iterable[int]) -> None:
+    """
+    Публикует заказ (schemas.Order) покупателю и магазинам, чьи товары в нем есть.
+    Сериализуется один раз для всех подписчиков; store_ids — все магазины заказа.
+    """
+    store_ids = sorted(set(store_ids))
+    data = dict(order.model_dump(mode="json"), store_ids=store_ids)
+    channels: List[str] = [buyer_channel(order.buyer_id)] + [store_channel(store_id) for store_id in store_ids]
+    broker.publish(channels, format_event(event_type, data))
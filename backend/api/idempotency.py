@@ -0,0 +1,167 @@
+# idempotency.py
+# Ключи идемпотентности для POST /orders/create (заголовок Idempotency-Key).
+# Клиент, не дождавшийся ответа, повторяет запрос с тем же ключом и получает исходный ответ:
+# без повторного чтения товаров, вставок и списания остатков.
+#
+# Ключ хранится в таблице idempotency_keys (общей для всех воркеров) и в LRU процесса.
+# Запись ключа вставляется в транзакции заказа, поэтому из параллельных дублей
+# заказ создает ровно один, остальные получают нарушение первичного ключа и отдают его заказ.
+# Вместе с ключом в той же транзакции сохраняется тело ответа: повтор возвращает его точно,
+# даже если статус заказа или остатки товаров с тех пор изменились.
+#
+# Очистка просроченных ключей (например, по cron):
+#     python -m api.idempotency purge
+import argparse
+import hashlib
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from fastapi import HTTPException, status
+from pydantic import TypeAdapter
+from sqlalchemy import delete, insert, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+from starlette.responses import Response
+
+from . import config, models, responses, schemas
+from .cache import TTLCache
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+# (user_id, key) -> (отпечаток корзины, тело ответа)
+_responses = TTLCache(maxsize=config.IDEMPOTENCY_CACHE_SIZE, ttl=config.IDEMPOTENCY_TTL)
+
+_order_adapter = TypeAdapter(schemas.Order)
+
+
+def fingerprint(quantities: Dict[int, int]) -> str:
+    """Отпечаток корзины (после объединения позиций): товар и количество, без учета порядка."""
+    payload = ",".join(f"{product_id}:{quantity}" for product_id, quantity in sorted(quantities.items()))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _check_fingerprint(stored: str, request_hash: str) -> None:
+    if stored != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"{HEADER} was already used with a different cart.",
+        )
+
+
+def _replayed(body: bytes) -> Response:
+    return Response(
+        body, status_code=status.HTTP_201_CREATED, media_type="application/json",
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def remember(user_id: int, key: str, request_hash: str, body: bytes) -> None:
+    """Кладет ответ на оформленный заказ в LRU процесса (после commit)."""
+    _responses.set((user_id, key), (request_hash, body))
+
+
+def replay(db: Session, user_id: int, key: str, request_hash: str) -> Optional[Response]:
+    """
+    Ответ на повтор запроса с тем же ключом или None, если ключ новый (или просрочен).
+    Из LRU — без запросов к БД; иначе — тело, сохраненное с ключом (другой воркер или после рестарта).
+    """
+    cached = _responses.get((user_id, key))
+    if cached is not None:
+        _check_fingerprint(cached[0], request_hash)
+        return _replayed(cached[1])
+
+    record = (
+        db.query(models.IdempotencyKey)
+        .filter(models.IdempotencyKey.user_id == user_id, models.IdempotencyKey.key == key)
+        .first()
+    )
+    if record is None:
+        return None
+    if record.created_at < datetime.utcnow() - timedelta(seconds=config.IDEMPOTENCY_TTL):
+        # Просроченный ключ освобождаем в транзакции нового заказа
+        db.delete(record)
+        db.flush()
+        return None
+    _check_fingerprint(record.request_hash, request_hash)
+    if record.response_body is not None:
+        remember(user_id, key, request_hash, record.response_body)
+        return _replayed(record.response_body)
+
+    # Ключ записан до появления response_body: собираем ответ из текущего состояния заказа
+    order = None
+    for order_model, item_model in (
+            (models.Order, models.OrderItem), (models.ArchivedOrder, models.ArchivedOrderItem),
+    ):
+        order = (
+            db.query(order_model)
+            .options(joinedload(order_model.items).joinedload(item_model.product))
+            .filter(order_model.id == record.order_id)
+            .first()
+        )
+        if order is not None:
+            break
+    if order is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
+
+    body = responses.serialize(_order_adapter, order)
+    remember(user_id, key, request_hash, body)
+    return _replayed(body)
+
+
+def claim(db: Session, user_id: int, key: str, request_hash: str, order_id: int) -> Optional[Response]:
+    """
+    Записывает ключ в транзакции нового заказа (до списания остатков).
+    Если параллельный запрос с тем же ключом зафиксировал свой заказ первым, откатывает
+    транзакцию и возвращает ответ с его заказом; иначе None — можно продолжать.
+    """
+    try:
+        db.execute(insert(models.IdempotencyKey).values(
+            user_id=user_id, key=key, request_hash=request_hash, order_id=order_id,
+            created_at=datetime.utcnow(),
+        ))
+    except IntegrityError:
+        db.rollback()
+        replayed = replay(db, user_id, key, request_hash)
+        if replayed is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"A request with this {HEADER} is still being processed. Retry later.",
+            )
+        return replayed
+    return None
+
+
+def save_response(db: Session, user_id: int, key: str, body: bytes) -> None:
+    """Сохраняет тело ответа на оформленный заказ с ключом (в транзакции заказа, до commit)."""
+    db.execute(
+        update(models.IdempotencyKey)
+        .where(models.IdempotencyKey.user_id == user_id, models.IdempotencyKey.key == key)
+        .values(response_body=body)
+    )
+
+
+def purge_expired(engine: Engine) -> int:
+    """Удаляет ключи старше IDEMPOTENCY_TTL (по индексу created_at)."""
+    cutoff = datetime.utcnow() - timedelta(seconds=config.IDEMPOTENCY_TTL)
+    with engine.begin() as connection:
+        return connection.execute(
+            delete(models.IdempotencyKey).where(models.IdempotencyKey.created_at < cutoff)
+        ).rowcount
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ключи идемпотентности оформления заказа")
+    parser.add_argument("command", choices=["purge"])
+    parser.parse_args()
+
+    from .database import engine
+    from .migrate import migrate
+
+    migrate(engine)
+    print(f"Purged {purge_expired(engine)} expired idempotency keys.")
+
+
+if __name__ == "__main__":
+    main()
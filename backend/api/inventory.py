@@ -0,0 +1,70 @@
+# inventory.py
+# Остатки товаров. Резервирование при оформлении заказа — один условный UPDATE
+# по всем позициям корзины (stock = stock - q WHERE stock >= q): без чтения-проверки-записи,
+# поэтому параллельные покупатели одного товара не могут продать больше остатка,
+# а строки блокируются только на время от UPDATE до commit.
+# stock = NULL — остаток не ведется (товар без ограничений).
+from typing import Dict
+
+from fastapi import HTTPException, status
+from sqlalchemy import case, or_, update
+from sqlalchemy.orm import Session
+
+from . import models
+
+
+def not_enough_stock(product_ids) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Not enough stock for products: {', '.join(map(str, sorted(product_ids)))}.",
+    )
+
+
+def _quantity_by_id(quantities: Dict[int, int]):
+    return case(quantities, value=models.Product.id)
+
+
+def reserve(db: Session, quantities: Dict[int, int]) -> Dict[int, int]:
+    """
+    Списывает остатки по {product_id: количество} одним UPDATE ... RETURNING.
+    Все или ничего: если хотя бы одного товара не хватает, транзакция откатывается
+    (вместе со всем, что в ней уже сделано) и выбрасывается 409.
+    Возвращает новые остатки {product_id: stock}. Товары без учета остатка лучше не передавать:
+    UPDATE заблокирует их строки до конца транзакции.
+    """
+    if not quantities:
+        return {}
+
+    statement = (
+        update(models.Product)
+        .where(models.Product.id.in_(quantities.keys()))
+        # NULL - q остается NULL: товары без учета остатка проходят условие и не меняются
+        .where(or_(models.Product.stock.is_(None), models.Product.stock >= _quantity_by_id(quantities)))
+        .values(stock=models.Product.stock - _quantity_by_id(quantities))
+        .returning(models.Product.id, models.Product.stock)
+        .execution_options(synchronize_session=False)
+    )
+    remaining = {product_id: stock for product_id, stock in db.execute(statement)}
+
+    if len(remaining) != len(quantities):
+        db.rollback()
+        raise not_enough_stock(set(quantities) - set(remaining))
+    return remaining
+
+
+def release(db: Session, quantities: Dict[int, int]) -> Dict[int, int]:
+    """
+    Возвращает на склад {product_id: количество} (отмена заказа). Товары без учета остатка не трогает.
+    Возвращает новые остатки {product_id: stock}.
+    """
+    if not quantities:
+        return {}
+    statement = (
+        update(models.Product)
+        .where(models.Product.id.in_(quantities.keys()))
+        .where(models.Product.stock.is_not(None))
+        .values(stock=models.Product.stock + _quantity_by_id(quantities))
+        .returning(models.Product.id, models.Product.stock)
+        .execution_options(synchronize_session=False)
+    )
+    return {product_id: stock for product_id, stock in db.execute(statement)}
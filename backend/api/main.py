@@ -1,18 +1,32 @@
 # main.py
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
 from fastapi.middleware.cors import CORSMiddleware # Импорт middleware
 
 from .schemas import Store, StoreCreate
-from .database import engine
-from .routers import users, stores, orders
-from . import models
+from .auth_utils import CurrentUser
+from .database import engine, get_pool_stats
+from .routers import users, stores, orders, products, events
+from . import config, metrics, migrate, password_pool, replicas
+from .query_stats import QueryStatsMiddleware
+from .rate_limit import RateLimitMiddleware
 
 
-# Создаем таблицы в БД (если их нет)
-models.Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Схема БД создается здесь, а не при импорте модуля: импорт остается без побочных
+    # эффектов, а api.server выполняет миграцию один раз до запуска воркеров (DB_AUTO_MIGRATE=0)
+    if config.DB_AUTO_MIGRATE:
+        await run_in_threadpool(migrate.migrate_with_lock, engine)
+    yield
+    password_pool.shutdown()
+    metrics.mark_process_dead()
 
-app = FastAPI(title="Агрегатор Магазинов Одежды")
+
+app = FastAPI(title="Агрегатор Магазинов Одежды", lifespan=lifespan)
 
 origins = [
     "http://localhost:3000",  # Разрешаем запросы с вашего React-фронтенда
@@ -26,8 +40,14 @@ allowed_headers = [
     "Accept",
     "Accept-Language",
     "Content-Language",
+    "Idempotency-Key",     # Повтор оформления заказа без дубля (см. idempotency.py)
 ]
 
+# Rate limit и лимиты одновременных запросов (см. rate_limit.py). Добавляется до CORS,
+# чтобы оказаться внутри него: ответы 429 / 503 тоже получают CORS-заголовки и видны фронтенду
+if config.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -36,23 +56,77 @@ app.add_middleware(
     allow_headers=allowed_headers, # <--- ИСПОЛЬЗУЕМ ЯВНЫЙ СПИСОК
 )
 
-# Подключение роутеров
-app.include_router(users.router)
-app.include_router(stores.router)
-app.include_router(orders.router)
+# Число SQL-запросов и время в БД на каждый запрос — в заголовке Server-Timing
+if config.SQL_STATS:
+    app.add_middleware(QueryStatsMiddleware)
 
-# Добавим заглушку для магазинов (для проверки функционала после аутентификации)
+# Латентность, коды ответов и запросы в работе по шаблонам маршрутов для /metrics
+if config.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Добавим заглушку для магазинов (для проверки функционала после аутентификации).
+# Объявлена до роутеров: иначе ее перехватил бы маршрут GET /stores/{store_id}
 @app.get("/stores/secret")
-def read_secret_stores(current_user: models.User = Depends(users.get_current_user)):
+def read_secret_stores(current_user: CurrentUser = Depends(users.get_current_user)):
     """Пример защищенного эндпоинта. Доступен только аутентифицированным."""
     return {"message": f"Hello {current_user.username} ({current_user.role.name}), you can see the stores now."}
 
+
+# Подключение роутеров.
+# В асинхронном режиме async-версии подключаются первыми и перекрывают
+# одноименные синхронные маршруты; остальные маршруты остаются синхронными.
+if config.DB_ASYNC:
+    from .routers.aio import users as aio_users, stores as aio_stores, orders as aio_orders
+
+    app.include_router(aio_users.router)
+    app.include_router(aio_stores.router)
+    app.include_router(aio_orders.router)
+
+app.include_router(users.router)
+app.include_router(stores.router)
+app.include_router(orders.router)
+app.include_router(products.router)
+app.include_router(events.router)
+
+if config.DB_ASYNC:
+    # Синхронные маршруты, перекрытые async-версиями, никогда не сработают — убираем их,
+    # чтобы не было дублей в OpenAPI
+    registered_routes = set()
+    for route in list(app.router.routes):
+        if isinstance(route, APIRoute):
+            key = (route.path, frozenset(route.methods))
+            if key in registered_routes:
+                app.router.routes.remove(route)
+            registered_routes.add(key)
+
 @app.get("/")
 def read_root():
     """Проверка доступности API."""
     return {"message": "API работает успешно. Перейдите на /docs для просмотра документации."}
 
 
+@app.get("/health/db")
+def read_db_stats():
+    """Состояние пулов соединений с БД (занятость, overflow, счетчики подключений) и реплик."""
+    stats = get_pool_stats()
+    if config.DB_REPLICA_URLS:
+        stats["replicas"] = replicas.get_stats()
+    return stats
+
+
+@app.get("/health/passwords")
+def read_password_pool_stats():
+    """Пул bcrypt: глубина очереди, отказы (503) и задержка хеширования."""
+    return password_pool.get_stats()
+
+
+if config.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def read_metrics():
+        """Метрики в формате Prometheus."""
+        return metrics.render()
+
+
 def main():
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=5001)
\ No newline at end of file
+    from .server import main as serve
+    serve()
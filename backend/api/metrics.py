@@ -0,0 +1,187 @@
+# metrics.py
+# Метрики в формате Prometheus (GET /metrics).
+# Счетчики и гистограммы обновляются на месте событий, состояние пулов и кэшей
+# (gauge) — не чаще раза в METRICS_REFRESH_INTERVAL секунд из middleware и при опросе.
+#
+# При нескольких воркерах uvicorn задайте PROMETHEUS_MULTIPROC_DIR (пустой каталог,
+# общий для воркеров): значения пишутся в mmap-файлы, а /metrics любого воркера
+# отдает сумму по всем процессам. api.server создает и очищает такой каталог сам.
+import os
+import threading
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import REGISTRY, multiprocess
+from starlette.responses import Response
+
+from . import config
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
+HASH_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 2.0, 5.0, 10.0)
+
+# Маршрут для запросов, не попавших ни в один роут (чтобы не плодить метки по путям)
+UNMATCHED_ROUTE = "<unmatched>"
+
+# --- HTTP ---
+
+http_requests = Counter(
+    "http_requests_total", "HTTP-запросы по маршруту и коду ответа", ["method", "route", "status"],
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса", ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress", "Запросы, обрабатываемые прямо сейчас", multiprocess_mode="livesum",
+)
+
+# --- БД ---
+
+db_pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Ожидание соединения из пула", ["engine"], buckets=POOL_WAIT_BUCKETS,
+)
+db_pool_checked_out = Gauge(
+    "db_pool_checked_out", "Занятые соединения пула", ["engine"], multiprocess_mode="livesum",
+)
+db_pool_overflow = Gauge(
+    "db_pool_overflow", "Соединения сверх pool_size", ["engine"], multiprocess_mode="livesum",
+)
+
+# --- Пул потоков Starlette (синхронные обработчики) ---
+
+threadpool_busy = Gauge(
+    "threadpool_busy_threads", "Занятые потоки пула для синхронных обработчиков", multiprocess_mode="livesum",
+)
+threadpool_size = Gauge(
+    "threadpool_size_threads", "Размер пула потоков", multiprocess_mode="livesum",
+)
+
+# --- Ограничение нагрузки (rate_limit.py) ---
+
+requests_rejected = Counter(
+    "http_requests_rejected_total", "Запросы, отклоненные до обработки (429 — rate limit, 503 — лимит одновременных)",
+    ["route_class", "reason"],
+)
+
+# --- bcrypt ---
+
+password_hash_duration = Histogram(
+    "password_hash_duration_seconds", "Время операции bcrypt с учетом очереди", ["operation"],
+    buckets=HASH_BUCKETS,
+)
+password_hash_rejected = Counter(
+    "password_hash_rejected_total", "Операции bcrypt, отклоненные с 503 из-за переполнения очереди",
+)
+password_hash_in_flight = Gauge(
+    "password_hash_in_flight", "Операции bcrypt в пуле (выполняются + ждут)", multiprocess_mode="livesum",
+)
+
+# --- События заказов (SSE) ---
+
+events_subscribers = Gauge(
+    "events_subscribers", "Открытые потоки событий заказов", multiprocess_mode="livesum",
+)
+events_dropped = Counter(
+    "events_dropped_total", "События, выброшенные из-за переполнения очереди подписчика",
+)
+
+# --- Кэши (накопленные значения процесса; hit ratio = hits / (hits + misses)) ---
+
+cache_hits = Gauge("cache_hits", "Попадания в кэш", ["cache"], multiprocess_mode="livesum")
+cache_misses = Gauge("cache_misses", "Промахи кэша", ["cache"], multiprocess_mode="livesum")
+cache_entries = Gauge("cache_entries", "Записей в кэше", ["cache"], multiprocess_mode="livesum")
+
+
+_last_refresh = 0.0
+_refresh_lock = threading.Lock()
+
+
+def refresh_state(force: bool = False) -> None:
+    """Обновляет gauge состояния пулов и кэшей (не чаще раза в METRICS_REFRESH_INTERVAL)."""
+    global _last_refresh
+    now = time.monotonic()
+    if not force and now - _last_refresh < config.METRICS_REFRESH_INTERVAL:
+        return
+    if not _refresh_lock.acquire(blocking=False):
+        return
+    try:
+        _last_refresh = now
+        # Импорт здесь: эти модули сами пишут в метрики при импорте и работе
+        from .auth_utils import user_cache
+        from .catalog_cache import get_stats as catalog_stats
+        from .database import get_pool_stats
+
+        for name, pool_stats in get_pool_stats().items():
+            if "checkedout" in pool_stats:
+                db_pool_checked_out.labels(name).set(pool_stats["checkedout"])
+                db_pool_overflow.labels(name).set(max(pool_stats["overflow"], 0))
+
+        for name, stats in (("user", user_cache.stats()), ("catalog", catalog_stats())):
+            cache_hits.labels(name).set(stats["hits"])
+            cache_misses.labels(name).set(stats["misses"])
+            cache_entries.labels(name).set(stats["size"])
+
+        try:
+            from anyio.to_thread import current_default_thread_limiter
+            limiter = current_default_thread_limiter()
+        except RuntimeError:
+            # Вне event loop (например, из потока) лимитер недоступен
+            pass
+        else:
+            threadpool_busy.set(limiter.borrowed_tokens)
+            threadpool_size.set(limiter.total_tokens)
+    finally:
+        _refresh_lock.release()
+
+
+def render() -> Response:
+    """Ответ GET /metrics."""
+    refresh_state(force=True)
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead() -> None:
+    """Убирает livesum-gauge завершившегося воркера из суммы (при остановке приложения)."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: длительность, коды ответа и число запросов в работе по шаблонам маршрутов."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_progress.dec()
+            route = scope.get("route")
+            route = route.path if route is not None else UNMATCHED_ROUTE
+            method = scope["method"]
+            http_request_duration.labels(method, route).observe(time.perf_counter() - started)
+            http_requests.labels(method, route, str(status_code)).inc()
+            refresh_state()
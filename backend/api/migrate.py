@@ -0,0 +1,88 @@
+# migrate.py
+# Создание и дополнение схемы БД. Раньше выполнялось при импорте api.main, из-за чего
+# каждый воркер при старте гонялся за DDL с остальными и дольше поднимался.
+#
+# В продакшене схема обновляется один раз перед запуском воркеров:
+#     python -m api.migrate
+# (api.server делает это сам). При DB_AUTO_MIGRATE=1 воркер выполняет то же
+# при старте (lifespan), под блокировкой — одновременно DDL выполняет только один процесс.
+import os
+import tempfile
+from contextlib import contextmanager
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from . import config, models, search
+
+# Ключ pg_advisory_lock для миграции (произвольное число, общее для всех воркеров)
+PG_LOCK_KEY = 727_001
+
+# Файл блокировки для SQLite: воркеры одной машины берут на него flock
+DEFAULT_LOCK_FILE = os.path.join(tempfile.gettempdir(), "shop-api-migrate.lock")
+
+
+def migrate(engine: Engine) -> None:
+    """Создает недостающие таблицы, столбцы, индексы и поисковый индекс. Идемпотентна."""
+    # Создаем таблицы в БД (если их нет)
+    models.Base.metadata.create_all(bind=engine)
+
+    # create_all не добавляет новые столбцы и индексы в уже существующие таблицы — создаем недостающие
+    # (только столбцы, допускающие NULL: их можно добавить без значения по умолчанию)
+    inspector = inspect(engine)
+    for table in models.Base.metadata.sorted_tables:
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns and column.nullable:
+                with engine.begin() as connection:
+                    connection.execute(text(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                    ))
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+    # Полнотекстовый индекс товаров (FTS5 / GIN) и триггеры его синхронизации
+    search.ensure_search_index(engine)
+
+
+@contextmanager
+def migration_lock(engine: Engine):
+    """Межпроцессная блокировка на время миграции: pg_advisory_lock в PostgreSQL, flock для SQLite."""
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as connection:
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": PG_LOCK_KEY})
+            try:
+                yield
+            finally:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": PG_LOCK_KEY})
+        return
+
+    try:
+        import fcntl
+    except ImportError:  # Windows: несколько воркеров там не запускаются через fork/flock
+        yield
+        return
+
+    with open(config.DB_MIGRATE_LOCK_FILE or DEFAULT_LOCK_FILE, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def migrate_with_lock(engine: Engine) -> None:
+    """migrate() под межпроцессной блокировкой (вызывается при старте воркера)."""
+    with migration_lock(engine):
+        migrate(engine)
+
+
+def main():
+    from .database import engine
+
+    migrate_with_lock(engine)
+    print("Database schema is up to date.")
+
+
+if __name__ == "__main__":
+    main()
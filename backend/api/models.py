@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, ForeignKey, Float, DateTime
+from sqlalchemy import Column, Integer, String, Enum, ForeignKey, Float, Date, DateTime, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum as PyEnum
@@ -52,6 +52,8 @@ class Product(Base):
     name = Column(String, index=True)
     description = Column(String)
     price = Column(Float)
+    # Остаток на складе; NULL — остаток не ведется. Списывается в inventory.reserve
+    stock = Column(Integer, nullable=True)
 
     # Внешний ключ: Товар принадлежит одному магазину
     store_id = Column(Integer, ForeignKey("stores.id"))
@@ -59,6 +61,13 @@ class Product(Base):
     # Отношения
     store = relationship("Store", back_populates="products")
 
+    # Составные индексы для keyset-пагинации товаров магазина:
+    # по id (сортировка по умолчанию) и по (price, id) (сортировка и фильтр по цене)
+    __table_args__ = (
+        Index("ix_products_store_id_id", "store_id", "id"),
+        Index("ix_products_store_id_price_id", "store_id", "price", "id"),
+    )
+
 
 
 # ... (Модели User, UserRole, Store, Product остаются без изменений) ...
@@ -79,11 +88,20 @@ class Order(Base):
     id = Column(Integer, primary_key=True, index=True)
 
     # Внешний ключ: Заказ принадлежит Покупателю
-    buyer_id = Column(Integer, ForeignKey("users.id"))
+    buyer_id = Column(Integer, ForeignKey("users.id"), index=True)
 
     status = Column(Enum(OrderStatus), default=OrderStatus.PENDING)
     created_at = Column(DateTime, server_default=func.now())
 
+    # created_at забираем через RETURNING сразу при INSERT,
+    # чтобы ответ можно было собрать без повторного SELECT
+    __mapper_args__ = {"eager_defaults": True}
+
+    # Индекс для ленты заказов: сортировка и курсор по (created_at, id)
+    __table_args__ = (
+        Index("ix_orders_created_at_id", "created_at", "id"),
+    )
+
     # Отношения:
     # buyer = relationship("User")  # Обратная связь не нужна, если не будем запрашивать все заказы пользователя
     buyer = relationship("User", back_populates="orders")  # <--- ИСПОЛЬЗУЕМ back_populates="orders"
@@ -99,9 +117,103 @@ class OrderItem(Base):
     price_at_order = Column(Float)  # Цена товара на момент оформления заказа
 
     # Внешние ключи:
-    order_id = Column(Integer, ForeignKey("orders.id"))
+    order_id = Column(Integer, ForeignKey("orders.id"), index=True)
     product_id = Column(Integer, ForeignKey("products.id"))
 
     # Отношения:
     order = relationship("Order", back_populates="items")
-    product = relationship("Product")  # Обратная связь
\ No newline at end of file
+    product = relationship("Product")  # Обратная связь
+
+    # Поиск заказов по товарам магазина: (product_id, order_id) покрывает
+    # подзапрос "какие заказы содержат товары магазина" без чтения самой таблицы
+    __table_args__ = (
+        Index("ix_order_items_product_id_order_id", "product_id", "order_id"),
+    )
+
+
+# 6. Ежедневные агрегаты продаж магазина (аналитика продавца).
+# Обновляются инкрементально в create_order / update_order_status, см. analytics.py.
+# Заказ учитывается в дне его создания и в строке своего текущего статуса.
+class StoreDailyStats(Base):
+    __tablename__ = "store_daily_stats"
+
+    store_id = Column(Integer, ForeignKey("stores.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    status = Column(Enum(OrderStatus), primary_key=True)
+
+    revenue = Column(Float, nullable=False, default=0)     # sum(price_at_order * quantity)
+    units = Column(Integer, nullable=False, default=0)     # sum(quantity)
+    order_count = Column(Integer, nullable=False, default=0)
+
+
+# 7. Ежедневные продажи товара (для топа товаров). Отмененные заказы не учитываются.
+class ProductDailySales(Base):
+    __tablename__ = "product_daily_sales"
+
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
+
+    revenue = Column(Float, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_product_daily_sales_store_id_day", "store_id", "day"),
+    )
+
+
+# 8. Архив завершенных заказов (DELIVERED / CANCELLED старше ARCHIVE_AFTER_DAYS), см. archive.py.
+# Живые таблицы orders / order_items остаются маленькими; заказы переносятся с исходными id,
+# а в ленты попадают только по запросу истории (include_archived).
+class ArchivedOrder(Base):
+    __tablename__ = "orders_archive"
+
+    id = Column(Integer, primary_key=True)  # id исходного заказа
+    buyer_id = Column(Integer, ForeignKey("users.id"), index=True)
+    status = Column(Enum(OrderStatus))
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, server_default=func.now())
+
+    items = relationship("ArchivedOrderItem", back_populates="order")
+
+    # Отличает архивный заказ в ответах API (schemas.Order.archived)
+    archived = True
+
+    __table_args__ = (
+        Index("ix_orders_archive_created_at_id", "created_at", "id"),
+    )
+
+
+class ArchivedOrderItem(Base):
+    __tablename__ = "order_items_archive"
+
+    # Собственный id: в SQLite id удаленных из order_items строк могут быть выданы повторно
+    id = Column(Integer, primary_key=True)
+    quantity = Column(Integer)
+    price_at_order = Column(Float)
+
+    order_id = Column(Integer, ForeignKey("orders_archive.id"), index=True)
+    product_id = Column(Integer, ForeignKey("products.id"))
+
+    order = relationship("ArchivedOrder", back_populates="items")
+    product = relationship("Product")
+
+    __table_args__ = (
+        Index("ix_order_items_archive_product_id_order_id", "product_id", "order_id"),
+    )
+
+
+# 9. Ключи идемпотентности оформления заказа (заголовок Idempotency-Key), см. idempotency.py.
+# Первичный ключ (user_id, key): параллельный дубль получает нарушение уникальности
+# и отдает уже созданный заказ. order_id без внешнего ключа — заказ может уйти в архив.
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    key = Column(String, primary_key=True)
+    request_hash = Column(String, nullable=False)  # Отпечаток корзины: тот же ключ с другой корзиной — 422
+    order_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False, index=True)  # Для TTL и очистки (purge_expired)
+    # Тело исходного ответа 201: повтор отдает его байт в байт. NULL у ключей, записанных до
+    # появления столбца, — их ответ собирается заново из заказа.
+    response_body = Column(LargeBinary, nullable=True)
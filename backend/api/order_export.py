@@ -0,0 +1,140 @@
+# order_export.py
+# Потоковая выгрузка строк заказов магазина в CSV / NDJSON (опционально gzip).
+# Строки читаются из БД порциями (yield_per / серверный курсор), сериализуются
+# и отдаются кусками: память не зависит от объема истории, первый байт уходит сразу.
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Iterator, Optional
+
+from sqlalchemy import select, union_all
+
+from . import models
+from .database import SessionLocal, engine
+
+CSV = "csv"
+NDJSON = "ndjson"
+
+COLUMNS = [
+    "order_id", "created_at", "status", "buyer_id",
+    "product_id", "product_name", "quantity", "price_at_order", "line_total",
+]
+
+FETCH_SIZE = 1000         # строк за одно чтение из курсора
+CHUNK_SIZE = 64 * 1024    # примерный размер отдаваемого куска, байт
+
+
+def _lines(order_model, item_model, store_id: int, date_from: Optional[datetime], date_to: Optional[datetime]):
+    """Строки заказов магазина из живых таблиц или из архива (одинаковые столбцы)."""
+    query = (
+        select(
+            order_model.id.label("order_id"),
+            order_model.created_at,
+            order_model.status,
+            order_model.buyer_id,
+            models.Product.id.label("product_id"),
+            models.Product.name.label("product_name"),
+            item_model.quantity,
+            item_model.price_at_order,
+            item_model.id.label("item_id"),
+        )
+        .join(item_model, item_model.order_id == order_model.id)
+        .join(models.Product, models.Product.id == item_model.product_id)
+        .where(models.Product.store_id == store_id)
+    )
+    if date_from is not None:
+        query = query.where(order_model.created_at >= date_from)
+    if date_to is not None:
+        query = query.where(order_model.created_at < date_to)
+    return query
+
+
+def _rows(
+        store_id: int,
+        date_from: Optional[datetime],
+        date_to: Optional[datetime],
+        include_archived: bool = False,
+        bind=None,
+) -> Iterator[dict]:
+    query = _lines(models.Order, models.OrderItem, store_id, date_from, date_to)
+    if include_archived:
+        # Даты архивных и живых заказов перемежаются — сортируем объединение целиком
+        query = union_all(
+            query, _lines(models.ArchivedOrder, models.ArchivedOrderItem, store_id, date_from, date_to),
+        )
+    query = (
+        query
+        .order_by("created_at", "order_id", "item_id")
+        .execution_options(yield_per=FETCH_SIZE)
+    )
+
+    # Своя сессия: генератор работает уже после выхода из обработчика.
+    # bind — движок сессии обработчика (реплика или основная БД, см. replicas.py)
+    with SessionLocal(bind=bind or engine) as db:
+        for row in db.execute(query):
+            yield {
+                "order_id": row.order_id,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+                "status": row.status.value,
+                "buyer_id": row.buyer_id,
+                "product_id": row.product_id,
+                "product_name": row.product_name,
+                "quantity": row.quantity,
+                "price_at_order": row.price_at_order,
+                "line_total": round(row.quantity * row.price_at_order, 2),
+            }
+
+
+def _text_chunks(
+        store_id: int, data_format: str, date_from, date_to, include_archived: bool, bind=None,
+) -> Iterator[str]:
+    buffer = io.StringIO()
+
+    if data_format == CSV:
+        writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        def write(row):
+            buffer.write(json.dumps(row, ensure_ascii=False))
+            buffer.write("\n")
+
+    # Заголовок (или пустой кусок для NDJSON) отдаем до первого запроса к БД
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    for row in _rows(store_id, date_from, date_to, include_archived, bind):
+        write(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def stream_store_orders(
+        store_id: int,
+        data_format: str,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        compress: bool = False,
+        include_archived: bool = False,
+        bind=None,
+) -> Iterator[bytes]:
+    """Генератор байтов выгрузки для StreamingResponse."""
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 — формат gzip
+
+    for text in _text_chunks(store_id, data_format, date_from, date_to, include_archived, bind):
+        data = text.encode("utf-8")
+        if compressor is not None:
+            # Z_SYNC_FLUSH: каждый кусок сразу уходит клиенту, а не копится в компрессоре
+            data = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+
+    if compressor is not None:
+        yield compressor.flush()
@@ -0,0 +1,121 @@
+# password_pool.py
+# Хеширование и проверка паролей bcrypt в отдельном ограниченном пуле процессов.
+# bcrypt тратит сотни миллисекунд CPU на операцию: в пуле процессов он не занимает
+# потоки Starlette и event loop, а при переполнении очереди запрос сразу получает 503.
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from . import config, metrics
+
+BCRYPT_MAX_LENGTH = 72
+
+
+# --- Функции, выполняемые в процессах пула ---
+
+@lru_cache(maxsize=None)
+def _crypt_context(rounds: int):
+    # Импорт внутри процесса пула: основному процессу passlib для этого не нужен
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+def _hash(password: str, rounds: int) -> str:
+    # Обрезаем пароль до 72 байт, чтобы избежать ошибки ValueError в bcrypt
+    return _crypt_context(rounds).hash(password[:BCRYPT_MAX_LENGTH])
+
+
+def _verify_and_update(password: str, hashed_password: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    # Возвращает новый хеш, если стоимость в хеше отличается от текущей BCRYPT_ROUNDS
+    return _crypt_context(rounds).verify_and_update(password, hashed_password)
+
+
+# --- Пул и метрики ---
+
+_executor: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+
+stats = {
+    "in_flight": 0,        # текущая глубина очереди (выполняются + ждут)
+    "max_in_flight": 0,
+    "completed": 0,
+    "rejected": 0,         # отклонено с 503 из-за переполнения
+    "total_seconds": 0.0,  # суммарное время от постановки в очередь до результата
+    "max_seconds": 0.0,
+}
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            # spawn: дочерние процессы не наследуют потоки и соединения с БД родителя
+            _executor = ProcessPoolExecutor(
+                max_workers=config.HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def shutdown() -> None:
+    """Останавливает пул процессов (при завершении приложения)."""
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+async def _run(operation: str, func, *args):
+    with _lock:
+        if stats["in_flight"] >= config.HASH_MAX_QUEUE:
+            stats["rejected"] += 1
+            metrics.password_hash_rejected.inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service is busy, try again later.",
+                headers={"Retry-After": str(config.HASH_RETRY_AFTER)},
+            )
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+    metrics.password_hash_in_flight.inc()
+
+    started = time.perf_counter()
+    try:
+        return await asyncio.wrap_future(_get_executor().submit(func, *args))
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.password_hash_in_flight.dec()
+        metrics.password_hash_duration.labels(operation).observe(elapsed)
+        with _lock:
+            stats["in_flight"] -= 1
+            stats["completed"] += 1
+            stats["total_seconds"] += elapsed
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+
+
+async def hash_password(password: str) -> str:
+    """Хеширует пароль в пуле процессов."""
+    return await _run("hash", _hash, password, config.BCRYPT_ROUNDS)
+
+
+async def verify_password(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Проверяет пароль в пуле процессов.
+    Возвращает (совпал ли пароль, новый хеш или None, если пересчет не нужен).
+    """
+    return await _run("verify", _verify_and_update, password, hashed_password, config.BCRYPT_ROUNDS)
+
+
+def get_stats() -> dict:
+    """Метрики пула: глубина очереди, отказы, задержка хеширования."""
+    with _lock:
+        result = dict(stats, workers=config.HASH_WORKERS, max_queue=config.HASH_MAX_QUEUE)
+    result["avg_seconds"] = result["total_seconds"] / result["completed"] if result["completed"] else 0.0
+    return result
@@ -0,0 +1,120 @@
+# product_import.py
+# Потоковый разбор CSV / NDJSON для массового импорта товаров.
+# Тело запроса читается по частям: в памяти только текущая запись, а не весь файл.
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from pydantic import ValidationError
+
+from . import schemas
+
+CSV = "csv"
+NDJSON = "ndjson"
+
+# Защита от «бесконечной» записи (например, незакрытой кавычки в CSV)
+MAX_RECORD_LENGTH = 64 * 1024
+
+# Необязательные колонки CSV: пустая ячейка означает «не задано»
+CSV_OPTIONAL_FIELDS = ("stock",)
+
+
+class RecordError(Exception):
+    """Ошибка разбора или валидации одной строки импорта."""
+
+
+def detect_format(content_type: Optional[str]) -> Optional[str]:
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in ("text/csv", "application/csv"):
+        return CSV
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines"):
+        return NDJSON
+    return None
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Режет поток байтов на строки (UTF-8), не дожидаясь конца тела запроса."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    tail = ""
+    async for chunk in chunks:
+        tail += decoder.decode(chunk)
+        *lines, tail = tail.split("\n")
+        for line in lines:
+            yield line + "\n"
+        if len(tail) > MAX_RECORD_LENGTH:
+            raise RecordError(f"Line is longer than {MAX_RECORD_LENGTH} characters.")
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def _iter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    Собирает из строк записи CSV: поле в кавычках может содержать перевод строки.
+    Запись закончена, когда число кавычек в ней четное (экранированная кавычка — "" — не меняет четность).
+    """
+    record = ""
+    async for line in lines:
+        record += line
+        if record.count('"') % 2 == 0:
+            yield record
+            record = ""
+        elif len(record) > MAX_RECORD_LENGTH:
+            raise RecordError(f"Record is longer than {MAX_RECORD_LENGTH} characters (unclosed quote?).")
+    if record:
+        yield record
+
+
+def _validate(data) -> Dict:
+    try:
+        return schemas.ProductCreate.model_validate(data).model_dump()
+    except ValidationError as exc:
+        raise RecordError("; ".join(
+            f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+            for error in exc.errors()
+        ))
+
+
+async def iter_products(chunks: AsyncIterator[bytes], data_format: str) -> AsyncIterator[Tuple[int, object]]:
+    """
+    Отдает пары (номер строки данных, dict для ProductCreate или RecordError).
+    Ошибка в строке не прерывает импорт; ошибка самого потока (RecordError из чтения) — прерывает.
+    """
+    lines = _iter_lines(chunks)
+    row = 0
+
+    if data_format == NDJSON:
+        async for line in lines:
+            if not line.strip():
+                continue
+            row += 1
+            try:
+                yield row, _validate(json.loads(line))
+            except json.JSONDecodeError as exc:
+                yield row, RecordError(f"Invalid JSON: {exc.msg}")
+            except RecordError as exc:
+                yield row, exc
+        return
+
+    header = None
+    async for record in _iter_csv_records(lines):
+        if not record.strip():
+            continue
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, RecordError(f"Expected {len(header)} columns, got {len(values)}.")
+            continue
+        # Пустая ячейка необязательного поля (stock) — значение не задано
+        data = {
+            name: value for name, value in zip(header, values)
+            if not (name in CSV_OPTIONAL_FIELDS and value == "")
+        }
+        try:
+            yield row, _validate(data)
+        except RecordError as exc:
+            yield row, exc
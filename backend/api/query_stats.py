@@ -0,0 +1,160 @@
+# query_stats.py
+# Учет SQL-запросов в рамках HTTP-запроса: число запросов, время в БД, строки.
+# Слушатели висят на классе Engine, поэтому видят все движки (sync, async, скрипты).
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+
+class RequestQueryStats:
+    """Статистика SQL одного HTTP-запроса."""
+
+    __slots__ = ("queries", "duration", "rows", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0  # секунды
+        self.rows = 0
+        self.statements = Counter()
+
+    def repeated(self, threshold: int) -> list:
+        """Одинаковые запросы, выполненные threshold раз и больше (кандидаты в N+1)."""
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+    def server_timing(self, total: float) -> str:
+        metrics = [
+            f'db;dur={self.duration * 1000:.2f};desc="{self.queries} queries"',
+            f'db-rows;desc="{self.rows}"',
+            f"app;dur={total * 1000:.2f}",
+        ]
+        repeated = self.repeated(config.SQL_N1_THRESHOLD)
+        if repeated:
+            metrics.append(f'n-plus-1;desc="{len(repeated)} repeated statements"')
+        return ", ".join(metrics)
+
+
+# Статистика текущего HTTP-запроса. Объект изменяемый, поэтому обработчики,
+# выполняемые в пуле потоков (с копией контекста), пишут в него же.
+_current: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+# Активные count_queries(): видят запросы из любых потоков
+_collectors: List[list] = []
+
+
+def current_stats() -> Optional[RequestQueryStats]:
+    return _current.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_started"].pop()
+    for collector in _collectors:
+        collector.append(statement)
+
+    stats = _current.get()
+    if stats is None:
+        return
+    stats.queries += 1
+    stats.duration += duration
+    # Для SELECT не все драйверы сообщают число строк (SQLite отдает -1)
+    if cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+    stats.statements[statement] += 1
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    # Запрос упал — убираем его отметку времени
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI-middleware: собирает статистику SQL на время запроса, добавляет заголовок
+    Server-Timing и пишет в лог подозрения на N+1 и запросы со слишком большим числом SQL.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            _report(scope, stats)
+
+
+def _report(scope, stats: RequestQueryStats):
+    route = scope.get("route")
+    endpoint = f"{scope['method']} {route.path if route is not None else scope['path']}"
+
+    for statement, count in stats.repeated(config.SQL_N1_THRESHOLD):
+        logger.warning("Possible N+1 in %s: statement executed %d times: %s",
+                       endpoint, count, " ".join(statement.split())[:300])
+
+    if config.SQL_MAX_QUERIES_WARN and stats.queries > config.SQL_MAX_QUERIES_WARN:
+        logger.warning("%s executed %d SQL queries (%.1f ms)", endpoint, stats.queries, stats.duration * 1000)
+
+
+# --- Помощники для тестов и бенчмарков ---
+
+@contextmanager
+def count_queries() -> Iterator[list]:
+    """Собирает тексты всех SQL-запросов, выполненных внутри блока (в любых потоках)."""
+    statements = []
+    _collectors.append(statements)
+    try:
+        yield statements
+    finally:
+        _collectors.remove(statements)
+
+
+@contextmanager
+def assert_max_queries(limit: int, label: str = ""):
+    """
+    Падает с AssertionError, если внутри блока выполнено больше limit SQL-запросов:
+
+        with assert_max_queries(3, "POST /orders/create"):
+            client.post("/orders/create", json=cart, headers=headers)
+    """
+    with count_queries() as statements:
+        yield statements
+    if len(statements) > limit:
+        details = "\n".join(
+            f"  {count} x {' '.join(statement.split())[:200]}"
+            for statement, count in Counter(statements).most_common()
+        )
+        raise AssertionError(f"{label or 'block'}: {len(statements)} SQL queries, expected at most {limit}:\n{details}")
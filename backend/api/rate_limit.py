@@ -0,0 +1,173 @@
+# rate_limit.py
+# Ограничение нагрузки на входе, до маршрутизации и обращений к БД:
+#   * token bucket на клиента и класс маршрутов — 429 с Retry-After, когда бакет пуст;
+#   * лимит одновременных запросов класса в воркере — лишние сразу получают 503 с Retry-After,
+#     а не ждут в очереди пула потоков / соединений БД.
+#
+# Классы маршрутов: auth (вход и регистрация, ключ — IP), write (изменяющие запросы),
+# read (чтение). Для write и read ключ — id пользователя из проверенного токена, без токена — IP.
+# Служебные маршруты (/, /health, /metrics) и поток событий /events не ограничиваются.
+#
+# Бакеты хранятся в RATE_LIMIT_STORE: по умолчанию в памяти процесса, для нескольких воркеров —
+# реализация RateLimitStore поверх общего хранилища. Лимит одновременных запросов всегда
+# считается в процессе: он защищает ресурсы конкретного воркера.
+import importlib
+import math
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from starlette.responses import JSONResponse
+
+from . import config, metrics
+from .auth_utils import token_user_id
+
+AUTH_PATHS = re.compile(r"^/users/(login|register)$")
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+# Не ограничиваются: проверки живости, метрики и долгие потоки SSE
+EXEMPT_PATHS = re.compile(r"^/($|health/|metrics$|events/)")
+
+
+class RouteClass:
+    """Лимиты одного класса маршрутов."""
+
+    __slots__ = ("name", "rate", "burst", "concurrency", "in_flight")
+
+    def __init__(self, name: str, rate: float, burst: int, concurrency: int):
+        self.name = name
+        self.rate = rate                # токенов в секунду; 0 — без rate limit
+        self.burst = max(1, burst)
+        self.concurrency = concurrency  # 0 — без лимита
+        self.in_flight = 0
+
+
+ROUTE_CLASSES: Dict[str, RouteClass] = {
+    route_class.name: route_class
+    for route_class in (
+        RouteClass("auth", config.RATE_LIMIT_AUTH_RATE, config.RATE_LIMIT_AUTH_BURST, config.CONCURRENCY_AUTH),
+        RouteClass("write", config.RATE_LIMIT_WRITE_RATE, config.RATE_LIMIT_WRITE_BURST, config.CONCURRENCY_WRITE),
+        RouteClass("read", config.RATE_LIMIT_READ_RATE, config.RATE_LIMIT_READ_BURST, config.CONCURRENCY_READ),
+    )
+}
+
+
+# --- Хранилища бакетов ---
+
+class RateLimitStore(ABC):
+    """
+    Хранилище бакетов. Реализация для нескольких воркеров (например, поверх Redis)
+    выполняет take одной атомарной операцией на стороне хранилища.
+    """
+
+    @abstractmethod
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        """Забирает токен из бакета key: 0 — запрос разрешен, иначе — через сколько секунд появится токен."""
+
+
+class MemoryStore(RateLimitStore):
+    """
+    Бакеты в памяти процесса. take выполняется в event loop без await внутри,
+    поэтому блокировка не нужна. Самые давние ключи вытесняются при переполнении.
+    """
+
+    def __init__(self, maxsize: int = config.RATE_LIMIT_MAX_KEYS):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()  # key -> [токены, время пополнения]
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(burst), now]
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(float(burst), bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / rate
+
+
+def _load_store(spec: str) -> RateLimitStore:
+    if spec == "memory":
+        return MemoryStore()
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+store: RateLimitStore = _load_store(config.RATE_LIMIT_STORE)
+
+
+# --- Middleware ---
+
+def route_class_for(method: str, path: str) -> Optional[RouteClass]:
+    """Класс маршрута запроса; None — запрос не ограничивается."""
+    if EXEMPT_PATHS.match(path):
+        return None
+    if AUTH_PATHS.match(path):
+        return ROUTE_CLASSES["auth"]
+    return ROUTE_CLASSES["read" if method in READ_METHODS else "write"]
+
+
+def _authorization(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            return value.decode("latin-1")
+    return None
+
+
+def client_key(scope, route_class: RouteClass) -> str:
+    """Ключ бакета: пользователь из токена или IP клиента (за прокси — см. WEB_FORWARDED_ALLOW_IPS)."""
+    if route_class.name != "auth":
+        # Невалидный токен ограничивается по IP, 401 вернет обработчик
+        user_id = token_user_id(_authorization(scope))
+        if user_id is not None:
+            return f"{route_class.name}:user:{user_id}"
+    client = scope.get("client")
+    return f"{route_class.name}:ip:{client[0] if client else 'unknown'}"
+
+
+def _rejected(status_code: int, detail: str, retry_after: int) -> JSONResponse:
+    return JSONResponse({"detail": detail}, status_code=status_code, headers={"Retry-After": str(retry_after)})
+
+
+class RateLimitMiddleware:
+    """ASGI-middleware: rate limit на клиента и лимит одновременных запросов по классам маршрутов."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route_class = route_class_for(scope["method"], scope["path"])
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        if route_class.rate > 0:
+            wait = await store.take(client_key(scope, route_class), route_class.rate, route_class.burst)
+            if wait > 0:
+                metrics.requests_rejected.labels(route_class.name, "rate_limit").inc()
+                response = _rejected(429, "Too many requests. Retry later.", math.ceil(wait))
+                await response(scope, receive, send)
+                return
+
+        if route_class.concurrency and route_class.in_flight >= route_class.concurrency:
+            metrics.requests_rejected.labels(route_class.name, "concurrency").inc()
+            response = _rejected(503, "Server is busy. Retry later.", config.CONCURRENCY_RETRY_AFTER)
+            await response(scope, receive, send)
+            return
+
+        route_class.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route_class.in_flight -= 1
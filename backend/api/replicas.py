@@ -0,0 +1,215 @@
+# replicas.py
+# Чтение с реплик (DB_REPLICA_URLS). GET-маршруты получают сессию через get_read_db
+# (get_async_read_db в режиме DB_ASYNC=1), остальные — через get_db, то есть в основную БД.
+#
+# Сессия для чтения идет в основную БД, если:
+#   * реплик нет или все они исключены после ошибок соединения (DB_REPLICA_RETRY_AFTER);
+#   * пользователь из токена сам записывал в последние DB_REPLICA_STICKY_SECONDS (read-your-writes);
+#   * в эти же секунды менялся читаемый раздел каталога (иначе кэш каталога заполнился бы
+#     данными до изменения).
+# Отметки о записях хранятся в памяти процесса: при нескольких воркерах чтение сразу после
+# записи, попавшее в другой воркер, может уйти на реплику.
+# Запрос, на котором реплика перестала отвечать, завершается ошибкой; следующие идут в основную БД.
+#
+# Проверка локально на двух файлах SQLite: реплика — копия основной БД, которую обновляет
+#     DB_REPLICA_URLS=sqlite:///./sql_app_replica.db python -m api.replicas copy --interval 1
+# (интервал копирования имитирует отставание репликации).
+import argparse
+import itertools
+import logging
+import sqlite3
+import time
+from typing import List, Optional
+
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session
+
+from . import catalog_cache, config, database
+from .auth_utils import token_user_id
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Сколько пользователей с недавними записями помнить
+STICKY_MAX_USERS = 100_000
+
+
+class Replica:
+    """Реплика и ее исправность: после ошибки соединения исключается на DB_REPLICA_RETRY_AFTER."""
+
+    __slots__ = ("engine", "down_until", "suspect")
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.down_until = 0.0
+        # Перед первым использованием и после ошибки реплика проверяется запросом SELECT 1
+        self.suspect = True
+
+    @property
+    def name(self) -> str:
+        return self.engine.url.render_as_string(hide_password=True)
+
+    def mark_down(self) -> None:
+        if not self.suspect or not self.down_until:
+            logger.warning("Read replica %s is unavailable, reading from the primary", self.name)
+        self.down_until = time.monotonic() + config.DB_REPLICA_RETRY_AFTER
+        self.suspect = True
+
+    def mark_up(self) -> None:
+        if self.down_until:
+            logger.info("Read replica %s is back", self.name)
+        self.suspect = False
+
+
+def _watch(replica: Replica, sync_engine: Engine) -> Replica:
+    @event.listens_for(sync_engine, "handle_error")
+    def _on_error(context):
+        # Ошибка подключения или обрыв соединения; ошибки самих запросов реплику не исключают
+        if context.connection is None or context.is_disconnect:
+            replica.mark_down()
+
+    return replica
+
+
+replicas: List[Replica] = [_watch(Replica(engine), engine) for engine in database.replica_engines]
+async_replicas: List[Replica] = [
+    _watch(Replica(engine), engine.sync_engine) for engine in database.async_replica_engines
+]
+
+_round_robin = itertools.count()
+
+# id пользователя -> True, пока не истекло DB_REPLICA_STICKY_SECONDS после его записи
+_recent_writers = TTLCache(maxsize=STICKY_MAX_USERS, ttl=config.DB_REPLICA_STICKY_SECONDS)
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_writer(session):
+    # user_id в сессии оставляет get_current_user; сессии реплик не коммитят
+    user_id = session.info.get("user_id")
+    if user_id is not None and config.DB_REPLICA_URLS:
+        _recent_writers.set(user_id, True)
+
+
+def _needs_primary(request: Request) -> bool:
+    """Нужно ли читать из основной БД, чтобы увидеть недавние записи."""
+    # Каталог: список магазинов после изменения любого магазина, магазин — после изменения
+    # его товаров или остатков (store_id из пути; маршрут уже сопоставлен)
+    if catalog_cache.changed_within(catalog_cache.STORES, config.DB_REPLICA_STICKY_SECONDS):
+        return True
+    store_id = request.path_params.get("store_id")
+    if store_id is not None and catalog_cache.changed_within(
+            catalog_cache.store_scope(int(store_id)), config.DB_REPLICA_STICKY_SECONDS,
+    ):
+        return True
+    if not len(_recent_writers):
+        return False  # Без недавних записей токен не разбираем
+    user_id = token_user_id(request.headers.get("authorization"))
+    return user_id is not None and _recent_writers.get(user_id) is not None
+
+
+def _candidates(pool: List[Replica]) -> List[Replica]:
+    """Исправные реплики по кругу, начиная со следующей."""
+    now = time.monotonic()
+    start = next(_round_robin)
+    ordered = [pool[(start + offset) % len(pool)] for offset in range(len(pool))]
+    return [replica for replica in ordered if replica.down_until <= now]
+
+
+def _read_engine(request: Request):
+    """Движок для чтения (синхронный режим); None — основная БД."""
+    if not replicas or _needs_primary(request):
+        return None
+    for replica in _candidates(replicas):
+        if replica.suspect:
+            try:
+                with replica.engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+            except Exception:
+                continue  # handle_error уже исключил реплику снова
+            replica.mark_up()
+        return replica.engine
+    return None
+
+
+async def _async_read_engine(request: Request):
+    """Движок для чтения (DB_ASYNC=1); None — основная БД."""
+    if not async_replicas or _needs_primary(request):
+        return None
+    for replica in _candidates(async_replicas):
+        if replica.suspect:
+            try:
+                async with replica.engine.connect() as connection:
+                    await connection.execute(text("SELECT 1"))
+            except Exception:
+                continue
+            replica.mark_up()
+        return replica.engine
+    return None
+
+
+def get_read_db(request: Request):
+    """Dependency: сессия только для чтения — на реплике или в основной БД (см. начало модуля)."""
+    bind = _read_engine(request)
+    db = database.SessionLocal() if bind is None else database.SessionLocal(bind=bind)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    """Dependency: сессия только для чтения в асинхронном режиме."""
+    bind = await _async_read_engine(request)
+    async with (database.AsyncSessionLocal() if bind is None else database.AsyncSessionLocal(bind=bind)) as db:
+        yield db
+
+
+def get_stats() -> list:
+    """Состояние реплик для /health/db."""
+    now = time.monotonic()
+    return [
+        {
+            "name": replica.name,
+            "healthy": replica.down_until <= now,
+            "retry_in": max(0.0, round(replica.down_until - now, 1)),
+        }
+        for replica in replicas + async_replicas
+    ]
+
+
+# --- Локальная проверка на SQLite ---
+
+def copy_sqlite(primary_url: str, replica_urls: List[str]) -> None:
+    """Копирует основную БД SQLite в файлы реплик (sqlite3 backup API)."""
+    source = sqlite3.connect(make_url(primary_url).database)
+    try:
+        for url in replica_urls:
+            target = sqlite3.connect(make_url(url).database)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+    finally:
+        source.close()
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Реплики для чтения: копирование SQLite для локальной проверки")
+    parser.add_argument("command", choices=["copy"])
+    parser.add_argument("--interval", type=float, default=0, help="повторять каждые N секунд (0 — один раз)")
+    args = parser.parse_args(argv)
+
+    if make_url(config.DATABASE_URL).get_backend_name() != "sqlite" or not config.DB_REPLICA_URLS:
+        raise SystemExit("copy needs a SQLite DATABASE_URL and SQLite DB_REPLICA_URLS")
+    while True:
+        copy_sqlite(config.DATABASE_URL, config.DB_REPLICA_URLS)
+        print(f"Copied primary to {len(config.DB_REPLICA_URLS)} replica(s).")
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
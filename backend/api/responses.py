@@ -0,0 +1,22 @@
+# responses.py
+# Быстрая сериализация ответов через pydantic-core (Rust) вместо jsonable_encoder + json.dumps.
+# Только для эндпоинтов, отдающих готовый ответ (json_response); класс ответа приложения —
+# стандартный: замена в нем одного json.dumps на to_json в замере не дала выигрыша на запрос
+# (см. benchmarks/serialization.py).
+from typing import Any
+
+from pydantic import TypeAdapter
+from starlette.responses import Response
+
+
+def serialize(adapter: TypeAdapter, data: Any) -> bytes:
+    """JSON по схеме adapter из ORM-объектов или моделей за один проход pydantic-core."""
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+
+def json_response(adapter: TypeAdapter, data: Any, status_code: int = 200) -> Response:
+    """
+    Готовый ответ для горячих эндпоинтов: FastAPI не проверяет его повторно по response_model
+    (response_model остается для OpenAPI) и не гоняет через jsonable_encoder.
+    """
+    return Response(serialize(adapter, data), status_code=status_code, media_type="application/json")
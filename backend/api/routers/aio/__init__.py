@@ -0,0 +1,12 @@
+# Асинхронные (async def) версии роутеров для режима DB_ASYNC=1.
+# Подключаются в main.py перед синхронными и перекрывают их маршруты.
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def run_handler(db: AsyncSession, handler, **kwargs):
+    """
+    Выполняет синхронный обработчик роутера на AsyncSession.
+    run_sync исполняет его в greenlet на event loop: запросы к БД идут через
+    асинхронный драйвер, а пул потоков Starlette не задействуется.
+    """
+    return await db.run_sync(lambda session: handler(db=session, **kwargs))
@@ -0,0 +1,97 @@
+from fastapi import APIRouter, Depends, Header, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from ...database import get_async_db
+from ...replicas import get_async_read_db
+from ... import idempotency, schemas, models
+from ...auth_utils import CurrentUser, get_current_user_async
+from .. import orders
+from ..orders import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from . import run_handler
+
+router = APIRouter(
+    prefix="/orders",
+    tags=["orders"],
+)
+
+
+# --- ФУНКЦИОНАЛ ДЛЯ ПОКУПАТЕЛЕЙ (BUYER) ---
+
+@router.post("/create", response_model=schemas.Order, status_code=status.HTTP_201_CREATED)
+async def create_order(
+        cart_items: List[schemas.CartItem],
+        idempotency_key: Optional[str] = Header(
+            None, alias=idempotency.HEADER, min_length=1, max_length=idempotency.MAX_KEY_LENGTH,
+            description="Повтор с тем же ключом вернет уже оформленный заказ, а не создаст новый",
+        ),
+        db: AsyncSession = Depends(get_async_db),
+        current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """[BUYER] Оформление заказа (перенос товаров из корзины в БД)."""
+    return await run_handler(
+        db, orders.create_order, cart_items=cart_items, idempotency_key=idempotency_key, current_user=current_user,
+    )
+
+
+@router.get("/my", response_model=List[schemas.Order])
+async def get_my_orders(
+        include_archived: bool = Query(False, description="Добавить завершенные заказы из архива (история)"),
+        db: AsyncSession = Depends(get_async_read_db),
+        current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """[BUYER] Просмотр всех заказов текущего пользователя."""
+    return await run_handler(db, orders.get_my_orders, include_archived=include_archived, current_user=current_user)
+
+
+# --- ФУНКЦИОНАЛ ДЛЯ ПРОДАВЦОВ (SELLER) ---
+
+@router.get("/seller", response_model=List[schemas.SellerOrder])
+async def get_seller_orders(
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        before_id: Optional[int] = Query(None, description="id последнего заказа предыдущей страницы"),
+        status_filter: Optional[schemas.OrderStatus] = Query(None, alias="status"),
+        only_my_items: bool = Query(False, description="Возвращать только товары магазинов продавца"),
+        include_archived: bool = Query(False, description="Добавить завершенные заказы из архива (история)"),
+        db: AsyncSession = Depends(get_async_read_db),
+        current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """[SELLER] Заказы по всем магазинам текущего продавца одним запросом."""
+    return await run_handler(
+        db, orders.get_seller_orders,
+        limit=limit, before_id=before_id, status_filter=status_filter,
+        only_my_items=only_my_items, include_archived=include_archived, current_user=current_user,
+    )
+
+
+@router.get("/seller/store/{store_id}", response_model=List[schemas.Order])
+async def get_store_orders(
+        store_id: int,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        before_id: Optional[int] = Query(None, description="id последнего заказа предыдущей страницы"),
+        status_filter: Optional[schemas.OrderStatus] = Query(None, alias="status"),
+        only_store_items: bool = Query(False, description="Возвращать только товары этого магазина"),
+        include_archived: bool = Query(False, description="Добавить завершенные заказы из архива (история)"),
+        db: AsyncSession = Depends(get_async_read_db),
+        current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """[SELLER] Просмотр заказов, содержащих товары из конкретного магазина продавца."""
+    return await run_handler(
+        db, orders.get_store_orders,
+        store_id=store_id, limit=limit, before_id=before_id, status_filter=status_filter,
+        only_store_items=only_store_items, include_archived=include_archived, current_user=current_user,
+    )
+
+
+@router.patch("/{order_id}/status", response_model=schemas.Order)
+async def update_order_status(
+        order_id: int,
+        status_update: schemas.OrderStatusUpdate,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """[SELLER] Обновление статуса заказа."""
+    return await run_handler(
+        db, orders.update_order_status,
+        order_id=order_id, status_update=status_update, current_user=current_user,
+    )
@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Depends, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from ...database import get_async_db
+from ...replicas import get_async_read_db
+from ... import schemas, models
+from ...auth_utils import CurrentUser, get_current_user_async
+from .. import stores
+from ..stores import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from . import run_handler
+
+router = APIRouter(
+    prefix="/stores",
+    tags=["stores"],
+)
+
+
+# --- ФУНКЦИОНАЛ ДЛЯ ПРОДАВЦОВ (SELLER) ---
+
+@router.post("/", response_model=schemas.Store, status_code=status.HTTP_201_CREATED)
+async def create_store(
+        store: schemas.StoreCreate,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """[SELLER] Добавление нового магазина."""
+    return await run_handler(db, stores.create_store, store=store, current_user=current_user)
+
+
+@router.get("/my", response_model=List[schemas.Store])
+async def get_my_stores(
+        db: AsyncSession = Depends(get_async_read_db),
+        current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """[SELLER] Получить список магазинов, принадлежащих текущему продавцу."""
+    return await run_handler(db, stores.get_my_stores, current_user=current_user)
+
+
+@router.post("/{store_id}/products", response_model=schemas.Product, status_code=status.HTTP_201_CREATED)
+async def create_product(
+        store_id: int,
+        product: schemas.ProductCreate,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """[SELLER] Добавление нового товара в свой магазин."""
+    return await run_handler(db, stores.create_product, store_id=store_id, product=product, current_user=current_user)
+
+
+# --- ФУНКЦИОНАЛ ДЛЯ ПОКУПАТЕЛЕЙ И ВСЕХ (BUYER/ALL) ---
+
+@router.get("/", response_model=List[schemas.StoreDetails])
+async def get_all_stores(
+        request: Request,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        after_id: Optional[int] = Query(None, description="id последнего магазина предыдущей страницы"),
+        name_prefix: Optional[str] = Query(None, min_length=1),
+        with_summary: bool = Query(False, description="Добавить сводку по товарам и заказам (summary)"),
+        db: AsyncSession = Depends(get_async_read_db)
+):
+    """[BUYER/ALL] Просмотр списка магазинов (постранично)."""
+    return await run_handler(
+        db, stores.get_all_stores,
+        request=request, limit=limit, after_id=after_id, name_prefix=name_prefix, with_summary=with_summary,
+    )
+
+
+@router.get("/{store_id}", response_model=schemas.StoreDetails)
+async def get_store(
+        store_id: int,
+        request: Request,
+        db: AsyncSession = Depends(get_async_read_db)
+):
+    """[BUYER/ALL] Магазин со сводкой по товарам и заказам."""
+    return await run_handler(db, stores.get_store, store_id=store_id, request=request)
+
+
+@router.get("/{store_id}/products", response_model=List[schemas.Product])
+async def get_products_in_store(
+        store_id: int,
+        request: Request,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        after_id: Optional[int] = Query(None, description="id последнего товара предыдущей страницы"),
+        sort: schemas.ProductSort = schemas.ProductSort.ID,
+        min_price: Optional[float] = Query(None, ge=0),
+        max_price: Optional[float] = Query(None, ge=0),
+        name_prefix: Optional[str] = Query(None, min_length=1),
+        db: AsyncSession = Depends(get_async_read_db)
+):
+    """[BUYER/ALL] Просмотр товаров в конкретном магазине (постранично)."""
+    return await run_handler(
+        db, stores.get_products_in_store,
+        store_id=store_id, request=request, limit=limit, after_id=after_id, sort=sort,
+        min_price=min_price, max_price=max_price, name_prefix=name_prefix,
+    )
@@ -0,0 +1,80 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...database import get_async_db
+from ... import schemas, models, password_pool
+from ...auth_utils import CurrentUser, create_access_token, get_current_user_async
+from ..users import ACCESS_TOKEN_EXPIRE_MINUTES
+from datetime import timedelta
+
+router = APIRouter(
+    prefix="/users",
+    tags=["users"],
+)
+
+
+@router.post("/register", response_model=schemas.User)
+async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    """Регистрация нового пользователя (покупателя или продавца)."""
+
+    # 1. Проверка на существование пользователя
+    result = await db.execute(select(models.User).where(models.User.username == user.username))
+    if result.scalars().first():
+        raise HTTPException(status_code=400, detail="Username already registered")
+
+    # 2. Хеширование пароля (в пуле процессов, event loop не блокируется)
+    hashed_password = await password_pool.hash_password(user.password)
+
+    # 3. Создание пользователя
+    db_user = models.User(
+        username=user.username,
+        hashed_password=hashed_password,
+        role=user.role
+    )
+    db.add(db_user)
+    await db.commit()
+
+    return db_user
+
+
+@router.post("/login", response_model=schemas.Token)
+async def login_for_access_token(user_data: schemas.UserLogin, db: AsyncSession = Depends(get_async_db)):
+    """Вход и выдача JWT токена."""
+
+    # 1. Поиск пользователя
+    result = await db.execute(select(models.User).where(models.User.username == user_data.username))
+    user = result.scalars().first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+        )
+
+    # 2. Проверка пароля
+    is_valid, new_hash = await password_pool.verify_password(user_data.password, user.hashed_password)
+    if not is_valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+        )
+
+    # Стоимость bcrypt изменилась (BCRYPT_ROUNDS) — сохраняем пересчитанный хеш
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+
+    # 3. Генерация токена
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"id": user.id, "username": user.username, "role": user.role.value},  # Включаем id, имя и role в токен
+        expires_delta=access_token_expires
+    )
+
+    return {"access_token": access_token, "role": user.role}
+
+
+@router.get("/me", response_model=schemas.User)
+async def read_users_me(current_user: CurrentUser = Depends(get_current_user_async)):
+    """Получение данных текущего аутентифицированного пользователя."""
+    return current_user
@@ -0,0 +1,59 @@
+from typing import List, Tuple
+
+from fastapi import APIRouter, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from ..database import SessionLocal
+from .. import config, events, models
+from ..auth_utils import CurrentUser, get_current_user
+
+router = APIRouter(
+    prefix="/events",
+    tags=["events"],
+)
+
+# Через сколько миллисекунд EventSource переподключается после обрыва
+RETRY_MS = 3000
+
+
+def _subscriber_channels(token: str) -> Tuple[CurrentUser, List[str]]:
+    """Пользователь по токену и его каналы: свои заказы (BUYER) или заказы своих магазинов (SELLER)."""
+    with SessionLocal() as db:
+        current_user = get_current_user(db=db, token=token)
+        if current_user.role.value == models.UserRole.SELLER.value:
+            store_ids = db.query(models.Store.id).filter(models.Store.seller_id == current_user.id)
+            return current_user, [events.store_channel(store_id) for (store_id,) in store_ids]
+        return current_user, [events.buyer_channel(current_user.id)]
+
+
+@router.get("/orders")
+async def order_events(
+        token: str = Query(..., description="JWT (EventSource не умеет передавать заголовок Authorization)"),
+):
+    """
+    [BUYER/SELLER] Поток Server-Sent Events с изменениями заказов:
+    order_created, order_updated (в data — заказ целиком, как в /orders/my, и store_ids),
+    resync — события потеряны, список заказов нужно перезапросить.
+    Покупатель получает свои заказы, продавец — заказы с товарами своих магазинов
+    (магазины, созданные после подключения, — после переподключения).
+    """
+    current_user, channels = await run_in_threadpool(_subscriber_channels, token)
+    subscription = events.broker.subscribe(channels)
+
+    async def stream():
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            # При отключении клиента Starlette отменяет генератор — подписка снимается в finally
+            while True:
+                message = await subscription.get(timeout=config.EVENTS_HEARTBEAT)
+                # Пинг-комментарий: прокси не закрывают соединение, обрыв обнаруживается быстрее
+                yield message if message is not None else ": ping\n\n"
+        finally:
+            events.broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,28 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-from typing import List, Dict
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import func, insert, select, tuple_, update
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import List, Dict, Optional
 
 from ..database import get_db
-from .. import schemas, models
-from ..auth_utils import get_current_user
+from .. import analytics, archive, catalog_cache, events, idempotency, inventory, order_export, responses, schemas, models
+from ..auth_utils import CurrentUser, get_current_user
+from ..replicas import get_read_db
 
 router = APIRouter(
     prefix="/orders",
     tags=["orders"],
 )
 
+# Сериализаторы ответов (быстрый путь через pydantic-core, см. responses.json_response)
+order_adapter = TypeAdapter(schemas.Order)
+orders_adapter = TypeAdapter(List[schemas.Order])
+seller_orders_adapter = TypeAdapter(List[schemas.SellerOrder])
+
+# Размер страницы для лент заказов продавца
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _order_models(archived: bool) -> tuple:
+    """(модель заказа, модель элемента заказа): живые таблицы или архив (archive.py)."""
+    if archived:
+        return models.ArchivedOrder, models.ArchivedOrderItem
+    return models.Order, models.OrderItem
+
+
+def _may_be_archived(status_filter: Optional[schemas.OrderStatus]) -> bool:
+    """Может ли в архиве быть заказ с таким статусом (в архив попадают только завершенные)."""
+    return status_filter is None or status_filter in archive.FINISHED_STATUSES
+
 
 # --- ФУНКЦИОНАЛ ДЛЯ ПОКУПАТЕЛЕЙ (BUYER) ---
 
 @router.post("/create", response_model=schemas.Order, status_code=status.HTTP_201_CREATED)
 def create_order(
         cart_items: List[schemas.CartItem],
+        idempotency_key: Optional[str] = Header(
+            None, alias=idempotency.HEADER, min_length=1, max_length=idempotency.MAX_KEY_LENGTH,
+            description="Повтор с тем же ключом вернет уже оформленный заказ, а не создаст новый",
+        ),
         db: Session = Depends(get_db),
-        current_user: models.User = Depends(get_current_user)
+        current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     [BUYER] Оформление заказа (перенос товаров из корзины в БД).
     Доступно только пользователям с ролью BUYER.
+    С заголовком Idempotency-Key повтор запроса (например, после таймаута) отдает исходный
+    ответ с заголовком Idempotent-Replayed, а параллельные дубли создают ровно один заказ.
     """
 
     # 1. Проверка роли
@@ -33,74 +67,279 @@ def create_order(
     if not cart_items:
         raise HTTPException(status_code=400, detail="Cart is empty.")
 
-    # 2. Создание нового заказа
+    # 2. Объединяем повторяющиеся позиции корзины (один товар -> одна строка заказа)
+    quantities: Dict[int, int] = {}
+    for item in cart_items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+
+    # Повтор уже оформленного заказа — отдаем исходный ответ, ничего не читая и не записывая
+    request_hash = None
+    if idempotency_key is not None:
+        request_hash = idempotency.fingerprint(quantities)
+        replayed = idempotency.replay(db, current_user.id, idempotency_key, request_hash)
+        if replayed is not None:
+            return replayed
+
+    # 3. Загружаем все товары корзины одним запросом (WHERE id IN (...))
+    products = {
+        product.id: product
+        for product in db.query(models.Product).filter(models.Product.id.in_(quantities.keys()))
+    }
+
+    missing = [product_id for product_id in quantities if product_id not in products]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Product with ID {missing[0]} not found.")
+
+    # Товары, по которым ведется остаток. Заведомую нехватку отсекаем по уже прочитанным
+    # остаткам, не начиная запись; окончательная проверка — атомарный UPDATE в шаге 7.
+    reserved = {
+        product_id: quantity for product_id, quantity in quantities.items()
+        if products[product_id].stock is not None
+    }
+    short = [product_id for product_id, quantity in reserved.items() if products[product_id].stock < quantity]
+    if short:
+        raise inventory.not_enough_stock(short)
+
+    # 4. Создание заказа
     db_order = models.Order(buyer_id=current_user.id, status=models.OrderStatus.PENDING)
     db.add(db_order)
-    db.flush()  # Получаем ID нового заказа до коммита
-
-    order_items_to_add = []
-
-    # 3. Обработка товаров в корзине
-    for item in cart_items:
-        # Ищем товар и получаем его текущую цену
-        product = db.query(models.Product).filter(models.Product.id == item.product_id).first()
-
-        if not product:
-            raise HTTPException(status_code=404, detail=f"Product with ID {item.product_id} not found.")
-
-        # Создаем элемент заказа, фиксируя цену на момент покупки
-        order_item = models.OrderItem(
-            order_id=db_order.id,
-            product_id=product.id,
-            quantity=item.quantity,
-            price_at_order=product.price  # Фиксируем текущую цену
-        )
-        order_items_to_add.append(order_item)
-
-    db.add_all(order_items_to_add)
+    db.flush()  # Получаем id и created_at нового заказа (через RETURNING)
+
+    # Ключ идемпотентности — в той же транзакции: из параллельных дублей пройдет только один
+    if idempotency_key is not None:
+        replayed = idempotency.claim(db, current_user.id, idempotency_key, request_hash, db_order.id)
+        if replayed is not None:
+            return replayed
+
+    # 5. Пакетная вставка элементов заказа одним executemany, фиксируя текущие цены
+    order_items = [
+        {
+            "order_id": db_order.id,
+            "product_id": product_id,
+            "quantity": quantity,
+            "price_at_order": products[product_id].price,
+        }
+        for product_id, quantity in quantities.items()
+    ]
+    db.execute(insert(models.OrderItem), order_items)
+
+    # 6. Дневные агрегаты продаж магазинов (в той же транзакции)
+    analytics.record_order(db, db_order.created_at, db_order.status, [
+        (products[item["product_id"]].store_id, item["product_id"], item["quantity"], item["price_at_order"])
+        for item in order_items
+    ])
+
+    # 7. Списание остатков одним условным UPDATE по всем позициям (все или ничего).
+    # Последним шагом перед commit: строки товаров заблокированы как можно меньше.
+    for product_id, stock in inventory.reserve(db, reserved).items():
+        set_committed_value(products[product_id], "stock", stock)
+
+    # Собираем ответ из уже загруженных объектов, без refresh и повторного SELECT
+    response = schemas.Order(
+        id=db_order.id,
+        buyer_id=current_user.id,
+        status=db_order.status,
+        created_at=db_order.created_at,
+        items=[
+            schemas.OrderItem(
+                product=products[item["product_id"]],
+                quantity=item["quantity"],
+                price_at_order=item["price_at_order"],
+            )
+            for item in order_items
+        ],
+    )
+    store_ids = {product.store_id for product in products.values()}
+    result = responses.json_response(order_adapter, response, status_code=status.HTTP_201_CREATED)
+    if idempotency_key is not None:
+        idempotency.save_response(db, current_user.id, idempotency_key, result.body)
     db.commit()
-    db.refresh(db_order)
 
-    # Загружаем заказ с деталями для ответа
-    db_order = db.query(models.Order).options(
-        joinedload(models.Order.items).joinedload(models.OrderItem.product)).filter(
-        models.Order.id == db_order.id).first()
+    # Остатки входят в ответ каталога (GET /stores/{id}/products) — сбрасываем его кэш
+    # для магазинов, где они изменились
+    for store_id in {products[product_id].store_id for product_id in reserved}:
+        catalog_cache.invalidate(catalog_cache.store_scope(store_id))
 
-    return db_order
+    # Уведомляем покупателя и продавцов (поток /events/orders)
+    events.publish_order("order_created", response, store_ids)
+    if idempotency_key is not None:
+        idempotency.remember(current_user.id, idempotency_key, request_hash, result.body)
+    return result
 
 
 @router.get("/my", response_model=List[schemas.Order])
 def get_my_orders(
-        db: Session = Depends(get_db),
-        current_user: models.User = Depends(get_current_user)
+        include_archived: bool = Query(False, description="Добавить завершенные заказы из архива (история)"),
+        db: Session = Depends(get_read_db),
+        current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     [BUYER] Просмотр всех заказов текущего пользователя.
+    Архивные заказы (archive.py) — только с include_archived, после живых.
     """
     if current_user.role.value != models.UserRole.BUYER.value:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                             detail="Access denied. Only buyers can view their orders.")
 
-    orders = (
-        db.query(models.Order)
-        .filter(models.Order.buyer_id == current_user.id)
-        # Оптимизированная загрузка элементов и товаров
-        .options(joinedload(models.Order.items).joinedload(models.OrderItem.product))
+    orders = []
+    for archived in ((False, True) if include_archived else (False,)):
+        Order, OrderItem = _order_models(archived)
+        orders += (
+            db.query(Order)
+            .filter(Order.buyer_id == current_user.id)
+            # Оптимизированная загрузка элементов и товаров
+            .options(joinedload(Order.items).joinedload(OrderItem.product))
+            .all()
+        )
+    return responses.json_response(orders_adapter, orders)
+
+
+# --- ФУНКЦИОНАЛ ДЛЯ ПРОДАВЦОВ (SELLER) ---
+
+def _orders_page(
+        db: Session,
+        seller_products_filter,
+        limit: int,
+        before_id: Optional[int],
+        status_filter: Optional[schemas.OrderStatus],
+        only_seller_items: bool,
+        archived: bool,
+        include_archived: bool,
+) -> list:
+    """
+    Страница заказов, содержащих товары продавца, новые первыми — из живых таблиц или из архива.
+    seller_products_filter — условие на Product, выбирающее товары продавца.
+    Фильтрация выполняется в БД полусоединением (orders.id IN (...)) по индексу
+    order_items(product_id, order_id), без выгрузки элементов заказов в Python.
+    """
+    Order, OrderItem = _order_models(archived)
+    seller_product_ids = select(models.Product.id).where(seller_products_filter)
+    seller_order_ids = (
+        select(OrderItem.order_id)
+        .where(OrderItem.product_id.in_(seller_product_ids))
+    )
+
+    query = db.query(Order).filter(Order.id.in_(seller_order_ids))
+
+    if status_filter is not None:
+        query = query.filter(Order.status == status_filter)
+
+    if before_id is not None:
+        # Курсор (created_at, id): дату последнего заказа страницы берем подзапросом по первичному ключу.
+        # С include_archived последним на странице может оказаться и архивный заказ.
+        before_created_at = (
+            select(models.Order.created_at).where(models.Order.id == before_id).scalar_subquery()
+        )
+        if include_archived:
+            before_created_at = func.coalesce(
+                before_created_at,
+                select(models.ArchivedOrder.created_at).where(models.ArchivedOrder.id == before_id).scalar_subquery(),
+            )
+        query = query.filter(
+            tuple_(Order.created_at, Order.id) < tuple_(before_created_at, before_id)
+        )
+
+    # Элементы подгружаем отдельным запросом (selectinload), чтобы LIMIT применялся к заказам.
+    # При only_seller_items возвращаются только строки с товарами продавца.
+    items = Order.items
+    if only_seller_items:
+        items = items.and_(OrderItem.product_id.in_(seller_product_ids))
+
+    return (
+        query
+        .options(selectinload(items).joinedload(OrderItem.product))
+        .order_by(Order.created_at.desc(), Order.id.desc())
+        .limit(limit)
         .all()
     )
+
+
+def _seller_orders_feed(
+        db: Session,
+        seller_products_filter,
+        limit: int,
+        before_id: Optional[int],
+        status_filter: Optional[schemas.OrderStatus],
+        only_seller_items: bool,
+        include_archived: bool = False,
+) -> list:
+    """
+    Лента заказов, содержащих товары продавца, новые первыми.
+    С include_archived — вместе с архивом: по странице из живых таблиц и из архива,
+    слитых в одну по тому же порядку (created_at, id).
+    """
+    page = dict(
+        seller_products_filter=seller_products_filter, limit=limit, before_id=before_id,
+        status_filter=status_filter, only_seller_items=only_seller_items, include_archived=include_archived,
+    )
+    orders = _orders_page(db, archived=False, **page)
+    if include_archived and _may_be_archived(status_filter):
+        orders += _orders_page(db, archived=True, **page)
+        orders = sorted(orders, key=lambda order: (order.created_at, order.id), reverse=True)[:limit]
     return orders
 
 
-# --- ФУНКЦИОНАЛ ДЛЯ ПРОДАВЦОВ (SELLER) ---
+@router.get("/seller", response_model=List[schemas.SellerOrder])
+def get_seller_orders(
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        before_id: Optional[int] = Query(None, description="id последнего заказа предыдущей страницы"),
+        status_filter: Optional[schemas.OrderStatus] = Query(None, alias="status"),
+        only_my_items: bool = Query(False, description="Возвращать только товары магазинов продавца"),
+        include_archived: bool = Query(False, description="Добавить завершенные заказы из архива (история)"),
+        db: Session = Depends(get_read_db),
+        current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    [SELLER] Заказы по всем магазинам текущего продавца одним запросом.
+    Заказ, содержащий товары нескольких магазинов продавца, возвращается один раз;
+    store_ids перечисляет магазины продавца, к которым он относится.
+    """
+
+    if current_user.role.value != models.UserRole.SELLER.value:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied. Seller required.")
+
+    store_ids = [
+        store_id for (store_id,) in
+        db.query(models.Store.id).filter(models.Store.seller_id == current_user.id)
+    ]
+    if not store_ids:
+        return []
+
+    orders = _seller_orders_feed(
+        db,
+        models.Product.store_id.in_(store_ids),
+        limit=limit,
+        before_id=before_id,
+        status_filter=status_filter,
+        only_seller_items=only_my_items,
+        include_archived=include_archived,
+    )
+
+    # store_ids кладем атрибутом на сам заказ (как archived у ArchivedOrder),
+    # чтобы адаптер проверил и сериализовал каждый заказ за один проход
+    seller_store_ids = set(store_ids)
+    for order in orders:
+        order.store_ids = sorted({
+            item.product.store_id for item in order.items
+            if item.product.store_id in seller_store_ids
+        })
+    return responses.json_response(seller_orders_adapter, orders)
+
 
 @router.get("/seller/store/{store_id}", response_model=List[schemas.Order])
 def get_store_orders(
         store_id: int,
-        db: Session = Depends(get_db),
-        current_user: models.User = Depends(get_current_user)
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        before_id: Optional[int] = Query(None, description="id последнего заказа предыдущей страницы"),
+        status_filter: Optional[schemas.OrderStatus] = Query(None, alias="status"),
+        only_store_items: bool = Query(False, description="Возвращать только товары этого магазина"),
+        include_archived: bool = Query(False, description="Добавить завершенные заказы из архива (история)"),
+        db: Session = Depends(get_read_db),
+        current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     [SELLER] Просмотр заказов, содержащих товары из конкретного магазина продавца.
+    Новые заказы первыми; следующая страница: before_id = id последнего заказа в ответе.
     """
 
     # 1. Проверка роли
@@ -112,26 +351,55 @@ def get_store_orders(
     if not store or store.seller_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Store not found or you are not the owner.")
 
-    # 3. Ищем все элементы заказов, которые относятся к этому магазину (через product)
-    order_items_in_store = (
-        db.query(models.OrderItem)
-        .join(models.Product)
-        .filter(models.Product.store_id == store_id)
-        .all()
-    )
+    # 3. Заказы с товарами этого магазина — одним запросом (+ подгрузка элементов)
+    return responses.json_response(orders_adapter, _seller_orders_feed(
+        db,
+        models.Product.store_id == store_id,
+        limit=limit,
+        before_id=before_id,
+        status_filter=status_filter,
+        only_seller_items=only_store_items,
+        include_archived=include_archived,
+    ))
 
-    # Получаем уникальные ID заказов, которые содержат товары из этого магазина
-    order_ids = {item.order_id for item in order_items_in_store}
 
-    # 4. Загружаем сами заказы по найденным ID
-    orders = (
-        db.query(models.Order)
-        .filter(models.Order.id.in_(order_ids))
-        .options(joinedload(models.Order.items).joinedload(models.OrderItem.product))
-        .all()
-    )
+@router.get("/seller/store/{store_id}/export")
+def export_store_orders(
+        store_id: int,
+        data_format: str = Query(order_export.CSV, alias="format", pattern="^(csv|ndjson)$"),
+        date_from: Optional[datetime] = Query(None, description="Заказы, созданные не раньше (включительно)"),
+        date_to: Optional[datetime] = Query(None, description="Заказы, созданные раньше (не включительно)"),
+        gzip: bool = Query(False, description="Сжать выгрузку в .gz"),
+        include_archived: bool = Query(False, description="Выгрузить и заказы из архива"),
+        db: Session = Depends(get_read_db),
+        current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    [SELLER] Потоковая выгрузка строк заказов магазина (только товары этого магазина)
+    в CSV или NDJSON, от старых заказов к новым. Память сервера не зависит от объема истории.
+    """
 
-    return orders
+    if current_user.role.value != models.UserRole.SELLER.value:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied. Seller required.")
+
+    store = db.query(models.Store).filter(models.Store.id == store_id).first()
+    if not store or store.seller_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Store not found or you are not the owner.")
+
+    filename = f"store_{store_id}_orders.{data_format}"
+    media_type = "text/csv; charset=utf-8" if data_format == order_export.CSV else "application/x-ndjson"
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        order_export.stream_store_orders(
+            store_id, data_format, date_from, date_to, compress=gzip, include_archived=include_archived,
+            bind=db.get_bind(),
+        ),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @router.patch("/{order_id}/status", response_model=schemas.Order)
@@ -139,7 +407,7 @@ def update_order_status(
         order_id: int,
         status_update: schemas.OrderStatusUpdate,
         db: Session = Depends(get_db),
-        current_user: models.User = Depends(get_current_user)
+        current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     [SELLER] Обновление статуса заказа.
@@ -149,18 +417,27 @@ def update_order_status(
     if current_user.role.value != models.UserRole.SELLER.value:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied. Seller required.")
 
-    db_order = db.query(models.Order).filter(models.Order.id == order_id).first()
+    # Заказ сразу с элементами и товарами: дальше все (проверка продавца, агрегаты, ответ)
+    # берется из загруженного состояния, без перечитывания после commit
+    db_order = (
+        db.query(models.Order)
+        .options(joinedload(models.Order.items).joinedload(models.OrderItem.product))
+        .filter(models.Order.id == order_id)
+        .first()
+    )
     if not db_order:
+        # Заказы из архива завершены и не меняются (лишний запрос — только при промахе)
+        if db.query(models.ArchivedOrder.id).filter(models.ArchivedOrder.id == order_id).first():
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                                detail="Order is archived and can no longer be changed.")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
 
     # Проверяем, содержит ли заказ товары текущего продавца
     # (достаточно, чтобы хотя бы один товар принадлежал продавцу)
+    store_ids = {item.product.store_id for item in db_order.items}
     is_seller_involved = (
-        db.query(models.OrderItem)
-        .join(models.Product)
-        .join(models.Store)
-        .filter(models.OrderItem.order_id == order_id)
-        .filter(models.Store.seller_id == current_user.id)
+        db.query(models.Store.id)
+        .filter(models.Store.id.in_(store_ids), models.Store.seller_id == current_user.id)
         .first()
     )
 
@@ -168,13 +445,51 @@ def update_order_status(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                             detail="You can only update orders that contain items from your stores.")
 
-    # Обновление статуса
-    db_order.status = status_update.status
-    db.commit()
-    db.refresh(db_order)
-
-    # Загружаем обновленный заказ с деталями для ответа
-    db_order = db.query(models.Order).options(
-        joinedload(models.Order.items).joinedload(models.OrderItem.product)).filter(models.Order.id == order_id).first()
-
-    return db_order
+    # Обновление статуса, перенос заказа в агрегатах продаж и возврат/повторное списание остатков
+    status_changed = db_order.status != status_update.status
+    if status_changed:
+        # Условный UPDATE: из параллельных запросов статус меняет только один, остальные
+        # получают 409 и не возвращают остатки повторно. Строка заказа заблокирована до commit.
+        changed = db.execute(
+            update(models.Order)
+            .where(models.Order.id == order_id, models.Order.status == db_order.status)
+            .values(status=status_update.status)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if changed != 1:
+            db.rollback()
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                                detail="Order status was changed by another request. Reload the order and retry.")
+
+        lines = [
+            (item.product.store_id, item.product_id, item.quantity, item.price_at_order)
+            for item in db_order.items
+        ]
+        quantities: Dict[int, int] = {}
+        for _, product_id, quantity, _ in lines:
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+        if status_update.status == models.OrderStatus.CANCELLED:
+            remaining = inventory.release(db, quantities)
+        elif db_order.status == models.OrderStatus.CANCELLED:
+            remaining = inventory.reserve(db, quantities)
+        else:
+            remaining = {}
+        # Остатки в ответе — после списания/возврата (UPDATE ... RETURNING)
+        for item in db_order.items:
+            if item.product_id in remaining:
+                set_committed_value(item.product, "stock", remaining[item.product_id])
+
+        # Статус сменил именно этот запрос (rowcount == 1): переносим заказ в агрегатах ровно один раз
+        analytics.move_order(db, db_order.created_at, db_order.status, status_update.status, lines)
+        # Статус уже записан условным UPDATE — в сессии только отражаем его, без повторного flush
+        set_committed_value(db_order, "status", status_update.status)
+        db.commit()
+
+        for store_id in {item.product.store_id for item in db_order.items if item.product_id in remaining}:
+            catalog_cache.invalidate(catalog_cache.store_scope(store_id))
+
+    order = schemas.Order.model_validate(db_order)
+    if status_changed:
+        events.publish_order("order_updated", order, store_ids)
+    return responses.json_response(order_adapter, order)
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List
+
+from ..replicas import get_read_db
+from .. import schemas, search
+
+router = APIRouter(
+    prefix="/products",
+    tags=["products"],
+)
+
+MAX_SEARCH_PAGE_SIZE = 100
+MAX_SEARCH_OFFSET = 1000
+
+
+# --- ФУНКЦИОНАЛ ДЛЯ ПОКУПАТЕЛЕЙ И ВСЕХ (BUYER/ALL) ---
+
+@router.get("/search", response_model=List[schemas.ProductSearchResult])
+def search_products(
+        q: str = Query(..., min_length=1, max_length=200, description="Слова для поиска в названии и описании"),
+        limit: int = Query(20, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+        offset: int = Query(0, ge=0, le=MAX_SEARCH_OFFSET),
+        db: Session = Depends(get_read_db)
+):
+    """
+    [BUYER/ALL] Полнотекстовый поиск товаров во всех магазинах.
+    Результаты отсортированы по релевантности (BM25 / ts_rank) и содержат данные магазина.
+    """
+    results = search.search_products(db, q, limit=limit, offset=offset)
+    return [
+        schemas.ProductSearchResult.model_validate(product).model_copy(update={"score": score})
+        for product, score in results
+    ]
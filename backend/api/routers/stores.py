@@ -1,16 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import date, datetime, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from sqlalchemy import func, insert, select, tuple_
 from sqlalchemy.orm import Session, joinedload
-from typing import List
+from typing import List, Optional
 
 from ..database import get_db
-from .. import schemas, models
-from ..auth_utils import get_current_user
+from .. import catalog_cache, config, product_import, schemas, models
+from ..auth_utils import CurrentUser, get_current_user
+from ..replicas import get_read_db
 
 router = APIRouter(
     prefix="/stores",
     tags=["stores"],
 )
 
+# Размер страницы для каталога (keyset-пагинация)
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Сериализаторы для кэшируемых ответов каталога
+stores_adapter = TypeAdapter(List[schemas.Store])
+store_details_adapter = TypeAdapter(schemas.StoreDetails)
+stores_details_adapter = TypeAdapter(List[schemas.StoreDetails])
+products_adapter = TypeAdapter(List[schemas.Product])
+
 
 # --- ФУНКЦИОНАЛ ДЛЯ ПРОДАВЦОВ (SELLER) ---
 
@@ -18,7 +34,7 @@ router = APIRouter(
 def create_store(
         store: schemas.StoreCreate,
         db: Session = Depends(get_db),
-        current_user: models.User = Depends(get_current_user)
+        current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     [SELLER] Добавление нового магазина.
@@ -36,14 +52,16 @@ def create_store(
     db_store = models.Store(name=store.name, seller_id=current_user.id)
     db.add(db_store)
     db.commit()
-    db.refresh(db_store)
+
+    # Список магазинов изменился — сбрасываем его кэш
+    catalog_cache.invalidate(catalog_cache.STORES)
     return db_store
 
 
 @router.get("/my", response_model=List[schemas.Store])
 def get_my_stores(
-        db: Session = Depends(get_db),
-        current_user: models.User = Depends(get_current_user)
+        db: Session = Depends(get_read_db),
+        current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     [SELLER] Получить список магазинов, принадлежащих текущему продавцу.
@@ -64,62 +82,358 @@ def get_my_stores(
     return stores
 
 
-@router.post("/{store_id}/products", response_model=schemas.Product, status_code=status.HTTP_201_CREATED)
-def create_product(
-        store_id: int,
-        product: schemas.ProductCreate,
-        db: Session = Depends(get_db),
-        current_user: models.User = Depends(get_current_user)
-):
-    """
-    [SELLER] Добавление нового товара в свой магазин.
-    Проверяет, что SELLER владеет магазином.
-    """
+def _check_store_owner(db: Session, store_id: int, current_user: CurrentUser) -> None:
+    """Проверяет, что текущий пользователь — продавец и владелец магазина."""
     if current_user.role.value != models.UserRole.SELLER.value:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied. Seller required.")
 
-    # 1. Проверяем существование магазина и его владельца
     store = db.query(models.Store).filter(models.Store.id == store_id).first()
     if not store:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Store not found")
 
-    # 2. Проверяем, что текущий пользователь является владельцем магазина
     if store.seller_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You are not the owner of this store."
         )
 
+
+@router.post("/{store_id}/products", response_model=schemas.Product, status_code=status.HTTP_201_CREATED)
+def create_product(
+        store_id: int,
+        product: schemas.ProductCreate,
+        db: Session = Depends(get_db),
+        current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    [SELLER] Добавление нового товара в свой магазин.
+    Проверяет, что SELLER владеет магазином.
+    """
+    # 1-2. Проверяем роль, существование магазина и его владельца
+    _check_store_owner(db, store_id, current_user)
+
     # 3. Создание товара
     db_product = models.Product(**product.dict(), store_id=store_id)
     db.add(db_product)
     db.commit()
-    db.refresh(db_product)
+
+    # Товары магазина изменились — сбрасываем их кэш и сводки в списке магазинов
+    catalog_cache.invalidate(catalog_cache.store_scope(store_id))
+    catalog_cache.invalidate(catalog_cache.STORES)
     return db_product
 
 
+def _insert_products(db: Session, store_id: int, rows: List[dict]) -> None:
+    """Вставляет пачку товаров одним executemany и фиксирует транзакцию."""
+    db.execute(insert(models.Product), [dict(row, store_id=store_id) for row in rows])
+    db.commit()
+
+
+@router.post("/{store_id}/products/import", response_model=schemas.ProductImportReport)
+async def import_products(
+        store_id: int,
+        request: Request,
+        data_format: Optional[str] = Query(
+            None, alias="format", pattern="^(csv|ndjson)$",
+            description="csv или ndjson; по умолчанию определяется по Content-Type",
+        ),
+        batch_size: int = Query(config.IMPORT_BATCH_SIZE, ge=1, le=10000),
+        db: Session = Depends(get_db),
+        current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    [SELLER] Массовый импорт товаров в свой магазин из CSV (с заголовком name,description,price[,stock])
+    или NDJSON (по объекту ProductCreate в строке).
+    Тело читается потоком, строки проверяются по ProductCreate и вставляются пачками
+    по batch_size в отдельных транзакциях. Некорректные строки пропускаются и попадают в отчет.
+    """
+    data_format = data_format or product_import.detect_format(request.headers.get("content-type"))
+    if data_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson.",
+        )
+
+    await run_in_threadpool(_check_store_owner, db, store_id, current_user)
+
+    report = schemas.ProductImportReport(imported=0, failed=0)
+    batch: List[dict] = []
+
+    def add_error(row: int, error: str) -> None:
+        report.failed += 1
+        if len(report.errors) < config.IMPORT_MAX_ERRORS:
+            report.errors.append(schemas.ImportRowError(row=row, error=error))
+        else:
+            report.errors_truncated = True
+
+    async def flush() -> None:
+        if batch:
+            await run_in_threadpool(_insert_products, db, store_id, batch)
+            report.imported += len(batch)
+            batch.clear()
+
+    row = 0
+    try:
+        async for row, product in product_import.iter_products(request.stream(), data_format):
+            if isinstance(product, product_import.RecordError):
+                add_error(row, str(product))
+                continue
+            batch.append(product)
+            if len(batch) >= batch_size:
+                await flush()
+    except product_import.RecordError as exc:
+        # Поток дальше разобрать нельзя: сохраняем уже прочитанное и прекращаем импорт
+        add_error(row + 1, str(exc))
+    await flush()
+
+    if report.imported:
+        catalog_cache.invalidate(catalog_cache.store_scope(store_id))
+        catalog_cache.invalidate(catalog_cache.STORES)
+    return report
+
+
+@router.get("/{store_id}/stats", response_model=schemas.StoreStats)
+def get_store_stats(
+        store_id: int,
+        date_from: Optional[date] = Query(None, description="По умолчанию — 30 дней до date_to"),
+        date_to: Optional[date] = Query(None, description="Включительно, по умолчанию — сегодня (UTC)"),
+        top: int = Query(10, ge=1, le=100),
+        db: Session = Depends(get_read_db),
+        current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    [SELLER] Статистика продаж магазина за период: выручка, штуки, число заказов,
+    топ товаров и разбивка по дням и статусам. Читается из дневных агрегатов (analytics.py).
+    """
+    _check_store_owner(db, store_id, current_user)
+
+    date_to = date_to or datetime.utcnow().date()
+    date_from = date_from or date_to - timedelta(days=30)
+
+    by_day = (
+        db.query(models.StoreDailyStats)
+        .filter(
+            models.StoreDailyStats.store_id == store_id,
+            models.StoreDailyStats.day >= date_from,
+            models.StoreDailyStats.day <= date_to,
+            models.StoreDailyStats.order_count != 0,
+        )
+        .order_by(models.StoreDailyStats.day, models.StoreDailyStats.status)
+        .all()
+    )
+
+    top_products = (
+        db.query(
+            models.ProductDailySales.product_id,
+            models.Product.name,
+            func.sum(models.ProductDailySales.units).label("units"),
+            func.sum(models.ProductDailySales.revenue).label("revenue"),
+        )
+        .join(models.Product, models.Product.id == models.ProductDailySales.product_id)
+        .filter(
+            models.ProductDailySales.store_id == store_id,
+            models.ProductDailySales.day >= date_from,
+            models.ProductDailySales.day <= date_to,
+        )
+        .group_by(models.ProductDailySales.product_id, models.Product.name)
+        .having(func.sum(models.ProductDailySales.units) > 0)
+        .order_by(func.sum(models.ProductDailySales.revenue).desc())
+        .limit(top)
+        .all()
+    )
+
+    active = [row for row in by_day if row.status != models.OrderStatus.CANCELLED]
+    return schemas.StoreStats(
+        store_id=store_id,
+        date_from=date_from,
+        date_to=date_to,
+        revenue=round(sum(row.revenue for row in active), 2),
+        units=sum(row.units for row in active),
+        order_count=sum(row.order_count for row in active),
+        top_products=[
+            schemas.TopProduct(product_id=row.product_id, name=row.name, units=row.units, revenue=round(row.revenue, 2))
+            for row in top_products
+        ],
+        by_day=[
+            schemas.DailyStatusStats(
+                day=row.day, status=row.status, revenue=round(row.revenue, 2),
+                units=row.units, order_count=row.order_count,
+            )
+            for row in by_day
+        ],
+    )
+
+
 # --- ФУНКЦИОНАЛ ДЛЯ ПОКУПАТЕЛЕЙ И ВСЕХ (BUYER/ALL) ---
 
-@router.get("/", response_model=List[schemas.Store])
-def get_all_stores(db: Session = Depends(get_db)):
-    """[BUYER/ALL] Просмотр списка всех магазинов."""
+def _stores_with_summary(db: Session, store_ids: List[int]) -> List[schemas.StoreDetails]:
+    """
+    Магазины со сводкой одним запросом: товары и заказы агрегируются двумя сгруппированными
+    подзапросами по всем переданным магазинам сразу (а не подзапросом на каждый магазин).
+    Товары считаются по индексу (store_id, price, id), заказы — по дневным агрегатам
+    StoreDailyStats (analytics.py), а не по order_items.
+    """
+    if not store_ids:
+        return []
+
+    products = (
+        select(
+            models.Product.store_id,
+            func.count().label("product_count"),
+            func.min(models.Product.price).label("min_price"),
+            func.max(models.Product.price).label("max_price"),
+        )
+        .where(models.Product.store_id.in_(store_ids))
+        .group_by(models.Product.store_id)
+        .subquery()
+    )
+    orders = (
+        select(
+            models.StoreDailyStats.store_id,
+            func.sum(models.StoreDailyStats.order_count).label("order_count"),
+        )
+        .where(
+            models.StoreDailyStats.store_id.in_(store_ids),
+            models.StoreDailyStats.status != models.OrderStatus.CANCELLED,
+        )
+        .group_by(models.StoreDailyStats.store_id)
+        .subquery()
+    )
+
+    rows = db.execute(
+        select(
+            models.Store,
+            func.coalesce(products.c.product_count, 0),
+            products.c.min_price,
+            products.c.max_price,
+            func.coalesce(orders.c.order_count, 0),
+        )
+        .outerjoin(products, products.c.store_id == models.Store.id)
+        .outerjoin(orders, orders.c.store_id == models.Store.id)
+        .where(models.Store.id.in_(store_ids))
+        .order_by(models.Store.id)
+    ).all()
+
+    return [
+        schemas.StoreDetails(
+            id=store.id, name=store.name, seller_id=store.seller_id,
+            summary=schemas.StoreSummary(
+                product_count=product_count, min_price=min_price, max_price=max_price, order_count=order_count,
+            ),
+        )
+        for store, product_count, min_price, max_price, order_count in rows
+    ]
+
+
+@router.get("/", response_model=List[schemas.StoreDetails])
+def get_all_stores(
+        request: Request,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        after_id: Optional[int] = Query(None, description="id последнего магазина предыдущей страницы"),
+        name_prefix: Optional[str] = Query(None, min_length=1),
+        with_summary: bool = Query(False, description="Добавить сводку по товарам и заказам (summary)"),
+        db: Session = Depends(get_read_db)
+):
+    """
+    [BUYER/ALL] Просмотр списка магазинов (постранично).
+    Следующая страница: after_id = id последнего магазина в ответе.
+    С with_summary=true у каждого магазина есть summary (+1 запрос на страницу).
+    Ответ кэшируется (ETag / If-None-Match), см. catalog_cache.
+    """
+
+    # 304 или готовый ответ из кэша — без обращения к БД
+    view = catalog_cache.CatalogView(request, catalog_cache.STORES)
+    cached = view.cached_response()
+    if cached is not None:
+        return cached
 
     # Не требует аутентификации, но если вы хотите, чтобы это было доступно только BUYER,
-    # добавьте 'current_user: models.User = Depends(get_current_user)' и проверку роли.
+    # добавьте 'current_user: CurrentUser = Depends(get_current_user)' и проверку роли.
 
-    stores = db.query(models.Store).all()
-    return stores
+    query = db.query(models.Store)
+    if name_prefix:
+        query = query.filter(models.Store.name.startswith(name_prefix, autoescape=True))
+    if after_id is not None:
+        query = query.filter(models.Store.id > after_id)
+
+    stores = query.order_by(models.Store.id).limit(limit).all()
+    if with_summary:
+        return view.respond(stores_details_adapter, _stores_with_summary(db, [store.id for store in stores]))
+    return view.respond(stores_adapter, stores)
+
+
+@router.get("/{store_id}", response_model=schemas.StoreDetails)
+def get_store(
+        store_id: int,
+        request: Request,
+        db: Session = Depends(get_read_db)
+):
+    """
+    [BUYER/ALL] Магазин со сводкой: число товаров, минимальная и максимальная цена, число заказов.
+    Ответ кэшируется (ETag / If-None-Match) вместе с товарами магазина; число заказов
+    может отставать не больше чем на CATALOG_CACHE_TTL.
+    """
+    view = catalog_cache.CatalogView(request, catalog_cache.store_scope(store_id))
+    cached = view.cached_response()
+    if cached is not None:
+        return cached
+
+    stores = _stores_with_summary(db, [store_id])
+    if not stores:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Store not found")
+    return view.respond(store_details_adapter, stores[0])
 
 
 @router.get("/{store_id}/products", response_model=List[schemas.Product])
-def get_products_in_store(store_id: int, db: Session = Depends(get_db)):
-    """[BUYER/ALL] Просмотр товаров в конкретном магазине."""
+def get_products_in_store(
+        store_id: int,
+        request: Request,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        after_id: Optional[int] = Query(None, description="id последнего товара предыдущей страницы"),
+        sort: schemas.ProductSort = schemas.ProductSort.ID,
+        min_price: Optional[float] = Query(None, ge=0),
+        max_price: Optional[float] = Query(None, ge=0),
+        name_prefix: Optional[str] = Query(None, min_length=1),
+        db: Session = Depends(get_read_db)
+):
+    """
+    [BUYER/ALL] Просмотр товаров в конкретном магазине (постранично).
+    Следующая страница: after_id = id последнего товара в ответе (с теми же sort и фильтрами).
+    Ответ кэшируется (ETag / If-None-Match), см. catalog_cache.
+    """
+
+    # 304 или готовый ответ из кэша — без обращения к БД
+    view = catalog_cache.CatalogView(request, catalog_cache.store_scope(store_id))
+    cached = view.cached_response()
+    if cached is not None:
+        return cached
 
     # 1. Проверяем существование магазина
     store = db.query(models.Store).filter(models.Store.id == store_id).first()
     if not store:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Store not found")
 
-    # 2. Запрос товаров
-    products = db.query(models.Product).filter(models.Product.store_id == store_id).all()
-    return products
+    # 2. Запрос товаров. Все условия идут по префиксу индексов
+    # (store_id, id) / (store_id, price, id), поэтому глубокая страница
+    # стоит столько же, сколько первая.
+    query = db.query(models.Product).filter(models.Product.store_id == store_id)
+    if min_price is not None:
+        query = query.filter(models.Product.price >= min_price)
+    if max_price is not None:
+        query = query.filter(models.Product.price <= max_price)
+    if name_prefix:
+        query = query.filter(models.Product.name.startswith(name_prefix, autoescape=True))
+
+    if sort == schemas.ProductSort.PRICE:
+        if after_id is not None:
+            # Курсор (price, id): цену последнего товара берем подзапросом по первичному ключу
+            after_price = select(models.Product.price).where(models.Product.id == after_id).scalar_subquery()
+            query = query.filter(tuple_(models.Product.price, models.Product.id) > tuple_(after_price, after_id))
+        query = query.order_by(models.Product.price, models.Product.id)
+    else:
+        if after_id is not None:
+            query = query.filter(models.Product.id > after_id)
+        query = query.order_by(models.Product.id)
+
+    products = query.limit(limit).all()
+    return view.respond(products_adapter, products)
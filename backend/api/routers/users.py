@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from ..database import get_db
-from .. import schemas, models
-from ..auth_utils import get_password_hash, verify_password, create_access_token, get_current_user
+from .. import schemas, models, password_pool
+from ..auth_utils import CurrentUser, create_access_token, get_current_user
 from datetime import timedelta
 
 router = APIRouter(
@@ -15,17 +16,31 @@ router = APIRouter(
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 
+# register и login — async: bcrypt выполняется в пуле процессов (password_pool),
+# и пока он считает, запрос не занимает поток из пула Starlette.
+# Короткие обращения к синхронной сессии выполняются через run_in_threadpool.
+
+def _get_user_by_username(db: Session, username: str):
+    return db.query(models.User).filter(models.User.username == username).first()
+
+
+def _save(db: Session, obj):
+    db.add(obj)
+    db.commit()  # Объект не истекает после commit (expire_on_commit=False) — refresh не нужен
+    return obj
+
+
 @router.post("/register", response_model=schemas.User)
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     """Регистрация нового пользователя (покупателя или продавца)."""
 
     # 1. Проверка на существование пользователя
-    db_user = db.query(models.User).filter(models.User.username == user.username).first()
+    db_user = await run_in_threadpool(_get_user_by_username, db, user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
 
     # 2. Хеширование пароля
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await password_pool.hash_password(user.password)
 
     # 3. Создание пользователя
     db_user = models.User(
@@ -33,19 +48,15 @@ def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
         hashed_password=hashed_password,
         role=user.role
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-
-    return db_user
+    return await run_in_threadpool(_save, db, db_user)
 
 
 @router.post("/login", response_model=schemas.Token)
-def login_for_access_token(user_data: schemas.UserLogin, db: Session = Depends(get_db)):
+async def login_for_access_token(user_data: schemas.UserLogin, db: Session = Depends(get_db)):
     """Вход и выдача JWT токена."""
 
     # 1. Поиск пользователя
-    user = db.query(models.User).filter(models.User.username == user_data.username).first()
+    user = await run_in_threadpool(_get_user_by_username, db, user_data.username)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -53,16 +64,22 @@ def login_for_access_token(user_data: schemas.UserLogin, db: Session = Depends(g
         )
 
     # 2. Проверка пароля
-    if not verify_password(user_data.password, user.hashed_password):
+    is_valid, new_hash = await password_pool.verify_password(user_data.password, user.hashed_password)
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
         )
 
+    # Стоимость bcrypt изменилась (BCRYPT_ROUNDS) — сохраняем пересчитанный хеш
+    if new_hash:
+        user.hashed_password = new_hash
+        user = await run_in_threadpool(_save, db, user)
+
     # 3. Генерация токена
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"id": user.id, "role": user.role.value},  # Включаем id и role в токен
+        data={"id": user.id, "username": user.username, "role": user.role.value},  # Включаем id, имя и role в токен
         expires_delta=access_token_expires
     )
 
@@ -70,6 +87,6 @@ def login_for_access_token(user_data: schemas.UserLogin, db: Session = Depends(g
 
 
 @router.get("/me", response_model=schemas.User)
-def read_users_me(current_user: models.User = Depends(get_current_user)):
+def read_users_me(current_user: CurrentUser = Depends(get_current_user)):
     """Получение данных текущего аутентифицированного пользователя."""
     return current_user
\ No newline at end of file
@@ -1,9 +1,9 @@
 # schemas.py
-from datetime import datetime
+from datetime import date, datetime
 
 from pydantic import BaseModel, Field
 from enum import Enum as PyEnum
-from typing import List
+from typing import List, Optional
 
 # Роли
 class Role(str, PyEnum):
@@ -48,6 +48,7 @@ class ProductBase(BaseModel):
     name: str
     description: str
     price: float
+    stock: Optional[int] = Field(None, ge=0)  # None — остаток не ведется
 
 
 class ProductCreate(ProductBase):
@@ -62,6 +63,12 @@ class Product(ProductBase):
         from_attributes = True
 
 
+# Сортировка списка товаров магазина
+class ProductSort(str, PyEnum):
+    ID = "id"
+    PRICE = "price"
+
+
 # 5. Схемы для Магазина
 class StoreBase(BaseModel):
     name: str
@@ -81,6 +88,37 @@ class Store(StoreBase):
         from_attributes = True
 
 
+# Сводка по каталогу магазина (GET /stores/{id}, GET /stores/?with_summary=true)
+class StoreSummary(BaseModel):
+    product_count: int = 0
+    min_price: Optional[float] = None  # None — в магазине нет товаров
+    max_price: Optional[float] = None
+    order_count: int = 0  # Заказы с товарами магазина, без отмененных
+
+
+class StoreDetails(Store):
+    summary: Optional[StoreSummary] = None
+
+
+# Отчет массового импорта товаров: сколько вставлено и ошибки по строкам
+class ImportRowError(BaseModel):
+    row: int  # Номер строки данных (без заголовка CSV), начиная с 1
+    error: str
+
+
+class ProductImportReport(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ImportRowError] = []
+    errors_truncated: bool = False  # В errors попали не все ошибки (см. IMPORT_MAX_ERRORS)
+
+
+# Результат поиска товаров: товар, его магазин и релевантность (больше — лучше)
+class ProductSearchResult(Product):
+    store: Store
+    score: float = 0.0
+
+
 # ... (Предыдущие схемы для User, Store, Product) ...
 
 
@@ -116,11 +154,45 @@ class Order(BaseModel):
     status: OrderStatus
     created_at: datetime
     items: List[OrderItem] = []  # Содержимое заказа
+    archived: bool = False  # Заказ из архива (только с include_archived)
 
     class Config:
         from_attributes = True
 
 
+# Заказ в общей ленте продавца: с пометкой, каких магазинов продавца он касается
+class SellerOrder(Order):
+    store_ids: List[int] = []
+
+
 # Схема для обновления статуса заказа (для продавца)
 class OrderStatusUpdate(BaseModel):
-    status: OrderStatus
\ No newline at end of file
+    status: OrderStatus
+
+
+# 7. Аналитика продаж магазина
+class DailyStatusStats(BaseModel):
+    day: date
+    status: OrderStatus
+    revenue: float
+    units: int
+    order_count: int
+
+
+class TopProduct(BaseModel):
+    product_id: int
+    name: str
+    units: int
+    revenue: float
+
+
+class StoreStats(BaseModel):
+    store_id: int
+    date_from: date
+    date_to: date
+    # Итоги без отмененных заказов
+    revenue: float
+    units: int
+    order_count: int
+    top_products: List[TopProduct] = []
+    by_day: List[DailyStatusStats] = []  # Разбивка по дням и статусам (включая CANCELLED)
@@ -0,0 +1,154 @@
+# search.py
+# Полнотекстовый поиск товаров.
+# SQLite: внешняя FTS5-таблица products_fts над products, синхронизируется триггерами
+# (create_product, импорт и любые другие вставки/изменения), ранжирование BM25.
+# PostgreSQL: GIN-индекс по выражению to_tsvector(...), ранжирование ts_rank_cd.
+#
+# Перестроить индекс для уже существующих данных:
+#     python -m api.search rebuild
+import argparse
+import re
+from typing import List, Tuple
+
+from sqlalchemy import column, func, literal_column, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, joinedload
+
+from . import models
+
+FTS_TABLE = "products_fts"
+
+_SQLITE_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+]
+
+def _pg_document(table_prefix: str = "") -> str:
+    """
+    Выражение tsvector для индекса и для запроса. В запросе столбцы квалифицируются (products.name):
+    joinedload магазина добавляет stores, где тоже есть name. PostgreSQL хранит выражение индекса
+    по ссылкам на столбцы, поэтому квалифицированная форма в запросе совпадает с индексом.
+    """
+    return (
+        f"to_tsvector('simple', coalesce({table_prefix}name, '') || ' ' || "
+        f"coalesce({table_prefix}description, ''))"
+    )
+
+
+_PG_INDEX = "ix_products_search"
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def ensure_search_index(engine: Engine) -> None:
+    """Создает поисковый индекс, если его нет (при создании — индексирует существующие товары)."""
+    with engine.begin() as connection:
+        if engine.dialect.name == "sqlite":
+            exists = connection.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE},
+            ).first()
+            for statement in _SQLITE_DDL:
+                connection.execute(text(statement))
+            if not exists:
+                connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        elif engine.dialect.name == "postgresql":
+            connection.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {_PG_INDEX} ON products USING GIN ({_pg_document()})"
+            ))
+
+
+def rebuild(engine: Engine) -> None:
+    """Полностью перестраивает поисковый индекс по таблице products."""
+    ensure_search_index(engine)
+    with engine.begin() as connection:
+        if engine.dialect.name == "sqlite":
+            connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        elif engine.dialect.name == "postgresql":
+            connection.execute(text(f"REINDEX INDEX {_PG_INDEX}"))
+
+
+def _terms(query: str) -> List[str]:
+    # Из пользовательского ввода берем только слова: синтаксис MATCH / tsquery наружу не выставляем
+    return _WORD.findall(query.lower())
+
+
+def search_products(db: Session, query: str, limit: int, offset: int) -> List[Tuple[models.Product, float]]:
+    """
+    Ищет товары по названию и описанию во всех магазинах.
+    Все слова запроса обязательны, последнее ищется по префиксу.
+    Возвращает пары (товар с загруженным магазином, релевантность), лучшие первыми.
+    """
+    terms = _terms(query)
+    if not terms:
+        return []
+
+    if db.get_bind().dialect.name == "postgresql":
+        tsquery = " & ".join(terms[:-1] + [terms[-1] + ":*"])
+        document = literal_column(_pg_document(f"{models.Product.__tablename__}."))
+        ts_query = func.to_tsquery("simple", tsquery)
+        rank = func.ts_rank_cd(document, ts_query).label("rank")
+        results = (
+            db.query(models.Product, rank)
+            .filter(document.op("@@")(ts_query))
+            .order_by(rank.desc(), models.Product.id)
+        )
+    else:
+        # Каждое слово — в кавычках (фраза FTS5), последнее — с префиксным поиском
+        match = " ".join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+        fts = table(FTS_TABLE, column("rowid"), column("rank"))
+        # Скрытый столбец rank в FTS5 по умолчанию равен bm25(): чем меньше, тем релевантнее
+        results = (
+            db.query(models.Product, -fts.c.rank)
+            .join(fts, fts.c.rowid == models.Product.id)
+            .filter(literal_column(FTS_TABLE).op("MATCH")(match.strip()))
+            .order_by(fts.c.rank, models.Product.id)
+        )
+
+    return (
+        results
+        .options(joinedload(models.Product.store))
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Поисковый индекс товаров")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    from .database import engine
+    from .migrate import migrate
+
+    migrate(engine)
+    rebuild(engine)
+    print("Search index rebuilt.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# server.py
+# Запуск API в продакшене: несколько процессов-воркеров uvicorn.
+#
+#     python run.py                       # WEB_WORKERS воркеров (по умолчанию — по числу CPU)
+#     python -m api.server --workers 4 --port 5001
+#     python -m api.server --reload       # разработка: один процесс с перезагрузкой по изменению кода
+#
+# Перед запуском воркеров схема БД обновляется один раз (migrate.py), воркеры стартуют
+# с DB_AUTO_MIGRATE=0 и не выполняют DDL.
+# Плавный перезапуск воркеров (например, после деплоя): kill -HUP <pid мастера> —
+# воркеры перезапускаются по одному и дорабатывают начатые запросы (WEB_GRACEFUL_TIMEOUT).
+import argparse
+import glob
+import os
+import sys
+import tempfile
+
+from . import config
+
+APP = "api.main:app"
+
+
+def _prepare_metrics_dir() -> None:
+    """Каталог для метрик Prometheus из нескольких процессов (см. metrics.py)."""
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if not directory:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="shop-api-metrics-")
+        return
+    # Файлы прошлого запуска исказили бы счетчики — каталог очищается при каждом старте
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "*.db")):
+        os.remove(path)
+
+
+def _migrate() -> None:
+    from .database import engine
+    from .migrate import migrate_with_lock
+
+    migrate_with_lock(engine)
+    # Соединения мастера воркерам не нужны
+    engine.dispose()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP-сервер API")
+    parser.add_argument("--host", default=config.WEB_HOST)
+    parser.add_argument("--port", type=int, default=config.WEB_PORT)
+    parser.add_argument("--workers", type=int, default=config.WEB_WORKERS,
+                        help="число процессов-воркеров (WEB_WORKERS, по умолчанию — по числу CPU)")
+    parser.add_argument("--reload", action="store_true",
+                        help="разработка: один процесс, перезапуск при изменении кода")
+    parser.add_argument("--no-migrate", action="store_true",
+                        help="не обновлять схему БД перед запуском (миграция выполнена отдельно)")
+    args = parser.parse_args(argv)
+
+    workers = 1 if args.reload else max(1, args.workers)
+
+    if workers > 1:
+        _prepare_metrics_dir()
+        if "HASH_WORKERS" not in os.environ:
+            # Пул bcrypt есть в каждом воркере: делим CPU между ними, а не берем все CPU в каждом
+            os.environ["HASH_WORKERS"] = str(max(1, (os.cpu_count() or 1) // workers))
+        if config.EVENTS_BROKER == "local":
+            print(
+                "WARNING: EVENTS_BROKER=local with several workers — SSE clients receive only "
+                "order events of the worker they are connected to.",
+                file=sys.stderr,
+            )
+
+    if not args.no_migrate:
+        _migrate()
+    # Воркеры (отдельные процессы) наследуют окружение мастера
+    os.environ["DB_AUTO_MIGRATE"] = "0"
+
+    import uvicorn
+
+    uvicorn.run(
+        APP,
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        reload=args.reload,
+        timeout_graceful_shutdown=config.WEB_GRACEFUL_TIMEOUT,
+        proxy_headers=True,
+        forwarded_allow_ips=config.WEB_FORWARDED_ALLOW_IPS,
+    )
+
+
+if __name__ == "__main__":
+    main()
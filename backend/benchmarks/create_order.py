@@ -0,0 +1,75 @@
+"""
+Бенчмарк оформления заказа: время и число SQL-запросов в зависимости от размера корзины.
+
+Запуск (из каталога backend):
+    python -m benchmarks.create_order --sizes 1 10 40 100 --repeat 50
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api import models, schemas
+from api.query_stats import count_queries
+from api.routers import orders
+
+
+def _setup(db_path: str, products_count: int):
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with SessionLocal() as db:
+        seller = models.User(username="bench_seller", hashed_password="-", role=models.UserRole.SELLER)
+        buyer = models.User(username="bench_buyer", hashed_password="-", role=models.UserRole.BUYER)
+        store = models.Store(name="Bench Store", seller=seller)
+        db.add_all([seller, buyer, store])
+        db.flush()
+        db.add_all([
+            models.Product(name=f"Product {i}", description="-", price=10.0 + i, store_id=store.id)
+            for i in range(products_count)
+        ])
+        db.commit()
+        buyer_id = buyer.id
+
+    return engine, SessionLocal, buyer_id
+
+
+def run(sizes, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, SessionLocal, buyer_id = _setup(os.path.join(tmp, "bench.db"), max(sizes))
+
+        print(f"{'cart':>6} {'queries':>8} {'p50, ms':>9} {'p95, ms':>9}")
+        for size in sizes:
+            cart = [schemas.CartItem(product_id=i + 1, quantity=1) for i in range(size)]
+            timings = []
+            for _ in range(repeat):
+                with SessionLocal() as db:
+                    buyer = db.get(models.User, buyer_id)
+                    with count_queries() as statements:
+                        started = time.perf_counter()
+                        orders.create_order(cart, idempotency_key=None, db=db, current_user=buyer)
+                        timings.append((time.perf_counter() - started) * 1000)
+                    queries = len(statements)
+
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            print(f"{size:>6} {queries:>8} {statistics.median(timings):>9.2f} {p95:>9.2f}")
+
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк POST /orders/create")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 40, 100])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    run(args.sizes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
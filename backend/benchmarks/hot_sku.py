@@ -0,0 +1,125 @@
+"""
+Конкурентная проверка резервирования остатков: сотни покупателей одновременно
+заказывают один «горячий» товар. Проверяет, что продано ровно столько, сколько было
+на складе (нет перепродажи), и печатает пропускную способность оформления заказов.
+
+Запуск (из каталога backend; без DATABASE_URL используется временная SQLite-база):
+    python -m benchmarks.hot_sku --buyers 300 --stock 100 --quantity 1
+    DATABASE_URL=postgresql://... python -m benchmarks.hot_sku --buyers 500 --stock 200
+
+Код выхода 1, если остаток ушел в минус или число проданных единиц не сходится.
+Нужен httpx (benchmarks/requirements.txt).
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+
+def _prepare(buyers: int, stock: int, quantity: int) -> tuple:
+    """Создает продавца, магазин, горячий товар и покупателей; возвращает (product_id, токены)."""
+    from api import models
+    from api.auth_utils import create_access_token
+    from api.database import SessionLocal, engine
+    from api.migrate import migrate
+
+    migrate(engine)
+    suffix = str(time.time_ns())
+    with SessionLocal() as db:
+        seller = models.User(username=f"hot_seller_{suffix}", hashed_password="-", role=models.UserRole.SELLER)
+        store = models.Store(name="Hot Store", seller=seller)
+        product = models.Product(name="Hot SKU", description="-", price=9.99, stock=stock, store=store)
+        users = [
+            models.User(username=f"hot_buyer_{suffix}_{n}", hashed_password="-", role=models.UserRole.BUYER)
+            for n in range(buyers)
+        ]
+        db.add_all([seller, store, product, *users])
+        db.commit()
+        tokens = [
+            create_access_token({"id": user.id, "username": user.username, "role": user.role.value})
+            for user in users
+        ]
+        return product.id, tokens
+
+
+def _check(product_id: int, stock: int) -> tuple:
+    """Остаток товара и сумма единиц в заказах по нему."""
+    from sqlalchemy import func, select
+
+    from api import models
+    from api.database import SessionLocal
+
+    with SessionLocal() as db:
+        remaining = db.get(models.Product, product_id).stock
+        sold = db.execute(
+            select(func.coalesce(func.sum(models.OrderItem.quantity), 0))
+            .where(models.OrderItem.product_id == product_id)
+        ).scalar()
+    return remaining, sold
+
+
+async def _buy(client: httpx.AsyncClient, token: str, product_id: int, quantity: int, latencies: list) -> int:
+    started = time.perf_counter()
+    response = await client.post(
+        "/orders/create",
+        json=[{"product_id": product_id, "quantity": quantity}],
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    latencies.append((time.perf_counter() - started) * 1000)
+    return response.status_code
+
+
+async def run(buyers: int, stock: int, quantity: int) -> bool:
+    from api.main import app
+
+    product_id, tokens = _prepare(buyers, stock, quantity)
+
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        started = time.perf_counter()
+        statuses = Counter(await asyncio.gather(*(
+            _buy(client, token, product_id, quantity, latencies) for token in tokens
+        )))
+        elapsed = time.perf_counter() - started
+
+    remaining, sold = _check(product_id, stock)
+    latencies.sort()
+    print(f"buyers={buyers} stock={stock} quantity={quantity}")
+    print(f"responses: {dict(statuses)}")
+    print(f"sold={sold} remaining={remaining} expected_sold={min(stock // quantity, buyers) * quantity}")
+    print(f"{buyers / elapsed:.1f} checkouts/s, p50={latencies[len(latencies) // 2]:.1f} ms, "
+          f"p95={latencies[int(len(latencies) * 0.95) - 1]:.1f} ms")
+
+    return (
+        remaining >= 0
+        and sold + remaining == stock
+        and statuses[201] * quantity == sold
+        and statuses[201] == min(stock // quantity, buyers)
+        and statuses[201] + statuses[409] == buyers
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Параллельные заказы одного товара с ограниченным остатком")
+    parser.add_argument("--buyers", type=int, default=300)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--quantity", type=int, default=1, help="единиц в каждом заказе")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tmp, 'hot_sku.db')}")
+        # Все покупатели — с одного адреса; замеряется учет остатков, а не rate limit
+        os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+        ok = asyncio.run(run(args.buyers, args.stock, args.quantity))
+    print("OK" if ok else "FAILED: stock accounting mismatch")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Сценарный нагрузочный драйвер. Гоняет типичные сценарии через ASGI-приложение
+в том же процессе (--target asgi) или через работающий uvicorn (--target http://host:port)
+и пишет JSON-отчет: пропускная способность и p50/p95/p99 по каждому эндпоинту.
+
+Данные готовит benchmarks.seed (пользователи bench_buyer_<n> / bench_seller_<n>):
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.seed
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.load --target asgi --duration 30 --out run.json
+    python -m benchmarks.load --target http://127.0.0.1:5001 --baseline run.json --max-regression 20
+
+Виртуальные пользователи ходят с одного адреса: с включенным rate limit (RATE_LIMIT_ENABLED=1,
+см. rate_limit.py) сервер начнет отвечать 429, поэтому для замеров он должен быть выключен.
+
+Нужен httpx (benchmarks/requirements.txt).
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+
+from .seed import BENCH_PASSWORD, BUYER_PREFIX, SELLER_PREFIX
+
+# Сценарий -> вес в смеси нагрузки
+DEFAULT_MIX = {
+    "browse_catalog": 50,
+    "place_order": 20,
+    "seller_feed": 15,
+    "status_update": 10,
+    "register_login": 5,
+}
+
+
+class Recorder:
+    """Собирает задержки и ошибки по эндпоинтам (шаблонам маршрутов)."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        self.latencies[name].append((time.perf_counter() - started) * 1000)
+        if response is None or response.status_code >= 400:
+            self.errors[name] += 1
+            return None
+        return response
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def build_report(recorder: Recorder, elapsed: float, meta: dict) -> dict:
+    endpoints = {}
+    all_latencies = []
+    for name, values in sorted(recorder.latencies.items()):
+        values.sort()
+        all_latencies.extend(values)
+        endpoints[name] = {
+            "count": len(values),
+            "errors": recorder.errors[name],
+            "rps": round(len(values) / elapsed, 2),
+            "mean_ms": round(sum(values) / len(values), 2),
+            "p50_ms": round(_percentile(values, 50), 2),
+            "p95_ms": round(_percentile(values, 95), 2),
+            "p99_ms": round(_percentile(values, 99), 2),
+        }
+    all_latencies.sort()
+    total = {
+        "count": len(all_latencies),
+        "errors": sum(recorder.errors.values()),
+        "rps": round(len(all_latencies) / elapsed, 2),
+        "p50_ms": round(_percentile(all_latencies, 50), 2),
+        "p95_ms": round(_percentile(all_latencies, 95), 2),
+        "p99_ms": round(_percentile(all_latencies, 99), 2),
+    }
+    return {"meta": dict(meta, elapsed_s=round(elapsed, 2)), "total": total, "endpoints": endpoints}
+
+
+class VirtualUser:
+    """Один виртуальный пользователь: токены покупателя и продавца и известные id."""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, rng: random.Random, shared: dict):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.shared = shared
+        self.buyer_headers = {}
+        self.seller_headers = {}
+        self.seller_store_ids: List[int] = []
+
+    async def _login(self, username: str) -> dict:
+        # Все пользователи входят разом: сверх HASH_MAX_QUEUE сервер отвечает 503 — ждем Retry-After
+        while True:
+            response = await self.client.post("/users/login", json={"username": username, "password": BENCH_PASSWORD})
+            if response.status_code != 503:
+                break
+            await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+        response.raise_for_status()
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def setup(self, buyers: int, sellers: int):
+        self.buyer_headers = await self._login(f"{BUYER_PREFIX}{self.rng.randint(1, buyers)}")
+        self.seller_headers = await self._login(f"{SELLER_PREFIX}{self.rng.randint(1, sellers)}")
+        response = await self.client.get("/stores/my", headers=self.seller_headers)
+        self.seller_store_ids = [store["id"] for store in response.json()]
+
+    # --- Сценарии ---
+
+    async def register_login(self):
+        username = f"bench_load_{uuid.uuid4().hex[:12]}"
+        credentials = {"username": username, "password": BENCH_PASSWORD}
+        await self.recorder.call(self.client, "POST /users/register", "POST", "/users/register",
+                                 json=dict(credentials, role="BUYER"))
+        await self.recorder.call(self.client, "POST /users/login", "POST", "/users/login", json=credentials)
+
+    async def browse_catalog(self):
+        store_ids = self.shared["store_ids"]
+        await self.recorder.call(self.client, "GET /stores/", "GET", "/stores/",
+                                 params={"limit": 50, "after_id": self.rng.choice(store_ids)})
+        store_id = self.rng.choice(store_ids)
+        response = await self.recorder.call(self.client, "GET /stores/{id}/products", "GET",
+                                            f"/stores/{store_id}/products")
+        if response is not None:
+            self.shared["product_ids"].update(product["id"] for product in response.json())
+        await self.recorder.call(self.client, "GET /stores/{id}/products?sort=price", "GET",
+                                 f"/stores/{store_id}/products", params={"sort": "price", "limit": 20})
+        await self.recorder.call(self.client, "GET /products/search", "GET", "/products/search",
+                                 params={"q": self.rng.choice(["shirt", "blue jeans", "wool", "dress", "coat"])})
+
+    async def place_order(self):
+        product_ids = list(self.shared["product_ids"])
+        if not product_ids:
+            return
+        cart = [
+            {"product_id": product_id, "quantity": self.rng.randint(1, 3)}
+            for product_id in self.rng.sample(product_ids, min(len(product_ids), self.rng.randint(1, 5)))
+        ]
+        await self.recorder.call(self.client, "POST /orders/create", "POST", "/orders/create",
+                                 json=cart, headers=self.buyer_headers)
+
+    async def seller_feed(self):
+        await self.recorder.call(self.client, "GET /orders/seller", "GET", "/orders/seller",
+                                 headers=self.seller_headers)
+        if self.seller_store_ids:
+            store_id = self.rng.choice(self.seller_store_ids)
+            await self.recorder.call(self.client, "GET /orders/seller/store/{id}", "GET",
+                                     f"/orders/seller/store/{store_id}", headers=self.seller_headers)
+
+    async def status_update(self):
+        response = await self.recorder.call(self.client, "GET /orders/seller?status=PENDING", "GET", "/orders/seller",
+                                            params={"status": "PENDING", "limit": 10}, headers=self.seller_headers)
+        if response is None or not response.json():
+            return
+        order = self.rng.choice(response.json())
+        await self.recorder.call(self.client, "PATCH /orders/{id}/status", "PATCH", f"/orders/{order['id']}/status",
+                                 json={"status": "PROCESSING"}, headers=self.seller_headers)
+
+    async def run(self, deadline: float, mix: Dict[str, int]):
+        names, weights = zip(*mix.items())
+        while time.perf_counter() < deadline:
+            await getattr(self, self.rng.choices(names, weights)[0])()
+
+
+async def run_load(
+        client: httpx.AsyncClient,
+        concurrency: int,
+        duration: float,
+        buyers: int,
+        sellers: int,
+        mix: Dict[str, int],
+        seed: int,
+) -> dict:
+    recorder = Recorder()
+
+    # Общие данные: id магазинов и товаров, которые видели пользователи
+    response = await client.get("/stores/", params={"limit": 500})
+    response.raise_for_status()
+    shared = {"store_ids": [store["id"] for store in response.json()], "product_ids": set()}
+    if not shared["store_ids"]:
+        raise SystemExit("No stores found: run `python -m benchmarks.seed` first.")
+    for store_id in shared["store_ids"][:10]:
+        response = await client.get(f"/stores/{store_id}/products", params={"limit": 50})
+        shared["product_ids"].update(product["id"] for product in response.json())
+
+    users = [VirtualUser(client, recorder, random.Random(seed + n), shared) for n in range(concurrency)]
+    await asyncio.gather(*(user.setup(buyers, sellers) for user in users))
+
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(user.run(deadline, mix) for user in users))
+    elapsed = time.perf_counter() - started
+
+    return build_report(recorder, elapsed, {
+        "concurrency": concurrency,
+        "duration_s": duration,
+        "mix": mix,
+        "started_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+    })
+
+
+def compare(report: dict, baseline: dict, max_regression: Optional[float]) -> bool:
+    """Печатает сравнение с базовым прогоном. False — p95 какого-то эндпоинта вырос больше max_regression %."""
+    ok = True
+    print(f"\n{'endpoint':45} {'rps':>9} {'Δrps':>8} {'p95, ms':>9} {'Δp95':>8}")
+    for name, current in report["endpoints"].items():
+        base = baseline["endpoints"].get(name)
+        if not base:
+            print(f"{name:45} {current['rps']:>9} {'new':>8} {current['p95_ms']:>9} {'new':>8}")
+            continue
+        rps_delta = (current["rps"] - base["rps"]) / base["rps"] * 100 if base["rps"] else 0.0
+        p95_delta = (current["p95_ms"] - base["p95_ms"]) / base["p95_ms"] * 100 if base["p95_ms"] else 0.0
+        flag = ""
+        if max_regression is not None and p95_delta > max_regression:
+            ok = False
+            flag = "  <-- regression"
+        print(f"{name:45} {current['rps']:>9} {rps_delta:>+7.1f}% {current['p95_ms']:>9} {p95_delta:>+7.1f}%{flag}")
+    return ok
+
+
+def _client(target: str) -> httpx.AsyncClient:
+    timeout = httpx.Timeout(30.0)
+    if target == "asgi":
+        from api.main import app
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=timeout)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    return httpx.AsyncClient(base_url=target, timeout=timeout, limits=limits)
+
+
+async def _main(args) -> int:
+    mix = dict(DEFAULT_MIX)
+    for item in args.mix or []:
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX:
+            raise SystemExit(f"Unknown scenario {name!r}, expected one of {list(DEFAULT_MIX)}")
+        mix[name] = int(weight)
+    mix = {name: weight for name, weight in mix.items() if weight > 0}
+
+    async with _client(args.target) as client:
+        report = await run_load(client, args.concurrency, args.duration, args.buyers, args.sellers, mix, args.seed)
+    report["meta"]["target"] = args.target
+
+    print(json.dumps(report["total"], indent=2))
+    if args.out:
+        with open(args.out, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if not compare(report, baseline, args.max_regression):
+            return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон сценариев API")
+    parser.add_argument("--target", default="asgi", help="asgi (в процессе) или URL работающего сервера")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="секунды")
+    parser.add_argument("--buyers", type=int, default=1000, help="сколько bench_buyer_<n> создал seed")
+    parser.add_argument("--sellers", type=int, default=50, help="сколько bench_seller_<n> создал seed")
+    parser.add_argument("--mix", nargs="*", metavar="SCENARIO=WEIGHT", help=f"веса сценариев, по умолчанию {DEFAULT_MIX}")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="куда записать JSON-отчет")
+    parser.add_argument("--baseline", help="JSON-отчет прошлого прогона для сравнения")
+    parser.add_argument("--max-regression", type=float, help="допустимый рост p95, %%; иначе код выхода 1")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(_main(args)))
+
+
+if __name__ == "__main__":
+    main()
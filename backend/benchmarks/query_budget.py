@@ -0,0 +1,124 @@
+"""
+Бюджет SQL-запросов по эндпоинтам: прогоняет основные запросы через TestClient
+на временной базе и завершается с кодом 1, если какой-то эндпоинт выполнил больше
+запросов, чем разрешено в BUDGETS. Предназначен для CI:
+
+    python -m benchmarks.query_budget
+
+Бюджеты не зависят от объема данных: рост числа запросов вместе с размером корзины
+или числом заказов (N+1) сразу превысит лимит.
+"""
+import os
+import sys
+import tempfile
+
+# Эндпоинт -> максимум SQL-запросов
+BUDGETS = {
+    "POST /users/register": 2,
+    "POST /users/login": 1,
+    "GET /users/me": 1,
+    "POST /stores/": 2,
+    "POST /stores/{id}/products": 2,
+    "GET /stores/": 1,
+    "GET /stores/?with_summary": 2,
+    "GET /stores/{id}": 1,
+    "GET /stores/{id}/products": 2,
+    "GET /products/search": 1,
+    "POST /orders/create": 5,
+    "POST /orders/create (Idempotency-Key)": 8,
+    "POST /orders/create (replay)": 0,
+    "GET /orders/my": 1,
+    "GET /orders/seller": 3,
+    "GET /orders/my?include_archived": 2,
+    "GET /orders/seller?include_archived": 5,
+    "GET /orders/seller/store/{id}": 3,
+    "PATCH /orders/{id}/status": 7,
+    "GET /stores/{id}/stats": 3,
+}
+
+
+def run() -> list:
+    from fastapi.testclient import TestClient
+
+    from api.database import engine
+    from api.main import app
+    from api.migrate import migrate
+    from api.query_stats import assert_max_queries
+
+    # TestClient без with не запускает lifespan приложения — схему создаем сами
+    migrate(engine)
+    failures = []
+    client = TestClient(app)
+
+    def call(name, method, url, **kwargs):
+        response = None
+        try:
+            with assert_max_queries(BUDGETS[name], name) as statements:
+                response = client.request(method, url, **kwargs)
+        except AssertionError as error:
+            failures.append(str(error))
+            print(f"FAIL {name:32} {len(statements):>3} / {BUDGETS[name]}")
+        else:
+            print(f"ok   {name:32} {len(statements):>3} / {BUDGETS[name]}")
+        response.raise_for_status()
+        return response
+
+    def login(username, role):
+        credentials = {"username": username, "password": "budget-password"}
+        call("POST /users/register", "POST", "/users/register", json=dict(credentials, role=role))
+        token = call("POST /users/login", "POST", "/users/login", json=credentials).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    seller = login("budget_seller", "SELLER")
+    buyer = login("budget_buyer", "BUYER")
+    call("GET /users/me", "GET", "/users/me", headers=buyer)
+
+    store_id = call("POST /stores/", "POST", "/stores/", json={"name": "Budget Store"}, headers=seller).json()["id"]
+    product_ids = [
+        call("POST /stores/{id}/products", "POST", f"/stores/{store_id}/products",
+             json={"name": f"Budget shirt {i}", "description": "cotton", "price": 10 + i}, headers=seller).json()["id"]
+        for i in range(20)
+    ]
+    call("GET /stores/", "GET", "/stores/")
+    call("GET /stores/?with_summary", "GET", "/stores/", params={"with_summary": "true"})
+    call("GET /stores/{id}", "GET", f"/stores/{store_id}")
+    call("GET /stores/{id}/products", "GET", f"/stores/{store_id}/products")
+    call("GET /products/search", "GET", "/products/search", params={"q": "shirt"})
+
+    # Корзина из многих позиций и несколько заказов — чтобы N+1 был заметен
+    order_ids = []
+    for size in (1, 20, 20):
+        cart = [{"product_id": product_id, "quantity": 2} for product_id in product_ids[:size]]
+        order_ids.append(call("POST /orders/create", "POST", "/orders/create", json=cart, headers=buyer).json()["id"])
+
+    # С ключом идемпотентности: +1 проверка ключа и +1 его запись; повтор отдается из памяти
+    keyed = dict(buyer, **{"Idempotency-Key": "budget-order"})
+    cart = [{"product_id": product_ids[0], "quantity": 1}]
+    call("POST /orders/create (Idempotency-Key)", "POST", "/orders/create", json=cart, headers=keyed)
+    call("POST /orders/create (replay)", "POST", "/orders/create", json=cart, headers=keyed)
+
+    call("GET /orders/my", "GET", "/orders/my", headers=buyer)
+    call("GET /orders/seller", "GET", "/orders/seller", headers=seller)
+    call("GET /orders/my?include_archived", "GET", "/orders/my", params={"include_archived": "true"}, headers=buyer)
+    call("GET /orders/seller?include_archived", "GET", "/orders/seller",
+         params={"include_archived": "true"}, headers=seller)
+    call("GET /orders/seller/store/{id}", "GET", f"/orders/seller/store/{store_id}", headers=seller)
+    call("PATCH /orders/{id}/status", "PATCH", f"/orders/{order_ids[-1]}/status",
+         json={"status": "SHIPPED"}, headers=seller)
+    call("GET /stores/{id}/stats", "GET", f"/stores/{store_id}/stats", headers=seller)
+    return failures
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'budget.db')}"
+        # Регистрации и входы идут с одного адреса; rate limit запросов к БД не делает
+        os.environ["RATE_LIMIT_ENABLED"] = "0"
+        failures = run()
+    if failures:
+        print("\n" + "\n\n".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
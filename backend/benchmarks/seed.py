@@ -0,0 +1,171 @@
+"""
+Генератор синтетических данных для нагрузочных тестов.
+Пишет в базу из DATABASE_URL пакетными INSERT через существующие модели.
+
+Пример (из каталога backend):
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.seed --buyers 1000 --sellers 50 --orders 20000
+
+У всех пользователей пароль BENCH_PASSWORD; имена: bench_buyer_<n>, bench_seller_<n>,
+где n идет подряд с 1 (повторный запуск продолжает нумерацию) — по ним драйвер
+нагрузки (benchmarks.load) выбирает пользователей.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from api import analytics, models
+from api.auth_utils import get_password_hash
+from api.database import engine
+from api.migrate import migrate
+
+BENCH_PASSWORD = "bench-password"
+BUYER_PREFIX = "bench_buyer_"
+SELLER_PREFIX = "bench_seller_"
+
+BATCH_SIZE = 5000
+
+_ADJECTIVES = ["Classic", "Slim", "Oversized", "Vintage", "Summer", "Winter", "Cotton", "Linen", "Wool", "Denim"]
+_ITEMS = ["shirt", "t-shirt", "jeans", "dress", "jacket", "coat", "hoodie", "skirt", "scarf", "sweater", "socks"]
+_COLORS = ["black", "white", "blue", "red", "green", "grey", "beige", "navy"]
+
+# Распределение статусов: большинство заказов уже выполнено
+_STATUS_WEIGHTS = {
+    models.OrderStatus.PENDING: 10,
+    models.OrderStatus.PROCESSING: 10,
+    models.OrderStatus.SHIPPED: 10,
+    models.OrderStatus.DELIVERED: 60,
+    models.OrderStatus.CANCELLED: 10,
+}
+
+
+def _insert_batches(connection, model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        connection.execute(insert(model), rows[start:start + BATCH_SIZE])
+
+
+def _max_id(connection, model) -> int:
+    return connection.execute(select(func.coalesce(func.max(model.id), 0))).scalar()
+
+
+def _count_users(connection, prefix: str) -> int:
+    return connection.execute(
+        select(func.count()).select_from(models.User).where(models.User.username.startswith(prefix))
+    ).scalar()
+
+
+def seed(
+        buyers: int,
+        sellers: int,
+        stores_per_seller: int,
+        products_per_store: int,
+        orders: int,
+        max_items: int,
+        days: int,
+        rng: random.Random,
+):
+    migrate(engine)
+
+    # Один хеш на всех: bcrypt на каждого пользователя занял бы минуты
+    hashed_password = get_password_hash(BENCH_PASSWORD)
+
+    with engine.begin() as connection:
+        first_user = _max_id(connection, models.User) + 1
+        first_seller_n = _count_users(connection, SELLER_PREFIX) + 1
+        first_buyer_n = _count_users(connection, BUYER_PREFIX) + 1
+        _insert_batches(connection, models.User, [
+            {"username": f"{SELLER_PREFIX}{first_seller_n + i}", "hashed_password": hashed_password,
+             "role": models.UserRole.SELLER}
+            for i in range(sellers)
+        ] + [
+            {"username": f"{BUYER_PREFIX}{first_buyer_n + i}", "hashed_password": hashed_password,
+             "role": models.UserRole.BUYER}
+            for i in range(buyers)
+        ])
+        seller_ids = list(range(first_user, first_user + sellers))
+        buyer_ids = list(range(first_user + sellers, first_user + sellers + buyers))
+
+        first_store = _max_id(connection, models.Store) + 1
+        _insert_batches(connection, models.Store, [
+            {"name": f"Store {first_store + n}", "seller_id": seller_id}
+            for n, seller_id in enumerate(
+                seller_id for seller_id in seller_ids for _ in range(stores_per_seller)
+            )
+        ])
+        store_ids = range(first_store, first_store + sellers * stores_per_seller)
+
+        first_product = _max_id(connection, models.Product) + 1
+        product_rows = []
+        for store_id in store_ids:
+            for _ in range(products_per_store):
+                name = f"{rng.choice(_ADJECTIVES)} {rng.choice(_COLORS)} {rng.choice(_ITEMS)}"
+                product_rows.append({
+                    "name": name,
+                    "description": f"{name}, size {rng.choice('SMLX')}",
+                    "price": round(rng.uniform(5, 300), 2),
+                    "store_id": store_id,
+                })
+        _insert_batches(connection, models.Product, product_rows)
+        prices = [row["price"] for row in product_rows]
+
+        first_order = _max_id(connection, models.Order) + 1
+        now = datetime.utcnow()
+        statuses, weights = zip(*_STATUS_WEIGHTS.items())
+        order_rows, item_rows = [], []
+        # Заказы идут в порядке created_at, как они появлялись бы в жизни
+        created = sorted(now - timedelta(seconds=rng.randint(0, days * 86400)) for _ in range(orders))
+        for n, created_at in enumerate(created):
+            order_rows.append({
+                "buyer_id": rng.choice(buyer_ids),
+                "status": rng.choices(statuses, weights)[0],
+                "created_at": created_at,
+            })
+            for offset in rng.sample(range(len(product_rows)), rng.randint(1, min(max_items, len(product_rows)))):
+                item_rows.append({
+                    "order_id": first_order + n,
+                    "product_id": first_product + offset,
+                    "quantity": rng.randint(1, 3),
+                    "price_at_order": prices[offset],
+                })
+        _insert_batches(connection, models.Order, order_rows)
+        _insert_batches(connection, models.OrderItem, item_rows)
+
+    # Агрегаты продаж по всем заказам (включая только что созданные)
+    analytics.rebuild(engine)
+
+    return {
+        "sellers": sellers, "buyers": buyers, "stores": len(store_ids),
+        "products": len(product_rows), "orders": orders, "order_items": len(item_rows),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заполнение БД синтетическими данными")
+    parser.add_argument("--buyers", type=int, default=1000)
+    parser.add_argument("--sellers", type=int, default=50)
+    parser.add_argument("--stores-per-seller", type=int, default=3)
+    parser.add_argument("--products-per-store", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--max-items", type=int, default=5, help="Максимум позиций в заказе")
+    parser.add_argument("--days", type=int, default=180, help="Заказы распределяются по последним N дням")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = seed(
+        buyers=args.buyers,
+        sellers=args.sellers,
+        stores_per_seller=args.stores_per_seller,
+        products_per_store=args.products_per_store,
+        orders=args.orders,
+        max_items=args.max_items,
+        days=args.days,
+        rng=random.Random(args.seed),
+    )
+    print(f"Seeded {counts} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
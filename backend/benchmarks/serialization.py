@@ -0,0 +1,163 @@
+"""
+Микробенчмарк сериализации ответов: классический путь FastAPI (response_model ->
+проверка в пуле потоков -> dump в python -> json.dumps) против быстрого пути
+(responses.json_response: один проход pydantic-core) на ленте заказов покупателя,
+плюс время и число SQL-запросов PATCH /orders/{id}/status.
+
+Запуск (из каталога backend):
+    python -m benchmarks.serialization --orders 50 --items 5 --repeat 200
+
+Замер (50 x 5, --repeat 1000, 1 CPU, SQLite): сама сериализация 4.1-5.0 -> 3.3-3.6 ms p50, но на
+весь запрос выигрыша нет — p50 всех трех вариантов 14-17 ms, разница между ними меньше разброса
+между прогонами. Время запроса определяют загрузка заказов и TestClient, поэтому pydantic-core
+не стал классом ответа по умолчанию (см. responses.py).
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+
+def _timings(func, repeat: int) -> List[float]:
+    func()  # прогрев
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def _row(name: str, timings: List[float], extra: str = "") -> None:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{name:50} {statistics.median(timings):>9.3f} {p95:>9.3f} {extra}")
+
+
+def _seed(orders: int, items: int) -> tuple:
+    from api import analytics, models
+    from api.auth_utils import create_access_token
+    from api.database import SessionLocal, engine
+    from api.migrate import migrate
+
+    migrate(engine)
+    with SessionLocal() as db:
+        seller = models.User(username="ser_seller", hashed_password="-", role=models.UserRole.SELLER)
+        buyer = models.User(username="ser_buyer", hashed_password="-", role=models.UserRole.BUYER)
+        store = models.Store(name="Serialization Store", seller=seller)
+        products = [
+            models.Product(name=f"Product {i}", description="Хлопок, синий", price=10.0 + i, store=store)
+            for i in range(items)
+        ]
+        db.add_all([seller, buyer, store, *products])
+        db.flush()
+        for _ in range(orders):
+            order = models.Order(buyer_id=buyer.id, status=models.OrderStatus.PENDING)
+            order.items = [
+                models.OrderItem(product=product, quantity=2, price_at_order=product.price) for product in products
+            ]
+            db.add(order)
+        db.commit()
+        analytics.rebuild(db.get_bind())
+        tokens = {
+            user.role: create_access_token({"id": user.id, "username": user.username, "role": user.role.value})
+            for user in (seller, buyer)
+        }
+        return buyer.id, tokens, order.id
+
+
+def run(orders: int, items: int, repeat: int) -> None:
+    from fastapi.responses import JSONResponse
+    from fastapi.testclient import TestClient
+    from pydantic_core import to_json
+    from sqlalchemy.orm import joinedload
+
+    from api import models, schemas
+    from api.database import SessionLocal
+    from api.main import app
+    from api.query_stats import count_queries
+    from api.responses import serialize
+    from api.routers.orders import orders_adapter
+
+    buyer_id, tokens, order_id = _seed(orders, items)
+
+    def load_orders(db):
+        return (
+            db.query(models.Order)
+            .filter(models.Order.buyer_id == buyer_id)
+            .options(joinedload(models.Order.items).joinedload(models.OrderItem.product))
+            .all()
+        )
+
+    # 1. Только сериализация уже загруженных заказов
+    with SessionLocal() as db:
+        loaded = load_orders(db)
+
+        def classic():
+            validated = orders_adapter.validate_python(loaded, from_attributes=True)
+            return json.dumps(
+                orders_adapter.dump_python(validated, mode="json"), ensure_ascii=False, separators=(",", ":"),
+            ).encode()
+
+        body_size = len(serialize(orders_adapter, loaded))
+
+        print(f"{orders} orders x {items} items, {body_size} bytes\n")
+        print(f"{'serialization only':50} {'p50, ms':>9} {'p95, ms':>9}")
+        _row("validate + dump_python + json.dumps", _timings(classic, repeat))
+        _row("responses.serialize (dump_json)", _timings(lambda: serialize(orders_adapter, loaded), repeat))
+
+    # 2. Запрос целиком: тот же обработчик с классическим ответом и с быстрым путем
+    def classic_my_orders():
+        with SessionLocal() as db:
+            return load_orders(db)
+
+    app.add_api_route(
+        "/bench/orders-classic", classic_my_orders,
+        response_model=List[schemas.Order], response_class=JSONResponse,
+    )
+    # Тот же путь, но render через pydantic-core: меняется только json.dumps -> to_json
+    class ToJSONResponse(JSONResponse):
+        def render(self, content) -> bytes:
+            return to_json(content)
+
+    app.add_api_route(
+        "/bench/orders-to-json", classic_my_orders,
+        response_model=List[schemas.Order], response_class=ToJSONResponse,
+    )
+    client = TestClient(app)
+    buyer = {"Authorization": f"Bearer {tokens[models.UserRole.BUYER]}"}
+    seller = {"Authorization": f"Bearer {tokens[models.UserRole.SELLER]}"}
+
+    print(f"\n{'full request (TestClient)':50} {'p50, ms':>9} {'p95, ms':>9}")
+    _row("GET /orders/my, response_model + JSONResponse",
+         _timings(lambda: client.get("/bench/orders-classic"), repeat))
+    _row("GET /orders/my, response_model + to_json render",
+         _timings(lambda: client.get("/bench/orders-to-json"), repeat))
+    _row("GET /orders/my, fast path", _timings(lambda: client.get("/orders/my", headers=buyer), repeat))
+
+    statuses = iter(["PROCESSING", "PENDING"] * (repeat + 1))
+    with count_queries() as statements:
+        client.patch(f"/orders/{order_id}/status", json={"status": "SHIPPED"}, headers=seller)
+    _row("PATCH /orders/{id}/status",
+         _timings(lambda: client.patch(f"/orders/{order_id}/status", json={"status": next(statuses)},
+                                       headers=seller), repeat),
+         f"{len(statements)} queries")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сериализация ответов и перечитывание после commit")
+    parser.add_argument("--orders", type=int, default=50)
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tmp, 'serialization.db')}")
+        run(args.orders, args.items, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Время старта API: импорт api.main в новом процессе и время до первого ответа сервера.
+
+Запуск (из каталога backend):
+    python -m benchmarks.startup --repeat 5 --workers 1 2
+    python -m benchmarks.startup --top 15    # плюс самые медленные импорты (python -X importtime)
+
+Время до первого ответа — от запуска `python -m api.server` до первого 200 на GET /
+(и на GET /stores/ — первый запрос к БД). БД — временный файл SQLite, схема создается
+при запуске сервера, как в продакшене.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import api.main; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def _env(db_path: str) -> dict:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    return env
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import(db_path: str) -> float:
+    """Время `import api.main` в новом интерпретаторе, секунды."""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR, env=_env(db_path), capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def slowest_imports(db_path: str, top: int) -> list:
+    """Пакеты, дольше всего импортируемые при старте (сумма собственного времени модулей, мс)."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import api.main"],
+        cwd=BACKEND_DIR, env=_env(db_path), capture_output=True, text=True, check=True,
+    ).stderr
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_time, _, name = line[len("import time:"):].split("|")
+        if not self_time.strip().isdigit():
+            continue  # Строка заголовка
+        # api.* считаем по модулям, остальное — по пакету верхнего уровня
+        name = name.strip()
+        package = name if name.startswith("api.") else name.split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_time) / 1000
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def measure_first_request(db_path: str, workers: int, timeout: float = 60) -> tuple:
+    """(секунды до 200 на GET /, секунды до 200 на GET /stores/) после запуска сервера."""
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "api.server", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        cwd=BACKEND_DIR, env=_env(db_path), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        first_response = None
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {process.returncode}")
+            try:
+                if httpx.get(f"{base_url}/", timeout=1).status_code == 200:
+                    first_response = time.perf_counter() - started
+                    break
+            except httpx.TransportError:
+                time.sleep(0.01)
+        if first_response is None:
+            raise RuntimeError(f"Server did not answer within {timeout} s")
+        httpx.get(f"{base_url}/stores/", timeout=10).raise_for_status()
+        first_query = time.perf_counter() - started
+        return first_response, first_query
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1])
+    parser.add_argument("--top", type=int, default=0, help="показать N самых медленных импортов")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Первый импорт компилирует .pyc — в замер не идет
+        measure_import(os.path.join(directory, "warmup.db"))
+        imports = [measure_import(os.path.join(directory, "import.db")) for _ in range(args.repeat)]
+        print(f"import api.main: median {statistics.median(imports) * 1000:.0f} ms, "
+              f"min {min(imports) * 1000:.0f} ms ({args.repeat} runs)")
+
+        if args.top:
+            print("\nslowest imports (self time by package, ms):")
+            for module, elapsed in slowest_imports(os.path.join(directory, "top.db"), args.top):
+                print(f"  {module:40} {elapsed:8.1f}")
+
+        print(f"\n{'workers':>7} {'first GET /, ms':>16} {'first GET /stores/, ms':>23}")
+        for workers in args.workers:
+            results = [
+                # Новая БД на каждый запуск: в замер входит создание схемы
+                measure_first_request(os.path.join(directory, f"serve_{workers}_{run}.db"), workers)
+                for run in range(args.repeat)
+            ]
+            first_response = statistics.median(result[0] for result in results)
+            first_query = statistics.median(result[1] for result in results)
+            print(f"{workers:>7} {first_response * 1000:>16.0f} {first_query * 1000:>23.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from api.main import main as start_api
+from api.server import main as start_api
 
 
 def run():
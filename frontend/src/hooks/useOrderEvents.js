@@ -0,0 +1,43 @@
+import { useEffect, useRef } from 'react';
+
+// Подписка на поток событий заказов (Server-Sent Events, GET /events/orders).
+// onOrder(order) — заказ создан или изменен (в событии заказ целиком);
+// onResync() — события могли потеряться (переполнение очереди на сервере или обрыв связи),
+// список заказов нужно перезапросить целиком.
+const useOrderEvents = (apiUrl, token, onOrder, onResync) => {
+    // Обработчики в ref, чтобы не переподключаться при каждом рендере
+    const handlers = useRef({ onOrder, onResync });
+    handlers.current = { onOrder, onResync };
+
+    useEffect(() => {
+        if (!token) return undefined;
+
+        // EventSource не умеет передавать заголовок Authorization — токен идет в query
+        const source = new EventSource(`${apiUrl}/events/orders?token=${encodeURIComponent(token)}`);
+        let connectedBefore = false;
+
+        const handleOrder = (event) => handlers.current.onOrder(JSON.parse(event.data));
+        source.addEventListener('order_created', handleOrder);
+        source.addEventListener('order_updated', handleOrder);
+        source.addEventListener('resync', () => handlers.current.onResync());
+
+        source.onopen = () => {
+            // EventSource переподключается сам; пропущенные за время обрыва события догружаем списком
+            if (connectedBefore) handlers.current.onResync();
+            connectedBefore = true;
+        };
+
+        return () => source.close();
+    }, [apiUrl, token]);
+};
+
+// Заменяет заказ в списке по id или добавляет новый в начало
+export const upsertOrder = (orders, order) => {
+    const index = orders.findIndex(o => o.id === order.id);
+    if (index === -1) return [order, ...orders];
+    const updated = [...orders];
+    updated[index] = order;
+    return updated;
+};
+
+export default useOrderEvents;
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { useCart } from '../../context/CartContext';
 import { useAuth } from '../../context/AuthContext';
 import axios from 'axios';
@@ -11,6 +11,13 @@ const Cart = () => {
     const [isOrdering, setIsOrdering] = useState(false);
     const [orderMessage, setOrderMessage] = useState({type: '', text: ''});
 
+    // Ключ идемпотентности текущей корзины: повтор после таймаута или обрыва связи
+    // вернет уже оформленный заказ, а не создаст второй. Новая корзина — новый ключ.
+    const idempotencyKey = useRef(null);
+    useEffect(() => {
+        idempotencyKey.current = null;
+    }, [cartItems]);
+
     const handleRemove = (productId) => {
         removeItemFromCart(productId);
     };
@@ -37,8 +44,23 @@ const Cart = () => {
         }));
 
 
+        if (!idempotencyKey.current) {
+            idempotencyKey.current = crypto.randomUUID();
+        }
+        const headers = { 'Idempotency-Key': idempotencyKey.current };
+
         try {
-            await axios.post(`${API_URL}/orders/create`, orderData);
+            // Сетевые ошибки и 5xx повторяем с тем же ключом (до 2 раз)
+            for (let attempt = 0; ; attempt++) {
+                try {
+                    await axios.post(`${API_URL}/orders/create`, orderData, { headers });
+                    break;
+                } catch (err) {
+                    const retryable = !err.response || err.response.status >= 500;
+                    if (!retryable || attempt >= 2) throw err;
+                    await new Promise(resolve => setTimeout(resolve, 500 * (attempt + 1)));
+                }
+            }
 
             setOrderMessage({ type: 'success', text: 'Заказ успешно оформлен! Ожидайте подтверждения от продавца.' });
             clearCart(); // Очищаем корзину после успешного оформления
@@ -4,14 +4,17 @@ import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 import { useAuth } from '../../context/AuthContext';
 import ProtectedRoute from '../../components/ProtectedRoute';
+import useOrderEvents, { upsertOrder } from '../../hooks/useOrderEvents';
 
 const API_URL = "http://127.0.0.1:5001"; // Убедитесь, что порт соответствует вашему бэкенду
 
 const MyOrders = () => {
-    const { isLoggedIn, role } = useAuth();
+    const { isLoggedIn, role, token } = useAuth();
     const [orders, setOrders] = useState([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState('');
+    // Завершенные заказы старше ARCHIVE_AFTER_DAYS хранятся в архиве и загружаются по запросу
+    const [showArchived, setShowArchived] = useState(false);
 
     useEffect(() => {
         if (isLoggedIn && role === 'BUYER') {
@@ -19,14 +22,23 @@ const MyOrders = () => {
         } else {
             setLoading(false);
         }
-    }, [isLoggedIn, role]);
+    }, [isLoggedIn, role, showArchived]);
+
+    // Изменения статусов приходят с сервера — без перезагрузки всего списка
+    useOrderEvents(
+        API_URL,
+        isLoggedIn && role === 'BUYER' ? token : null,
+        (order) => setOrders(prev => upsertOrder(prev, order)),
+        () => fetchOrders(false),
+    );
 
-    const fetchOrders = async () => {
-        setLoading(true);
+    const fetchOrders = async (showLoading = true) => {
+        if (showLoading) setLoading(true);
         setError('');
         try {
             const token = localStorage.getItem('token');
             const response = await axios.get(`${API_URL}/orders/my`, {
+                params: showArchived ? { include_archived: true } : {},
                 headers: {
                     Authorization: `Bearer ${token}`
                 }
@@ -55,6 +67,14 @@ const MyOrders = () => {
     return (
         <div style={containerStyle}>
             <h2 style={{ borderBottom: '2px solid #007bff', paddingBottom: '10px' }}>🛒 Мои Заказы</h2>
+            <label style={{ display: 'block', marginBottom: '15px' }}>
+                <input
+                    type="checkbox"
+                    checked={showArchived}
+                    onChange={(e) => setShowArchived(e.target.checked)}
+                />
+                {' '}Показать архив (старые доставленные и отмененные заказы)
+            </label>
 
             {orders.length === 0 ? (
                 <p>У вас пока нет оформленных заказов.</p>
@@ -62,7 +82,7 @@ const MyOrders = () => {
                 <div style={ordersListStyle}>
                     {orders.map((order) => (
                         <div key={order.id} style={orderCardStyle}>
-                            <h3 style={orderHeaderStyle}>Заказ #{order.id}</h3>
+                            <h3 style={orderHeaderStyle}>Заказ #{order.id}{order.archived && ' (архив)'}</h3>
                             <p>
                                 Статус:
                                 <span style={getStatusStyle(order.status)}>
@@ -4,38 +4,51 @@ import { useAuth } from '../../context/AuthContext';
 import { useCart } from '../../context/CartContext';
 import { useParams } from 'react-router-dom';
 
+// Размер страницы товаров магазина (limit на бэкенде, не больше 500)
+const PAGE_SIZE = 100;
+
 const StoreDetails = () => {
     const { API_URL } = useAuth();
     const { addToCart, cartItems } = useCart();
     const { id } = useParams(); // Получаем ID магазина из URL
 
-    const [storeName, setStoreName] = useState('');
+    const [store, setStore] = useState(null);
     const [products, setProducts] = useState([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
+    // Полная страница — возможно, есть следующая (товары отдаются по limit штук)
+    const [hasMore, setHasMore] = useState(false);
+    const [loadingMore, setLoadingMore] = useState(false);
+
+    // Страница товаров после after_id (id последнего уже показанного товара)
+    const fetchProductsPage = (afterId) => {
+        const params = { limit: PAGE_SIZE };
+        if (afterId !== undefined) {
+            params.after_id = afterId;
+        }
+        return axios.get(`${API_URL}/stores/${id}/products`, { params });
+    };
 
     useEffect(() => {
         const fetchStoreData = async () => {
             try {
-                // 1. Получаем детали магазина (через общий эндпоинт /stores/)
-                const storeResponse = await axios.get(`${API_URL}/stores/`);
-                const store = storeResponse.data.find(s => s.id === parseInt(id));
-
-                if (!store) {
-                    setError("Магазин не найден.");
-                    setLoading(false);
-                    return;
-                }
-                setStoreName(store.name);
-
-                // 2. Получаем товары магазина (через эндпоинт /stores/{store_id}/products)
-                const productsResponse = await axios.get(`${API_URL}/stores/${id}/products`);
+                // Магазин со сводкой (GET /stores/{store_id}) и его товары — параллельно
+                const [storeResponse, productsResponse] = await Promise.all([
+                    axios.get(`${API_URL}/stores/${id}`),
+                    fetchProductsPage(),
+                ]);
+                setStore(storeResponse.data);
                 setProducts(productsResponse.data);
+                setHasMore(productsResponse.data.length === PAGE_SIZE);
 
                 setLoading(false);
             } catch (err) {
                 console.error("Error fetching store data:", err);
-                setError("Не удалось загрузить данные магазина.");
+                if (err.response && err.response.status === 404) {
+                    setError("Магазин не найден.");
+                } else {
+                    setError("Не удалось загрузить данные магазина.");
+                }
                 setLoading(false);
             }
         };
@@ -43,6 +56,19 @@ const StoreDetails = () => {
         fetchStoreData();
     }, [API_URL, id]);
 
+    const handleLoadMore = async () => {
+        setLoadingMore(true);
+        try {
+            const response = await fetchProductsPage(products[products.length - 1].id);
+            setProducts(prev => [...prev, ...response.data]);
+            setHasMore(response.data.length === PAGE_SIZE);
+        } catch (err) {
+            console.error("Error fetching more products:", err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     if (loading) {
         return <h2>Загрузка магазина...</h2>;
     }
@@ -66,7 +92,16 @@ const StoreDetails = () => {
 
     return (
         <div style={{ padding: '20px' }}>
-            <h1>🏬 {storeName}</h1>
+            <h1>🏬 {store.name}</h1>
+            {store.summary && (
+                <p style={{ color: '#555' }}>
+                    Товаров: {store.summary.product_count}
+                    {store.summary.min_price !== null && (
+                        <> · Цены: ${store.summary.min_price.toFixed(2)} – ${store.summary.max_price.toFixed(2)}</>
+                    )}
+                    {' '}· Заказов: {store.summary.order_count}
+                </p>
+            )}
             <h2>Список товаров</h2>
 
             <div style={{ display: 'grid', gridTemplateColumns: 'repeat(auto-fill, minmax(300px, 1fr))', gap: '20px' }}>
@@ -86,6 +121,11 @@ const StoreDetails = () => {
                                 <h4>{product.name}</h4>
                                 <p>{product.description}</p>
                                 <p style={{ fontWeight: 'bold' }}>Цена: ${product.price.toFixed(2)}</p>
+                                {product.stock !== null && product.stock !== undefined && (
+                                    <p style={{ color: product.stock > 0 ? '#555' : '#dc3545' }}>
+                                        {product.stock > 0 ? `В наличии: ${product.stock} шт.` : 'Нет в наличии'}
+                                    </p>
+                                )}
 
                                 <div style={{ display: 'flex', alignItems: 'center', gap: '10px', marginTop: '10px' }}>
 
@@ -117,6 +157,16 @@ const StoreDetails = () => {
                     <p>В этом магазине пока нет товаров.</p>
                 )}
             </div>
+
+            {hasMore && (
+                <button
+                    onClick={handleLoadMore}
+                    disabled={loadingMore}
+                    style={{ marginTop: '20px', padding: '8px 15px', borderRadius: '4px' }}
+                >
+                    {loadingMore ? 'Загрузка...' : 'Показать еще'}
+                </button>
+            )}
         </div>
     );
 };
@@ -3,11 +3,19 @@ import axios from 'axios';
 import { useAuth } from '../../context/AuthContext';
 import { Link } from 'react-router-dom';
 
+// Размер страницы списка магазинов (limit на бэкенде, не больше 500)
+const PAGE_SIZE = 100;
+
 const StoreList = () => {
     const { API_URL, isLoggedIn, role } = useAuth();
     const [stores, setStores] = useState([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
+    const [searchQuery, setSearchQuery] = useState('');
+    const [searchResults, setSearchResults] = useState(null); // null — поиск еще не выполнялся
+    // Полная страница — возможно, есть следующая (GET /stores/ отдает не больше limit магазинов)
+    const [hasMore, setHasMore] = useState(false);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     // Дополнительная проверка на роль (хотя ProtectedRoute уже это делает)
     if (isLoggedIn && role === 'SELLER') {
@@ -20,8 +28,10 @@ const StoreList = () => {
                 // Эндпоинт GET /stores/ не требует токена на бэкенде,
                 // если мы хотим, чтобы список был виден всем.
                 // Если эндпоинт защищен, axios автоматически отправит токен.
-                const response = await axios.get(`${API_URL}/stores/`);
-                setStores(response.data);
+                // with_summary: число товаров и диапазон цен для карточек магазинов
+                const data = await fetchStoresPage();
+                setStores(data);
+                setHasMore(data.length === PAGE_SIZE);
                 setLoading(false);
             } catch (err) {
                 console.error("Error fetching stores:", err);
@@ -40,6 +50,45 @@ const StoreList = () => {
         }
     }, [API_URL, isLoggedIn]);
 
+    // Страница магазинов после after_id (id последнего уже показанного магазина)
+    const fetchStoresPage = async (afterId) => {
+        const params = { with_summary: true, limit: PAGE_SIZE };
+        if (afterId !== undefined) {
+            params.after_id = afterId;
+        }
+        const response = await axios.get(`${API_URL}/stores/`, { params });
+        return response.data;
+    };
+
+    const handleLoadMore = async () => {
+        setLoadingMore(true);
+        try {
+            const data = await fetchStoresPage(stores[stores.length - 1].id);
+            setStores(prev => [...prev, ...data]);
+            setHasMore(data.length === PAGE_SIZE);
+        } catch (err) {
+            console.error("Error fetching more stores:", err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
+    // Поиск товаров по всем магазинам: GET /products/search?q=...
+    const handleSearch = async (e) => {
+        e.preventDefault();
+        if (!searchQuery.trim()) {
+            setSearchResults(null);
+            return;
+        }
+        try {
+            const response = await axios.get(`${API_URL}/products/search`, { params: { q: searchQuery } });
+            setSearchResults(response.data);
+        } catch (err) {
+            console.error("Error searching products:", err);
+            setSearchResults([]);
+        }
+    };
+
     if (!isLoggedIn) {
         return <div>Пожалуйста, <Link to="/login">войдите</Link>, чтобы просматривать магазины.</div>;
     }
@@ -59,6 +108,35 @@ const StoreList = () => {
 
     return (
         <div style={{ padding: '20px' }}>
+            <form onSubmit={handleSearch} style={{ display: 'flex', gap: '10px', marginBottom: '20px' }}>
+                <input
+                    type="text"
+                    value={searchQuery}
+                    onChange={(e) => setSearchQuery(e.target.value)}
+                    placeholder="Поиск товаров во всех магазинах"
+                    style={{ flex: 1, padding: '8px', borderRadius: '4px', border: '1px solid #ccc' }}
+                />
+                <button type="submit" style={{ padding: '8px 15px', borderRadius: '4px' }}>Найти</button>
+            </form>
+
+            {searchResults !== null && (
+                <div style={{ marginBottom: '30px' }}>
+                    <h2>🔍 Результаты поиска</h2>
+                    {searchResults.length === 0 ? (
+                        <p>Ничего не найдено.</p>
+                    ) : (
+                        <ul>
+                            {searchResults.map(product => (
+                                <li key={product.id}>
+                                    {product.name} — ${product.price.toFixed(2)} ({' '}
+                                    <Link to={`/stores/${product.store.id}`}>{product.store.name}</Link> )
+                                </li>
+                            ))}
+                        </ul>
+                    )}
+                </div>
+            )}
+
             <h2>🛒 Все магазины</h2>
 
             <div style={{ display: 'grid', gridTemplateColumns: 'repeat(auto-fill, minmax(300px, 1fr))', gap: '20px' }}>
@@ -74,6 +152,14 @@ const StoreList = () => {
                     >
                         <h3>{store.name}</h3>
                         <p>ID Продавца: {store.seller_id}</p>
+                        {store.summary && (
+                            <p style={{ color: '#555' }}>
+                                Товаров: {store.summary.product_count}
+                                {store.summary.min_price !== null && (
+                                    <> · от ${store.summary.min_price.toFixed(2)}</>
+                                )}
+                            </p>
+                        )}
 
                         <Link
                             to={`/stores/${store.id}`}
@@ -92,6 +178,16 @@ const StoreList = () => {
                     </div>
                 ))}
             </div>
+
+            {hasMore && (
+                <button
+                    onClick={handleLoadMore}
+                    disabled={loadingMore}
+                    style={{ marginTop: '20px', padding: '8px 15px', borderRadius: '4px' }}
+                >
+                    {loadingMore ? 'Загрузка...' : 'Показать еще'}
+                </button>
+            )}
         </div>
     );
 };
@@ -16,6 +16,7 @@ const SellerDashboard = () => {
     const [productName, setProductName] = useState('');
     const [productDescription, setProductDescription] = useState('');
     const [productPrice, setProductPrice] = useState('');
+    const [productStock, setProductStock] = useState(''); // Пусто — остаток не ведется
     const [productLoading, setProductLoading] = useState(false);
     const [productMessage, setProductMessage] = useState({ type: '', text: '' });
 
@@ -60,6 +61,14 @@ const SellerDashboard = () => {
             return;
         }
 
+        const stockValue = productStock === '' ? null : parseInt(productStock, 10);
+
+        if (stockValue !== null && (isNaN(stockValue) || stockValue < 0)) {
+            setProductMessage({ type: 'error', text: 'Остаток должен быть целым неотрицательным числом.' });
+            setProductLoading(false);
+            return;
+        }
+
         if (!selectedStoreId) {
              setProductMessage({ type: 'error', text: 'Пожалуйста, выберите магазин.' });
              setProductLoading(false);
@@ -72,6 +81,7 @@ const SellerDashboard = () => {
                 name: productName,
                 description: productDescription,
                 price: priceValue,
+                stock: stockValue,
             });
 
             setProductMessage({
@@ -83,6 +93,7 @@ const SellerDashboard = () => {
             setProductName('');
             setProductDescription('');
             setProductPrice('');
+            setProductStock('');
 
         } catch (err) {
             console.error('Add Product Error:', err.response?.data || err);
@@ -178,11 +189,17 @@ const SellerDashboard = () => {
                                 </div>
 
                                 {/* Цена */}
-                                <div style={{ marginBottom: '20px' }}>
+                                <div style={{ marginBottom: '15px' }}>
                                     <label style={{ display: 'block', fontWeight: 'bold' }}>Цена ($):</label>
                                     <input type="number" step="0.01" min="0.01" value={productPrice} onChange={(e) => setProductPrice(e.target.value)} required style={{ width: '100%', padding: '8px', borderRadius: '4px', border: '1px solid #ccc' }} />
                                 </div>
 
+                                {/* Остаток */}
+                                <div style={{ marginBottom: '20px' }}>
+                                    <label style={{ display: 'block', fontWeight: 'bold' }}>Остаток на складе (шт., пусто — без учета):</label>
+                                    <input type="number" step="1" min="0" value={productStock} onChange={(e) => setProductStock(e.target.value)} style={{ width: '100%', padding: '8px', borderRadius: '4px', border: '1px solid #ccc' }} />
+                                </div>
+
                                 <button type="submit" disabled={productLoading} style={{ padding: '10px 20px', backgroundColor: '#28a745', color: 'white', border: 'none', borderRadius: '4px', cursor: 'pointer' }}>
                                     {productLoading ? 'Добавление...' : 'Опубликовать товар'}
                                 </button>
@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 import { useAuth } from '../../context/AuthContext';
 import { Link } from 'react-router-dom'; // <-- ДОБАВЬТЕ ЭТОТ ИМПОРТ
+import useOrderEvents, { upsertOrder } from '../../hooks/useOrderEvents';
 
 // Доступные статусы заказа (должны совпадать с бэкендом)
 const ORDER_STATUSES = [
@@ -13,7 +14,7 @@ const ORDER_STATUSES = [
 ];
 
 const SellerOrders = () => {
-    const { API_URL, role } = useAuth();
+    const { API_URL, role, token } = useAuth();
 
     const [orders, setOrders] = useState([]);
     const [stores, setStores] = useState([]); // Для сопоставления ID магазина с именем
@@ -22,48 +23,43 @@ const SellerOrders = () => {
     const [updateStatus, setUpdateStatus] = useState({}); // { orderId: newStatus }
 
     // --- 1. Загрузка данных (Магазины и Заказы) ---
+    const fetchData = async () => {
+        try {
+            // 1. Магазины продавца (для названий и выделения своих товаров) и
+            // 2. Заказы по всем магазинам продавца — одним запросом GET /orders/seller.
+            // Бэкенд сам убирает дубликаты заказов, содержащих товары нескольких магазинов продавца.
+            const [storeResponse, ordersResponse] = await Promise.all([
+                axios.get(`${API_URL}/stores/my`),
+                axios.get(`${API_URL}/orders/seller`),
+            ]);
+            setStores(storeResponse.data);
+            setOrders(ordersResponse.data);
+            setLoading(false);
+        } catch (err) {
+            console.error("Error fetching seller orders:", err.response?.data || err);
+            setError("Не удалось загрузить заказы или список магазинов.");
+            setLoading(false);
+        }
+    };
+
     useEffect(() => {
         if (role !== 'SELLER') return;
-
-        const fetchData = async () => {
-            try {
-                // 1. Получаем все магазины продавца, чтобы знать, какие ID нас интересуют
-                // *Предполагаем, что есть эндпоинт для получения магазинов текущего продавца*
-                const storeResponse = await axios.get(`${API_URL}/stores/my`);
-                const sellerStores = storeResponse.data;
-                setStores(sellerStores);
-
-                if (sellerStores.length === 0) {
-                    setLoading(false);
-                    return;
-                }
-
-                // 2. Получаем заказы для каждого магазина и объединяем их
-                let allOrders = [];
-                for (const store of sellerStores) {
-                    // Используем бэкенд-эндпоинт GET /orders/seller/store/{store_id}
-                    const ordersResponse = await axios.get(`${API_URL}/orders/seller/store/${store.id}`);
-                    allOrders = allOrders.concat(ordersResponse.data);
-                }
-
-                // Удаляем дубликаты заказов (т.к. один заказ может содержать товары из разных магазинов продавца)
-                const uniqueOrders = Array.from(new Set(allOrders.map(o => o.id)))
-                    .map(id => {
-                        return allOrders.find(o => o.id === id);
-                    });
-
-                setOrders(uniqueOrders);
-                setLoading(false);
-            } catch (err) {
-                console.error("Error fetching seller orders:", err.response?.data || err);
-                setError("Не удалось загрузить заказы или список магазинов.");
-                setLoading(false);
-            }
-        };
-
         fetchData();
+        // eslint-disable-next-line react-hooks/exhaustive-deps
     }, [API_URL, role]);
 
+    // Новые заказы и смена статусов приходят с сервера (GET /events/orders).
+    // store_ids в событии — все магазины заказа; оставляем только магазины продавца.
+    useOrderEvents(
+        API_URL,
+        role === 'SELLER' ? token : null,
+        (order) => setOrders(prev => upsertOrder(prev, {
+            ...order,
+            store_ids: order.store_ids.filter(storeId => stores.some(store => store.id === storeId)),
+        })),
+        () => fetchData(),
+    );
+
 
     // --- 2. Обновление статуса заказа ---
     const handleStatusChange = (orderId, newStatus) => {
@@ -128,6 +124,13 @@ const SellerOrders = () => {
         return stores.some(store => store.id === item.product.store_id);
     }
 
+    // Названия магазинов продавца, к которым относится заказ (order.store_ids приходит с бэкенда)
+    const orderStoreNames = (order) => {
+        return order.store_ids
+            .map(storeId => stores.find(store => store.id === storeId)?.name || `ID ${storeId}`)
+            .join(', ');
+    }
+
     // Вспомогательная функция для форматирования даты
     const formatDate = (dateString) => {
         return new Date(dateString).toLocaleString();
@@ -149,6 +152,7 @@ const SellerOrders = () => {
                     </div>
 
                     <p style={{ fontWeight: 'bold' }}>Текущий статус: {order.status}</p>
+                    <p>Ваши магазины в заказе: {orderStoreNames(order)}</p>
 
                     {/* Список товаров в заказе */}
                     <table style={{ width: '100%', borderCollapse: 'collapse', marginTop: '15px' }}>